@@ -0,0 +1,278 @@
+import argparse
+import sqlite3
+from datetime import date, datetime
+
+from tiempo import sql_epoch_dia, sql_local
+
+# Agregados por periodo (día, semana y mes) de las mediciones de cada paciente.
+# La tabla agregados_mediciones guarda, por paciente, resolución y periodo, el número de
+# lecturas, sumas, mínimos y máximos, separando las lecturas de la mañana (antes de las 12)
+# y de la tarde como las columnas mañana/tarde de app_v1.py. Los triggers de inserción,
+# borrado y actualización modifican solo las tres filas de los periodos de la medición.
+# Los periodos y la hora del día son los de Bogotá; la fecha de la medición está en segundos
+# UTC y se convierte con tiempo.sql_local.
+#
+# Los mismos triggers mantienen agregados_poblacion, con las sumas de todos los pacientes por
+# resolución y periodo y el número de pacientes con lecturas en cada periodo (las filas de
+# agregados_mediciones del periodo), para la página de población.
+#
+# Uso: python agregados.py [ruta_bd] --reconstruir
+
+# Resolución -> (inicio del periodo, inicio del periodo siguiente) como expresiones SQL sobre
+# una fecha (con sus modificadores) f. La semana empieza el lunes.
+RESOLUCIONES = {
+    'dia': ("date({f})", "date({f}, '+1 day')"),
+    'semana': ("date({f}, 'weekday 0', '-6 days')", "date({f}, 'weekday 0', '+1 day')"),
+    'mes': ("date({f}, 'start of month')", "date({f}, 'start of month', '+1 month')"),
+}
+
+# Días aproximados de cada resolución, para elegir la de la gráfica.
+DIAS_POR_PERIODO = {'dia': 1, 'semana': 7, 'mes': 30}
+
+# Número máximo de puntos que se dibujan en una gráfica.
+MAX_PUNTOS = 400
+
+# Condición SQL de lectura de la mañana (hora local).
+def _es_manana(fecha):
+    return f"(strftime('%H', {sql_local(fecha)}) < '12')"
+
+# Columnas agregadas (en el orden de la tabla) calculadas sobre un conjunto de filas de mediciones.
+def _columnas_agregadas(manana):
+    return f"""
+        COUNT(*), SUM(sistolica), SUM(diastolica),
+        MIN(sistolica), MAX(sistolica), MIN(diastolica), MAX(diastolica),
+        SUM({manana}), SUM(CASE WHEN {manana} THEN sistolica ELSE 0 END), SUM(CASE WHEN {manana} THEN diastolica ELSE 0 END),
+        SUM(NOT {manana}), SUM(CASE WHEN {manana} THEN 0 ELSE sistolica END), SUM(CASE WHEN {manana} THEN 0 ELSE diastolica END)
+    """
+
+_COLUMNAS = """
+    id_paciente, resolucion, periodo, lecturas, suma_sistolica, suma_diastolica,
+    min_sistolica, max_sistolica, min_diastolica, max_diastolica,
+    lecturas_manana, suma_sistolica_manana, suma_diastolica_manana,
+    lecturas_tarde, suma_sistolica_tarde, suma_diastolica_tarde
+"""
+
+# Sentencias que restan la fila OLD de sus tres periodos. Los mínimos y máximos solo se
+# vuelven a buscar dentro del periodo (con el índice por paciente y fecha) si la fila era el
+# extremo; excluir es el id de una fila que no debe contarse (en una actualización, la nueva).
+def _sentencias_eliminacion(excluir):
+    manana = _es_manana('OLD.fecha')
+    sentencias = []
+    for resolucion, (inicio, siguiente) in RESOLUCIONES.items():
+        periodo, fin = inicio.format(f=sql_local('OLD.fecha')), siguiente.format(f=sql_local('OLD.fecha'))
+        restantes = (f"FROM mediciones WHERE id_paciente = OLD.id_paciente AND fecha >= {sql_epoch_dia(periodo)} "
+                     f"AND fecha < {sql_epoch_dia(fin)} AND id <> {excluir}")
+
+        def extremo(columna_agregado, columna, funcion, comparacion):
+            return (f"{columna_agregado} = CASE WHEN OLD.{columna} {comparacion} {columna_agregado} "
+                    f"THEN (SELECT {funcion}({columna}) {restantes}) ELSE {columna_agregado} END")
+
+        sentencias.append(f"""
+        UPDATE agregados_mediciones SET
+            lecturas = lecturas - 1,
+            suma_sistolica = suma_sistolica - OLD.sistolica,
+            suma_diastolica = suma_diastolica - OLD.diastolica,
+            {extremo('min_sistolica', 'sistolica', 'MIN', '<=')},
+            {extremo('max_sistolica', 'sistolica', 'MAX', '>=')},
+            {extremo('min_diastolica', 'diastolica', 'MIN', '<=')},
+            {extremo('max_diastolica', 'diastolica', 'MAX', '>=')},
+            lecturas_manana = lecturas_manana - {manana},
+            suma_sistolica_manana = suma_sistolica_manana - CASE WHEN {manana} THEN OLD.sistolica ELSE 0 END,
+            suma_diastolica_manana = suma_diastolica_manana - CASE WHEN {manana} THEN OLD.diastolica ELSE 0 END,
+            lecturas_tarde = lecturas_tarde - (NOT {manana}),
+            suma_sistolica_tarde = suma_sistolica_tarde - CASE WHEN {manana} THEN 0 ELSE OLD.sistolica END,
+            suma_diastolica_tarde = suma_diastolica_tarde - CASE WHEN {manana} THEN 0 ELSE OLD.diastolica END
+        WHERE id_paciente = OLD.id_paciente AND resolucion = '{resolucion}' AND periodo = {periodo}
+        """)
+        sentencias.append(f"""
+        DELETE FROM agregados_mediciones
+        WHERE id_paciente = OLD.id_paciente AND resolucion = '{resolucion}' AND periodo = {periodo} AND lecturas <= 0
+        """)
+        # El paciente deja de contar en el periodo si se borró su fila de agregados.
+        sentencias.append(f"""
+        UPDATE agregados_poblacion SET
+            pacientes = pacientes - (NOT EXISTS (
+                SELECT 1 FROM agregados_mediciones
+                WHERE id_paciente = OLD.id_paciente AND resolucion = '{resolucion}' AND periodo = {periodo}
+            )),
+            lecturas = lecturas - 1,
+            suma_sistolica = suma_sistolica - OLD.sistolica,
+            suma_diastolica = suma_diastolica - OLD.diastolica
+        WHERE resolucion = '{resolucion}' AND periodo = {periodo}
+        """)
+        sentencias.append(f"DELETE FROM agregados_poblacion WHERE resolucion = '{resolucion}' AND periodo = {periodo} AND lecturas <= 0")
+    return sentencias
+
+# Triggers que mantienen los agregados: una actualización se trata como el borrado de la
+# fila anterior seguido de la inserción de la nueva.
+def _sentencias_triggers():
+    manana = _es_manana('NEW.fecha')
+    inserciones = []
+    for resolucion, (inicio, _) in RESOLUCIONES.items():
+        periodo = inicio.format(f=sql_local('NEW.fecha'))
+        inserciones.append(f"""
+        INSERT INTO agregados_mediciones ({_COLUMNAS})
+        SELECT
+            NEW.id_paciente, '{resolucion}', {periodo}, 1, NEW.sistolica, NEW.diastolica,
+            NEW.sistolica, NEW.sistolica, NEW.diastolica, NEW.diastolica,
+            {manana}, CASE WHEN {manana} THEN NEW.sistolica ELSE 0 END, CASE WHEN {manana} THEN NEW.diastolica ELSE 0 END,
+            NOT {manana}, CASE WHEN {manana} THEN 0 ELSE NEW.sistolica END, CASE WHEN {manana} THEN 0 ELSE NEW.diastolica END
+        WHERE {periodo} IS NOT NULL
+        ON CONFLICT(id_paciente, resolucion, periodo) DO UPDATE SET
+            lecturas = lecturas + 1,
+            suma_sistolica = suma_sistolica + excluded.suma_sistolica,
+            suma_diastolica = suma_diastolica + excluded.suma_diastolica,
+            min_sistolica = MIN(min_sistolica, excluded.min_sistolica),
+            max_sistolica = MAX(max_sistolica, excluded.max_sistolica),
+            min_diastolica = MIN(min_diastolica, excluded.min_diastolica),
+            max_diastolica = MAX(max_diastolica, excluded.max_diastolica),
+            lecturas_manana = lecturas_manana + excluded.lecturas_manana,
+            suma_sistolica_manana = suma_sistolica_manana + excluded.suma_sistolica_manana,
+            suma_diastolica_manana = suma_diastolica_manana + excluded.suma_diastolica_manana,
+            lecturas_tarde = lecturas_tarde + excluded.lecturas_tarde,
+            suma_sistolica_tarde = suma_sistolica_tarde + excluded.suma_sistolica_tarde,
+            suma_diastolica_tarde = suma_diastolica_tarde + excluded.suma_diastolica_tarde""")
+        # El paciente cuenta en el periodo si esta es su primera lectura en él.
+        inserciones.append(f"""
+        INSERT INTO agregados_poblacion (resolucion, periodo, pacientes, lecturas, suma_sistolica, suma_diastolica)
+        SELECT
+            '{resolucion}', {periodo},
+            (SELECT lecturas FROM agregados_mediciones WHERE id_paciente = NEW.id_paciente AND resolucion = '{resolucion}' AND periodo = {periodo}) = 1,
+            1, NEW.sistolica, NEW.diastolica
+        WHERE {periodo} IS NOT NULL
+        ON CONFLICT(resolucion, periodo) DO UPDATE SET
+            pacientes = pacientes + excluded.pacientes,
+            lecturas = lecturas + 1,
+            suma_sistolica = suma_sistolica + excluded.suma_sistolica,
+            suma_diastolica = suma_diastolica + excluded.suma_diastolica""")
+    return [
+        f"""
+        CREATE TRIGGER agregados_mediciones_insert AFTER INSERT ON mediciones
+        BEGIN
+            {';'.join(inserciones)};
+        END
+        """,
+        f"""
+        CREATE TRIGGER agregados_mediciones_delete AFTER DELETE ON mediciones
+        BEGIN
+            {';'.join(_sentencias_eliminacion('OLD.id'))};
+        END
+        """,
+        f"""
+        CREATE TRIGGER agregados_mediciones_update AFTER UPDATE OF id_paciente, fecha, sistolica, diastolica ON mediciones
+        BEGIN
+            {';'.join(_sentencias_eliminacion('NEW.id'))};
+            {';'.join(inserciones)};
+        END
+        """,
+    ]
+
+# Quita los triggers; los cambios posteriores en mediciones no se reflejan hasta instalar().
+def eliminar_triggers(conn):
+    for nombre in ('agregados_mediciones_insert', 'agregados_mediciones_delete', 'agregados_mediciones_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+# (Re)crea los triggers con la definición actual y reconstruye los agregados.
+def instalar(conn):
+    eliminar_triggers(conn)
+    for sentencia in _sentencias_triggers():
+        conn.execute(sentencia)
+    reconstruir(conn)
+
+# Recalcula todos los agregados desde el historial.
+def reconstruir(conn):
+    conn.execute("DELETE FROM agregados_mediciones")
+    for resolucion, (inicio, _) in RESOLUCIONES.items():
+        periodo = inicio.format(f=sql_local('fecha'))
+        conn.execute(f"""
+        INSERT INTO agregados_mediciones ({_COLUMNAS})
+        SELECT id_paciente, '{resolucion}', {periodo}, {_columnas_agregadas(_es_manana('fecha'))}
+        FROM mediciones
+        WHERE {periodo} IS NOT NULL
+        GROUP BY id_paciente, {periodo}
+        """)
+    conn.execute("DELETE FROM agregados_poblacion")
+    conn.execute("""
+    INSERT INTO agregados_poblacion (resolucion, periodo, pacientes, lecturas, suma_sistolica, suma_diastolica)
+    SELECT resolucion, periodo, COUNT(*), SUM(lecturas), SUM(suma_sistolica), SUM(suma_diastolica)
+    FROM agregados_mediciones
+    GROUP BY resolucion, periodo
+    """)
+
+# Elige la resolución de la gráfica para un rango de fechas: las lecturas individuales si
+# caben en MAX_PUNTOS, y si no la resolución más fina que no supere MAX_PUNTOS periodos.
+def elegir_resolucion(desde, hasta, lecturas_en_rango=None):
+    if lecturas_en_rango is not None and lecturas_en_rango <= MAX_PUNTOS:
+        return 'lecturas'
+    dias = (hasta - desde).days + 1
+    for resolucion, dias_periodo in DIAS_POR_PERIODO.items():
+        if dias / dias_periodo <= MAX_PUNTOS:
+            return resolucion
+    return 'mes'
+
+# Convierte una fecha del rango en texto comparable con la columna periodo.
+def _texto_fecha(valor):
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    return valor.isoformat() if isinstance(valor, date) else valor
+
+# Agregados de un paciente en una resolución, con los periodos que empiezan entre desde y hasta
+# (ambos incluidos). Devuelve un DataFrame con los promedios ya calculados.
+def obtener_agregados(conn, id_paciente, resolucion, desde=None, hasta=None):
+    import pandas as pd
+
+    consulta = "SELECT * FROM agregados_mediciones WHERE id_paciente = ? AND resolucion = ?"
+    params = [id_paciente, resolucion]
+    if desde is not None:
+        # El periodo que contiene a desde puede empezar antes (semanas y meses).
+        consulta += f" AND periodo >= {RESOLUCIONES[resolucion][0].format(f='?')}"
+        params.append(_texto_fecha(desde))
+    if hasta is not None:
+        consulta += " AND periodo <= ?"
+        params.append(_texto_fecha(hasta))
+    consulta += " ORDER BY periodo"
+    agregados = pd.read_sql_query(consulta, conn, params=params)
+    return agregados.assign(
+        periodo=pd.to_datetime(agregados['periodo']),
+        promedio_sistolica=agregados['suma_sistolica'] / agregados['lecturas'],
+        promedio_diastolica=agregados['suma_diastolica'] / agregados['lecturas'],
+        promedio_sistolica_manana=agregados['suma_sistolica_manana'] / agregados['lecturas_manana'].where(agregados['lecturas_manana'] > 0),
+        promedio_sistolica_tarde=agregados['suma_sistolica_tarde'] / agregados['lecturas_tarde'].where(agregados['lecturas_tarde'] > 0),
+    )
+
+# Frecuencia de pandas equivalente a cada resolución (semanas de lunes a domingo).
+PERIODOS_PANDAS = {'dia': 'D', 'semana': 'W-SUN', 'mes': 'M'}
+
+# Promedios por periodo calculados en memoria sobre un subconjunto de lecturas ya cargado
+# (por ejemplo, las de un solo responsable, que no tienen agregados propios en la tabla).
+def agregar_lecturas(fechas, sistolica, diastolica, resolucion):
+    import pandas as pd
+
+    lecturas = pd.DataFrame({'sistolica': list(sistolica), 'diastolica': list(diastolica)})
+    lecturas['periodo'] = pd.DatetimeIndex(fechas).to_period(PERIODOS_PANDAS[resolucion]).start_time
+    por_periodo = lecturas.groupby('periodo')
+    return pd.DataFrame({
+        'lecturas': por_periodo.size(),
+        'promedio_sistolica': por_periodo['sistolica'].mean(),
+        'promedio_diastolica': por_periodo['diastolica'].mean(),
+    }).reset_index()
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye los agregados diarios, semanales y mensuales de las mediciones.")
+    parser.add_argument('ruta_bd', nargs='?', default='presion_arterial.db')
+    parser.add_argument('--reconstruir', action='store_true', required=True, help="Recalcula los agregados desde el historial completo.")
+    args = parser.parse_args()
+
+    from migraciones import aplicar_migraciones
+    conn = sqlite3.connect(args.ruta_bd)
+    try:
+        aplicar_migraciones(conn)
+        with conn:
+            reconstruir(conn)
+        for resolucion, total in conn.execute("SELECT resolucion, COUNT(*) FROM agregados_mediciones GROUP BY resolucion"):
+            print(f"{resolucion}: {total} periodos")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
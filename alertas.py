@@ -0,0 +1,126 @@
+import argparse
+import sqlite3
+
+from diagnostico import expresion_sql_codigo
+from tiempo import a_local
+
+# Alertas en tiempo real sobre las mediciones nuevas.
+# Un trigger AFTER INSERT sobre mediciones clasifica cada lectura con la misma expresión que
+# generar_diagnostico (tiempo constante, sin consultar el historial) y, si corresponde, deja
+# un evento en la tabla alertas, que las aplicaciones muestran como bandeja de entrada:
+#
+#   crisis     lectura de crisis hipertensiva (≥180 o ≥120)
+#   escalada   LECTURAS_ESCALADA lecturas altas (≥140 o ≥90) del paciente en VENTANA_HORAS horas
+#
+# La regla de escalada se evalúa de forma incremental con una ventana deslizante por paciente:
+# ventana_alertas guarda solo las lecturas altas recientes. Con cada lectura alta se descartan
+# las que quedaron fuera de la ventana, se agrega la nueva y se cuentan las que quedan; al
+# disparar la alerta la ventana del paciente se vacía para no repetirla con cada lectura.
+#
+# Solo generan alertas las lecturas tomadas en las últimas ANTIGUEDAD_MAXIMA_HORAS horas: una
+# importación de historial antiguo no llena la bandeja. Las lecturas con fecha futura (un año
+# mal escrito o un tensiómetro con el reloj adelantado) más allá de TOLERANCIA_FUTURO_MINUTOS
+# generan la alerta de crisis pero no entran en la ventana: allí no caducarían nunca.
+#
+# Uso: python alertas.py [ruta_bd] [--atender-todas]
+
+LECTURAS_ESCALADA = 3
+VENTANA_HORAS = 24
+ANTIGUEDAD_MAXIMA_HORAS = 24
+TOLERANCIA_FUTURO_MINUTOS = 10
+
+# Códigos de diagnostico.DIAGNOSTICOS que cuentan como lectura alta y como crisis.
+CODIGOS_ALTOS = (1, 3)
+CODIGO_CRISIS = 3
+
+TIPOS = {
+    'crisis': "Crisis hipertensiva",
+    'escalada': f"{LECTURAS_ESCALADA} lecturas altas en {VENTANA_HORAS} h",
+}
+
+def _sentencias_trigger():
+    codigo = expresion_sql_codigo('NEW.sistolica', 'NEW.diastolica')
+    ventana = f"(SELECT COUNT(*) FROM ventana_alertas WHERE id_paciente = NEW.id_paciente)"
+    ahora = "CAST(strftime('%s', 'now') AS INTEGER)"
+    columnas = "tipo, id_paciente, id_responsable, id_medicion, fecha, sistolica, diastolica, creada"
+    valores = f"NEW.id_paciente, NEW.id_responsable, NEW.id, NEW.fecha, NEW.sistolica, NEW.diastolica, {ahora}"
+    en_ventana = f"NEW.fecha <= {ahora} + {TOLERANCIA_FUTURO_MINUTOS * 60}"
+    return f"""
+    CREATE TRIGGER alertas_mediciones_insert AFTER INSERT ON mediciones
+    WHEN {codigo} IN {CODIGOS_ALTOS}
+        AND NEW.fecha >= {ahora} - {ANTIGUEDAD_MAXIMA_HORAS * 3600}
+    BEGIN
+        INSERT INTO alertas ({columnas}) SELECT 'crisis', {valores} WHERE {codigo} = {CODIGO_CRISIS};
+        DELETE FROM ventana_alertas
+        WHERE id_paciente = NEW.id_paciente AND segundos <= NEW.fecha - {VENTANA_HORAS * 3600} AND {en_ventana};
+        INSERT OR IGNORE INTO ventana_alertas (id_paciente, segundos, id_medicion)
+        SELECT NEW.id_paciente, NEW.fecha, NEW.id WHERE {en_ventana};
+        INSERT INTO alertas ({columnas}) SELECT 'escalada', {valores} WHERE {en_ventana} AND {ventana} >= {LECTURAS_ESCALADA};
+        DELETE FROM ventana_alertas WHERE id_paciente = NEW.id_paciente AND {en_ventana} AND {ventana} >= {LECTURAS_ESCALADA};
+    END
+    """
+
+# Quita el trigger; las mediciones insertadas hasta instalar() no generan alertas.
+def eliminar_triggers(conn):
+    conn.execute("DROP TRIGGER IF EXISTS alertas_mediciones_insert")
+
+# (Re)crea el trigger con la definición actual. Las alertas ya generadas no se tocan y el
+# historial no se vuelve a evaluar; sí se quitan de la ventana las lecturas con fecha futura
+# que entraron con definiciones anteriores.
+def instalar(conn):
+    eliminar_triggers(conn)
+    conn.execute(_sentencias_trigger())
+    conn.execute(f"DELETE FROM ventana_alertas WHERE segundos > CAST(strftime('%s', 'now') AS INTEGER) + {TOLERANCIA_FUTURO_MINUTOS * 60}")
+
+# Alertas más recientes primero, con el nombre del paciente. Con id_responsable solo las de
+# las mediciones que registró ese responsable; despues_de_id permite pedir solo las nuevas.
+def obtener_alertas(conn, id_responsable=None, solo_pendientes=True, despues_de_id=0, limite=50):
+    condiciones, parametros = ["a.id > ?"], [despues_de_id]
+    if solo_pendientes:
+        condiciones.append("a.atendida = 0")
+    if id_responsable is not None:
+        condiciones.append("a.id_responsable = ?")
+        parametros.append(id_responsable)
+    cursor = conn.execute(f"""
+        SELECT a.id, a.tipo, p.nombre AS paciente, a.fecha, a.sistolica, a.diastolica, a.creada
+        FROM alertas a LEFT JOIN pacientes p ON p.id = a.id_paciente
+        WHERE {' AND '.join(condiciones)}
+        ORDER BY a.id DESC LIMIT ?
+    """, parametros + [limite])
+    columnas = [descripcion[0] for descripcion in cursor.description]
+    return [dict(zip(columnas, fila)) for fila in cursor]
+
+# Número de alertas pendientes (todas o las de un responsable).
+def contar_pendientes(conn, id_responsable=None):
+    if id_responsable is None:
+        return conn.execute("SELECT COUNT(*) FROM alertas WHERE atendida = 0").fetchone()[0]
+    return conn.execute("SELECT COUNT(*) FROM alertas WHERE atendida = 0 AND id_responsable = ?", (id_responsable,)).fetchone()[0]
+
+# Sentencia (sql, parámetros) que marca como atendidas las alertas pendientes hasta hasta_id,
+# para ejecutarla en el escritor de la aplicación o con conn.execute.
+def sentencia_atender(hasta_id, id_responsable=None):
+    if id_responsable is None:
+        return "UPDATE alertas SET atendida = 1 WHERE atendida = 0 AND id <= ?", (hasta_id,)
+    return "UPDATE alertas SET atendida = 1 WHERE atendida = 0 AND id <= ? AND id_responsable = ?", (hasta_id, id_responsable)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandeja de alertas de presión arterial.")
+    parser.add_argument('ruta_bd', nargs='?', default='presion_arterial.db')
+    parser.add_argument('--atender-todas', action='store_true', help="Marca como atendidas todas las alertas pendientes.")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.ruta_bd)
+    try:
+        pendientes = obtener_alertas(conn, limite=1000)
+        for alerta in pendientes:
+            print(f"[{alerta['id']}] {TIPOS[alerta['tipo']]}: {alerta['paciente']} {alerta['sistolica']}/{alerta['diastolica']} ({a_local(alerta['fecha']):%Y-%m-%d %H:%M})")
+        print(f"{contar_pendientes(conn)} alertas pendientes.")
+        if args.atender_todas and pendientes:
+            with conn:
+                conn.execute(*sentencia_atender(pendientes[0]['id']))
+            print("Alertas marcadas como atendidas.")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
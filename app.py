@@ -1,15 +1,13 @@
 import os
 import streamlit as st
-from PIL import Image
 import pandas as pd
 import sqlite3
-import pytz
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-
-# Define la zona horaria de Colombia
-colombia_zone = pytz.timezone('America/Bogota')
+from migraciones import aplicar_migraciones
+from graficas import MOTORES, mostrar_grafica_presion
+from datos import cargar_pacientes_con_historial, cargar_mediciones, agrupar_por_paciente
+from diagnostico import generar_diagnostico
+from tiempo import a_epoch, serie_local
 
 # Configuración inicial de la página de Streamlit.
 st.set_page_config(
@@ -23,9 +21,14 @@ st.set_page_config(
     }
 )
 
-# Carga y muestra el logo de la aplicación.
-logo = Image.open('img/logo.png')
-st.image(logo, width=250)
+# Logo de la aplicación: el archivo se lee una vez por proceso y se envía como bytes PNG,
+# sin decodificarlo con PIL en cada rerun.
+@st.cache_resource(show_spinner=False)
+def cargar_logo(ruta='img/logo.png'):
+    with open(ruta, 'rb') as archivo:
+        return archivo.read()
+
+st.image(cargar_logo(), width=250)
 
 # Título principal y descripción de la aplicación.
 st.title('Monitoreo de Presión Arterial')
@@ -54,27 +57,17 @@ if conn is None:
 
 c = conn.cursor()
 
-# Creación de las tablas en la base de datos si no existen.
-c.execute('''
-CREATE TABLE IF NOT EXISTS pacientes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nombre TEXT,
-    edad INTEGER,
-    historial TEXT
-)
-''')
-
-c.execute('''
-CREATE TABLE IF NOT EXISTS mediciones (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    id_paciente INTEGER,
-    fecha TIMESTAMP,
-    sistolica INTEGER,
-    diastolica INTEGER,
-    FOREIGN KEY(id_paciente) REFERENCES pacientes(id)
-)
-''')
-conn.commit()  # No olvides hacer commit después de crear las tablas.
+# Creación y actualización del esquema (tablas e índices) mediante migraciones versionadas,
+# una sola vez por proceso y no en cada rerun.
+@st.cache_resource(show_spinner=False)
+def preparar_esquema(ruta_bd):
+    conexion = sqlite3.connect(ruta_bd)
+    try:
+        return aplicar_migraciones(conexion)
+    finally:
+        conexion.close()
+
+preparar_esquema('presion_arterial.db')
 
 # Función para agregar pacientes a la base de datos.
 def agregar_paciente(nombre, edad, historial):
@@ -83,22 +76,9 @@ def agregar_paciente(nombre, edad, historial):
 
 # Función para agregar mediciones a la base de datos.
 def agregar_medicion(id_paciente, fecha, sistolica, diastolica):
-    c.execute("INSERT INTO mediciones (id_paciente, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?)", (id_paciente, fecha, sistolica, diastolica))
+    c.execute("INSERT INTO mediciones (id_paciente, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?)", (id_paciente, a_epoch(fecha), sistolica, diastolica))
     conn.commit()
 
-# Función para generar diagnósticos y recomendaciones basados en las mediciones de presión arterial.
-def generar_diagnostico(sistolica, diastolica):
-    if sistolica < 120 and diastolica < 80:
-        return ("Normal", "Mantener estilo de vida saludable y monitoreo regular.")
-    elif (140 <= sistolica or 90 <= diastolica) and (sistolica < 180 and diastolica < 120):
-        return ("Presión arterial alta", "Consultar con el médico para evaluación y posible tratamiento.")
-    elif 130 <= sistolica or 80 <= diastolica:
-        return ("Presión arterial alta (con factores de riesgo)", "Seguimiento cercano con el médico y considerar cambios en el estilo de vida.")
-    elif 180 <= sistolica or 120 <= diastolica:
-        return ("Presión arterial peligrosamente alta", "Buscar atención médica inmediata.")
-    else:
-        return ("Presión arterial elevada", "Monitorizar y consultar con el médico.")
-
 # Estilo CSS personalizado
 st.markdown(
     """
@@ -152,8 +132,9 @@ if st.sidebar.button("Agregar Paciente"):
 
 # Sección de la interfaz de usuario para agregar mediciones.
 st.sidebar.title("Agregar Mediciones")
-c.execute("SELECT id, nombre FROM pacientes")
-pacientes = c.fetchall()
+pacientes_df = cargar_pacientes_con_historial(conn)
+pacientes = list(pacientes_df[['id', 'nombre']].itertuples(index=False, name=None))
+historiales = dict(zip(pacientes_df['id'], pacientes_df['historial']))
 pacientes_dict = {nombre: id for id, nombre in pacientes}
 paciente_seleccionado = st.sidebar.selectbox("Seleccionar Paciente", options=pacientes_dict.keys())
 fecha_medicion = st.sidebar.date_input("Fecha de Medición")
@@ -165,33 +146,37 @@ if st.sidebar.button("Registrar Medición"):
     agregar_medicion(pacientes_dict[paciente_seleccionado], fecha_hora_medicion, sistolica, diastolica)
     st.sidebar.success("Medición registrada con éxito.")
 
+# Motor de gráficas: imagen de matplotlib o gráfica nativa dibujada en el navegador
+motor_graficas = st.sidebar.selectbox("Tipo de gráfica", options=MOTORES)
+
+# Carga de todas las mediciones en una sola consulta; se agrupan por paciente en memoria.
+try:
+    todas_mediciones = cargar_mediciones(conn)
+    # La fecha se guarda en segundos UTC y se muestra en hora de Bogotá.
+    todas_mediciones['fecha'] = serie_local(todas_mediciones['fecha'])
+    todas_mediciones['Fecha'] = todas_mediciones['fecha'].dt.strftime('%d/%m/%Y')
+    todas_mediciones['Hora'] = todas_mediciones['fecha'].dt.strftime('%I:%M %p')
+    mediciones_por_paciente = agrupar_por_paciente(todas_mediciones)
+except Exception as e:
+    st.error(f"Error al cargar las mediciones: {e}")
+    mediciones_por_paciente = {}
+sin_mediciones = pd.DataFrame()
+
 # Visualización de Datos y Generación de Diagnósticos
 for id_paciente, nombre in pacientes:
     with st.container():
         st.markdown(f"<div class='paciente-container'>", unsafe_allow_html=True)
         st.markdown(f"<h2 class='paciente-header'>Paciente: {nombre} (ID: {id_paciente})</h2>", unsafe_allow_html=True)
         
-        # Obtener y mostrar la historia clínica del paciente        
-        try:
-            c.execute("SELECT historial FROM pacientes WHERE id = ?", (id_paciente,))
-            historial_paciente = c.fetchone()[0]
-            with st.expander("Ver Historia Clínica"):
-                st.markdown(f"**Historia Clínica:**\n{historial_paciente}")
-        except sqlite3.DatabaseError as e:
-            st.error(f"Error al obtener la historia clínica: {e}")
-            continue
-        
-        try:
-            mediciones_df = pd.read_sql_query("SELECT * FROM mediciones WHERE id_paciente = ? ORDER BY fecha", conn, params=(id_paciente,))
-        except Exception as e:
-            st.error(f"Error al cargar las mediciones: {e}")
-            continue
+        # Mostrar la historia clínica del paciente (ya cargada junto con la lista de pacientes)
+        historial_paciente = historiales[id_paciente]
+        with st.expander("Ver Historia Clínica"):
+            st.markdown(f"**Historia Clínica:**\n{historial_paciente}")
+
+        mediciones_df = mediciones_por_paciente.get(id_paciente, sin_mediciones)
 
         if not mediciones_df.empty:
             try:
-                mediciones_df['fecha'] = pd.to_datetime(mediciones_df['fecha'])
-                mediciones_df['Fecha'] = mediciones_df['fecha'].dt.strftime('%d/%m/%Y')
-                mediciones_df['Hora'] = mediciones_df['fecha'].dt.strftime('%I:%M %p')
                 mediciones_df.rename(columns={'sistolica': 'Presión Sistólica (mmHg)', 'diastolica': 'Presión Diastólica (mmHg)'}, inplace=True)
                 
                 # Aquí asignamos el nombre del paciente a todas las filas en lugar del id_paciente.
@@ -207,24 +192,9 @@ for id_paciente, nombre in pacientes:
                 continue
 
             try:
-                # Asegúrate de que las fechas para el gráfico sean reconocidas en el formato adecuado
-                fig, ax = plt.subplots()
-                ax.plot(mediciones_df['fecha'], mediciones_df['Presión Sistólica (mmHg)'], label='Sistólica', color='blue')
-                ax.plot(mediciones_df['fecha'], mediciones_df['Presión Diastólica (mmHg)'], label='Diastólica', color='red')
-                ax.set_title('Evolución de la Presión Arterial')
-                ax.set_xlabel('Fecha y Hora')
-                ax.set_ylabel('Presión Arterial (mmHg)')
-
-                # Formatear el eje x para mostrar fecha y hora
-                ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m/%Y %I:%M %p'))
-                ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-                ax.xaxis.set_tick_params(rotation=45)
-                ax.grid(True)
-                ax.spines['top'].set_visible(False)
-                ax.spines['right'].set_visible(False)
-                ax.legend()
-                plt.tight_layout()
-                st.pyplot(fig)
+                # La imagen se guarda en caché por el contenido de la serie y solo se dibuja si cambió
+                mostrar_grafica_presion(mediciones_df['fecha'], mediciones_df['Presión Sistólica (mmHg)'], mediciones_df['Presión Diastólica (mmHg)'],
+                                        motor=motor_graficas, etiqueta_x='Fecha y Hora', formato_fecha='%d/%m/%Y %I:%M %p')
 
             except Exception as e:
                 st.error(f"Error al generar el gráfico: {e}")
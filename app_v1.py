@@ -1,3 +1,4 @@
+import io
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -69,10 +70,11 @@ def exportar_mediciones():
     df = pd.read_sql("SELECT * FROM mediciones", conn)
     conn.close()
 
-    with pd.ExcelWriter("mediciones.xlsx") as writer:
+    # El libro se escribe en memoria, sin dejar mediciones.xlsx en el directorio de trabajo.
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
         df.to_excel(writer)
-    with open("mediciones.xlsx", "rb") as file:
-        st.download_button(label="Descargar Mediciones", data=file, file_name="mediciones.xlsx")
+    st.download_button(label="Descargar Mediciones", data=buffer.getvalue(), file_name="mediciones.xlsx")
 
 # Creación de la tabla
 create_table()
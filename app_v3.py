@@ -4,6 +4,9 @@ import sqlite3
 from datetime import datetime
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from diagnostico import generar_diagnostico
+from migraciones import aplicar_migraciones
+from tiempo import a_epoch, serie_local
 
 # Configuración inicial de la página de Streamlit.
 st.set_page_config(
@@ -28,27 +31,18 @@ registrando y visualizando datos clave como la presión sistólica y diastólica
 conn = sqlite3.connect('presion_arterial.db')
 c = conn.cursor()
 
-# Creación de las tablas en la base de datos si no existen.
-c.execute('''
-CREATE TABLE IF NOT EXISTS pacientes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nombre TEXT,
-    edad INTEGER,
-    historial TEXT
-)
-''')
+# Creación y actualización del esquema mediante las migraciones versionadas, una sola vez por
+# proceso y antes de cualquier lectura o inserción: en una base de datos con fechas en texto, la
+# migración 8 las convierte a segundos UTC, el formato que escriben y leen estas aplicaciones.
+@st.cache_resource(show_spinner=False)
+def preparar_esquema(ruta_bd):
+    conexion = sqlite3.connect(ruta_bd)
+    try:
+        return aplicar_migraciones(conexion)
+    finally:
+        conexion.close()
 
-c.execute('''
-CREATE TABLE IF NOT EXISTS mediciones (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    id_paciente INTEGER,
-    fecha TIMESTAMP,
-    sistolica INTEGER,
-    diastolica INTEGER,
-    FOREIGN KEY(id_paciente) REFERENCES pacientes(id)
-)
-''')
-conn.commit()  # No olvides hacer commit después de crear las tablas.
+preparar_esquema('presion_arterial.db')
 
 # Función para agregar pacientes a la base de datos.
 def agregar_paciente(nombre, edad, historial):
@@ -57,22 +51,9 @@ def agregar_paciente(nombre, edad, historial):
 
 # Función para agregar mediciones a la base de datos.
 def agregar_medicion(id_paciente, fecha, sistolica, diastolica):
-    c.execute("INSERT INTO mediciones (id_paciente, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?)", (id_paciente, fecha, sistolica, diastolica))
+    c.execute("INSERT INTO mediciones (id_paciente, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?)", (id_paciente, a_epoch(fecha), sistolica, diastolica))
     conn.commit()
 
-# Función para generar diagnósticos y recomendaciones basados en las mediciones de presión arterial.
-def generar_diagnostico(sistolica, diastolica):
-    if sistolica < 120 and diastolica < 80:
-        return ("Normal", "Mantener estilo de vida saludable y monitoreo regular.")
-    elif (140 <= sistolica or 90 <= diastolica) and (sistolica < 180 and diastolica < 120):
-        return ("Presión arterial alta", "Consultar con el médico para evaluación y posible tratamiento.")
-    elif 130 <= sistolica or 80 <= diastolica:
-        return ("Presión arterial alta (con factores de riesgo)", "Seguimiento cercano con el médico y considerar cambios en el estilo de vida.")
-    elif 180 <= sistolica or 120 <= diastolica:
-        return ("Presión arterial peligrosamente alta", "Buscar atención médica inmediata.")
-    else:
-        return ("Presión arterial elevada", "Monitorizar y consultar con el médico.")
-
 # Estilo CSS personalizado
 st.markdown(
     """
@@ -148,7 +129,8 @@ for id_paciente, nombre in pacientes:
         mediciones_df = pd.read_sql_query("SELECT * FROM mediciones WHERE id_paciente = ? ORDER BY fecha", conn, params=(id_paciente,))
         
         if not mediciones_df.empty:
-            mediciones_df['Fecha'] = pd.to_datetime(mediciones_df['fecha']).dt.tz_localize(None)
+            # La fecha se guarda en segundos UTC y se muestra en hora de Bogotá.
+            mediciones_df['Fecha'] = serie_local(mediciones_df['fecha'])
             mediciones_df.drop(columns=['fecha'], inplace=True)
             
             st.dataframe(mediciones_df)
@@ -1,49 +1,146 @@
+import atexit
 import streamlit as st
-import pandas as pd
-import sqlite3
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import json
+from migraciones import aplicar_migraciones
+from conexion import GestorConexiones
+from escritor_diferido import EscritorDiferido, EscrituraNoConfirmada
+from cache_mediciones import CacheMediciones
+import cambios
+from diagnostico import CATEGORIAS, generar_diagnostico
+from resumen import obtener_resumen
+from agregados import agregar_lecturas, elegir_resolucion, obtener_agregados
+from autenticacion import CredencialesAdministradores, buscar_responsable
+from tiempo import a_epoch, a_local, rango_dias, serie_local
+from instrumentacion import Instrumentacion, contar_filas, servir_metricas
+from clinicas import listar_clinicas, reporte_clinicas
+
+# Consultas más lentas que este umbral quedan en el registro del panel de rendimiento.
+UMBRAL_CONSULTA_LENTA_MS = 250
+# Puerto local (127.0.0.1) del endpoint de métricas en formato Prometheus; None lo desactiva.
+PUERTO_METRICAS = 9464
+# Segundos que una sesión espera la confirmación del escritor diferido antes de avisar de un error.
+ESPERA_CONFIRMACION_S = 30
+
+# Cada clínica tiene su propia base de datos (ver clinicas.py); el gestor de conexiones, la caché
+# y el escritor se crean una vez por archivo y se comparten entre las sesiones de esa clínica.
+
+# Gestor de conexiones compartido por todas las sesiones del proceso.
+# Cada hilo de Streamlit recibe su propia conexión (modo WAL), en lugar de compartir un cursor global.
+# Las migraciones del esquema se aplican una sola vez, al crear el gestor.
+@st.cache_resource(show_spinner=False)
+def obtener_gestor_conexiones(ruta_bd):
+    gestor = GestorConexiones(ruta_bd)
+    aplicar_migraciones(gestor.conexion())
+    return gestor
+
+# Caché de DataFrames de mediciones por (id_paciente, id_responsable), compartida entre sesiones.
+# Las funciones de escritura invalidan únicamente las claves afectadas.
+@st.cache_resource(show_spinner=False)
+def obtener_cache_mediciones(ruta_bd):
+    return CacheMediciones()
+
+# Hilo escritor único compartido por todas las sesiones: las inserciones se encolan y se
+# confirman juntas en una transacción. Al cerrar el proceso se escriben las pendientes. Cada
+# sesión espera la confirmación como mucho ESPERA_CONFIRMACION_S segundos.
+@st.cache_resource(show_spinner=False)
+def obtener_escritor(ruta_bd):
+    obtener_gestor_conexiones(ruta_bd)
+    escritor = EscritorDiferido(ruta_bd, espera_confirmacion=ESPERA_CONFIRMACION_S)
+    atexit.register(escritor.cerrar)
+    return escritor
 
-# Conexión con la base de datos SQLite
-conn = sqlite3.connect('presion_arterial.db', check_same_thread=False)
-c = conn.cursor()
+# Instrumentación compartida por todas las sesiones del proceso. El endpoint de métricas se
+# arranca una vez; si el puerto está ocupado (por ejemplo, por otro proceso de la aplicación)
+# solo queda el panel.
+@st.cache_resource(show_spinner=False)
+def obtener_instrumentacion():
+    instrumentacion = Instrumentacion(umbral_lenta_ms=UMBRAL_CONSULTA_LENTA_MS)
+    if PUERTO_METRICAS is not None:
+        try:
+            servir_metricas(instrumentacion, PUERTO_METRICAS)
+        except OSError:
+            pass
+    return instrumentacion
 
-# Definición de la función obtener_responsables después de crear el cursor c
+# Publica una vez por clínica las métricas de su cola de escritura y de su caché.
+@st.cache_resource(show_spinner=False)
+def registrar_metricas_clinica(nombre_clinica, ruta_bd):
+    etiquetas = {'clinica': nombre_clinica}
+    obtener_instrumentacion().agregar_fuente('escritor', obtener_escritor(ruta_bd).metricas, etiquetas)
+    cache = obtener_cache_mediciones(ruta_bd)
+    obtener_instrumentacion().agregar_fuente('cache', lambda: {
+        'entradas': len(cache), 'bytes_usados': cache.bytes_usados, 'aciertos': cache.aciertos, 'fallos': cache.fallos,
+    }, etiquetas)
+
+# Clínica de la sesión: la elegida al iniciar sesión o, en la pantalla de inicio de sesión, la
+# seleccionada en la lista (la primera por defecto).
+clinicas = listar_clinicas()
+nombre_clinica = st.session_state.get('clinica') or st.session_state.get('clinica_login')
+if nombre_clinica not in clinicas:
+    nombre_clinica = next(iter(clinicas))
+ruta_bd = clinicas[nombre_clinica]
+
+# Conexión con la base de datos SQLite de la clínica para el hilo de esta ejecución
+conn = obtener_gestor_conexiones(ruta_bd).conexion()
+cache_mediciones = obtener_cache_mediciones(ruta_bd)
+escritor = obtener_escritor(ruta_bd)
+instrumentacion = obtener_instrumentacion()
+registrar_metricas_clinica(nombre_clinica, ruta_bd)
+instrumentacion.instrumentar_conexion(conn)
+instrumentacion.iniciar_rerun(st.session_state.get('usuario') or '')
+
+# Definición de la función obtener_responsables después de obtener la conexión
+@instrumentacion.medir('obtener_responsables')
 def obtener_responsables():
-    c.execute("SELECT id, nombre FROM responsables")
-    return c.fetchall()
+    return conn.execute("SELECT id, nombre FROM responsables").fetchall()
 
 # Funciones para agregar responsables, pacientes y mediciones.
+# Las inserciones pasan por el escritor diferido y cada función espera su confirmación antes
+# de invalidar en la caché solo las entradas que su inserción puede cambiar.
 def agregar_responsable(nombre, rol):
-    c.execute("INSERT INTO responsables (nombre, rol) VALUES (?, ?)", (nombre, rol))
-    conn.commit()
+    id_responsable = escritor.ejecutar("INSERT INTO responsables (nombre, rol) VALUES (?, ?)", (nombre, rol))
+    cache_mediciones.invalidar_responsable(id_responsable)
 
 def agregar_paciente(nombre, edad, historial):
-    c.execute("INSERT INTO pacientes (nombre, edad, historial) VALUES (?, ?, ?)", (nombre, edad, historial))
-    conn.commit()
+    id_paciente = escritor.ejecutar("INSERT INTO pacientes (nombre, edad, historial) VALUES (?, ?, ?)", (nombre, edad, historial))
+    cache_mediciones.invalidar_paciente(id_paciente)
+    invalidar_lista_pacientes()
 
 def agregar_medicion(id_paciente, id_responsable, fecha, sistolica, diastolica):
-    c.execute("INSERT INTO mediciones (id_paciente, id_responsable, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?, ?)", (id_paciente, id_responsable, fecha, sistolica, diastolica))
-    conn.commit()
-
-# Cargar administradores desde JSON
-def cargar_administradores():
-    try:
-        with open('administradores.json', encoding='utf-8') as file:
-            return json.load(file)
-    except FileNotFoundError:
-        st.error("El archivo de administradores no se encuentra.")
-        return []
-
-# Verificar si el usuario es administrador
-def es_admin(usuario, contraseña):
-    administradores = cargar_administradores()
-    for admin in administradores:
-        if admin.get('usuario') == usuario and admin.get('contraseña') == contraseña:
-            return True
-    return False
+    escritor.ejecutar("INSERT INTO mediciones (id_paciente, id_responsable, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?, ?)", (id_paciente, id_responsable, a_epoch(fecha), sistolica, diastolica))
+    # La vista del administrador (sin responsable) y la del responsable que registró la medición,
+    # en cualquier rango de fechas, y los agregados del paciente (claves (id_paciente, 'agregados:...')).
+    cache_mediciones.invalidar_si(lambda clave: isinstance(clave, tuple) and clave[0] == id_paciente
+                                  and (clave[1] in (None, id_responsable) or isinstance(clave[1], str)))
+    # El resumen del paciente aparece en la página de pacientes.
+    invalidar_lista_pacientes()
+
+# La lista completa y las páginas de pacientes se guardan con claves que empiezan por CLAVE_LISTA_PACIENTES.
+def invalidar_lista_pacientes():
+    cache_mediciones.invalidar_si(lambda clave: isinstance(clave, str) and clave.startswith(CLAVE_LISTA_PACIENTES))
+
+# Cambios hechos por otros procesos (servicio de ingesta, gestor de base de datos, importación
+# por consola): al empezar cada rerun se compara la versión de los datos con la última vista.
+# Las mediciones y los pacientes nuevos invalidan solo sus claves; una edición o un borrado
+# vacía la caché.
+def sincronizar_cache():
+    version = cambios.version_datos(conn)
+    anterior = cache_mediciones.cambiar_version(version)
+    if anterior is None or anterior == version:
+        return
+    ultima_medicion, ultimo_paciente, ediciones = version
+    if ediciones != anterior[2]:
+        cache_mediciones.invalidar_todo()
+        return
+    if ultima_medicion != anterior[0]:
+        for id_paciente in cambios.pacientes_con_mediciones_nuevas(conn, anterior[0], ultima_medicion):
+            cache_mediciones.invalidar_paciente(id_paciente)
+    invalidar_lista_pacientes()
+
+# Credenciales de los administradores, compartidas por todas las sesiones y releídas solo si cambia el archivo.
+@st.cache_resource(show_spinner=False)
+def obtener_credenciales():
+    return CredencialesAdministradores()
 
 
 # Configuración inicial de la página de Streamlit
@@ -73,124 +170,216 @@ if 'autenticado' not in st.session_state:
 
 with st.sidebar:
     if not st.session_state['autenticado']:
+        # Con varias clínicas, el usuario elige la suya: los responsables, pacientes y mediciones
+        # de cada clínica están en su propia base de datos.
+        if len(clinicas) > 1:
+            st.selectbox("Clínica", options=list(clinicas), key="clinica_login")
         nombre_usuario = st.text_input("Nombre de Usuario", key="nombre_usuario")
         contraseña_usuario = st.text_input("Contraseña", type="password", key="contraseña_usuario")
         if st.button("Iniciar Sesión", key="boton_iniciar_sesion"):
-            if es_admin(nombre_usuario, contraseña_usuario):
+            credenciales = obtener_credenciales()
+            if not credenciales.disponible():
+                st.error("El archivo de administradores no se encuentra.")
+            if credenciales.verificar(nombre_usuario, contraseña_usuario):
+                st.session_state['clinica'] = nombre_clinica
                 st.session_state['autenticado'] = True
                 st.session_state['usuario'] = nombre_usuario
                 st.session_state['rol'] = 'Administrador'
                 st.success("Inicio de sesión como Administrador.")
             else:
-                responsables = obtener_responsables()
-                if nombre_usuario in [resp[1] for resp in responsables]:
+                id_responsable = buscar_responsable(conn, nombre_usuario)
+                if id_responsable is not None:
+                    st.session_state['clinica'] = nombre_clinica
                     st.session_state['autenticado'] = True
                     st.session_state['usuario'] = nombre_usuario
                     st.session_state['rol'] = 'Responsable'
+                    st.session_state['id_responsable'] = id_responsable
                     st.success("Inicio de sesión como Responsable.")
                 else:
                     st.error("Inicio de sesión fallido. Verifica tus credenciales.")
     else:
         st.write(f"Bienvenido, {st.session_state['usuario']}!")
+        if len(clinicas) > 1:
+            st.caption(f"Clínica: {nombre_clinica}")
 
 
 # Verificar si el usuario está autenticado para mostrar el contenido de la aplicación
 if not st.session_state['autenticado']:
     st.warning("Por favor, inicia sesión.")
+    # El rerun de la pantalla de inicio de sesión se registra aquí, antes de detener el script.
+    instrumentacion.terminar_rerun()
     st.stop()  # Detiene la ejecución del resto del script si no está autenticado
 
-# Crear tabla de responsables si no existe.
-c.execute('''
-CREATE TABLE IF NOT EXISTS responsables (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nombre TEXT,
-    rol TEXT
-)
-''')
-
-# Crear tabla de pacientes si no existe.
-c.execute('''
-CREATE TABLE IF NOT EXISTS pacientes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nombre TEXT,
-    edad INTEGER,
-    historial TEXT
-)
-''')
-
-# Crear tabla de mediciones si no existe.
-c.execute('''
-CREATE TABLE IF NOT EXISTS mediciones (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    id_paciente INTEGER,
-    id_responsable INTEGER,
-    fecha TIMESTAMP,
-    sistolica INTEGER,
-    diastolica INTEGER,
-    FOREIGN KEY(id_paciente) REFERENCES pacientes(id),
-    FOREIGN KEY(id_responsable) REFERENCES responsables(id)
-)
-''')
-conn.commit()
+# Módulos pesados (pandas y numpy; matplotlib se carga al dibujar): solo se importan con la sesión
+# iniciada, de modo que la pantalla de inicio de sesión no paga su carga.
+import pandas as pd
+from graficas import MOTORES, mostrar_grafica_presion
+from datos import listar_pacientes_pagina
+from importar_mediciones import importar_mediciones
+from exportar import FORMATOS, TIPOS_MIME, exportar_mediciones
+from alertas import TIPOS as TIPOS_ALERTA, contar_pendientes, obtener_alertas, sentencia_atender
+import poblacion
+
+# La gráfica (PNG de matplotlib o gráfica nativa) se mide como una operación más.
+mostrar_grafica_presion = instrumentacion.medir('mostrar_grafica_presion', tipo='grafica')(mostrar_grafica_presion)
+
+# Función para obtener la lista de pacientes (id, nombre), guardada en la caché hasta que se agregue un paciente.
+CLAVE_LISTA_PACIENTES = 'pacientes'
+
+sincronizar_cache()
+
+def obtener_lista_pacientes():
+    return cache_mediciones.obtener(CLAVE_LISTA_PACIENTES, lambda: conn.execute("SELECT id, nombre FROM pacientes").fetchall())
+
+# Función para obtener una página de pacientes (keyset por id), también guardada en la caché.
+@instrumentacion.medir('obtener_pagina_pacientes')
+def obtener_pagina_pacientes(despues_de_id, tamano_pagina, busqueda):
+    clave = f"{CLAVE_LISTA_PACIENTES}:{despues_de_id}:{tamano_pagina}:{busqueda}"
+    return cache_mediciones.obtener(clave, lambda: listar_pacientes_pagina(conn, despues_de_id, tamano_pagina, busqueda))
 
 # Función para obtener la lista actualizada de pacientes
+@instrumentacion.medir('cargar_pacientes', filas=len)
 def cargar_pacientes():
-    c.execute("SELECT id, nombre FROM pacientes")
-    return {nombre: id for id, nombre in c.fetchall()}
+    return {nombre: id for id, nombre in obtener_lista_pacientes()}
+
+# Función para obtener el id del responsable con sesión iniciada; se guarda en el estado de la sesión.
+def obtener_id_responsable_actual():
+    if 'id_responsable' not in st.session_state:
+        st.session_state['id_responsable'] = buscar_responsable(conn, st.session_state['usuario'])
+    return st.session_state['id_responsable']
+
+# Segundos entre consultas de la bandeja de alertas.
+INTERVALO_ALERTAS = 15
+
+# Bandeja de alertas (crisis y escaladas generadas por el trigger de alertas.py). El fragmento
+# se vuelve a ejecutar cada INTERVALO_ALERTAS segundos sin recargar la página y avisa con un
+# toast de las alertas que la sesión todavía no había visto. El administrador ve todas; un
+# responsable, las de las mediciones que registró.
+@st.fragment(run_every=INTERVALO_ALERTAS)
+@instrumentacion.medir('mostrar_bandeja_alertas', tipo='vista')
+def mostrar_bandeja_alertas(id_responsable):
+    conn_alertas = obtener_gestor_conexiones(ruta_bd).conexion()
+    instrumentacion.instrumentar_conexion(conn_alertas)
+    pendientes = obtener_alertas(conn_alertas, id_responsable)
+    ultima_vista = st.session_state.get('ultima_alerta_vista', 0)
+    for alerta in [alerta for alerta in pendientes if alerta['id'] > ultima_vista][:3]:
+        st.toast(f"{TIPOS_ALERTA[alerta['tipo']]}: {alerta['paciente']} {alerta['sistolica']}/{alerta['diastolica']} mmHg", icon="🚨")
+    if pendientes:
+        st.session_state['ultima_alerta_vista'] = max(ultima_vista, pendientes[0]['id'])
+    with st.expander(f"Alertas ({contar_pendientes(conn_alertas, id_responsable)})", expanded=bool(pendientes)):
+        if not pendientes:
+            st.write("Sin alertas pendientes.")
+        for alerta in pendientes:
+            st.markdown(f"**{TIPOS_ALERTA[alerta['tipo']]}** · {alerta['paciente']}: "
+                        f"{alerta['sistolica']}/{alerta['diastolica']} mmHg ({a_local(alerta['fecha']):%Y-%m-%d %H:%M})")
+        if pendientes and st.button("Marcar como atendidas", key="atender_alertas"):
+            try:
+                escritor.ejecutar(*sentencia_atender(pendientes[0]['id'], id_responsable))
+            except EscrituraNoConfirmada as e:
+                st.error(str(e))
+            instrumentacion.terminar_rerun()
+            st.rerun()
 
 # Inicialización de la lista de pacientes en el estado de la sesión
 if 'pacientes_dict' not in st.session_state:
     st.session_state['pacientes_dict'] = cargar_pacientes()
     
-# Función para generar diagnósticos y recomendaciones basados en las mediciones de presión arterial.
-def generar_diagnostico(sistolica, diastolica):
-    if sistolica < 120 and diastolica < 80:
-        return ("Normal", "Mantener estilo de vida saludable y monitoreo regular.")
-    elif (140 <= sistolica or 90 <= diastolica) and (sistolica < 180 and diastolica < 120):
-        return ("Presión arterial alta", "Consultar con el médico para evaluación y posible tratamiento.")
-    elif 130 <= sistolica or 80 <= diastolica:
-        return ("Presión arterial alta (con factores de riesgo)", "Seguimiento cercano con el médico y considerar cambios en el estilo de vida.")
-    elif 180 <= sistolica or 120 <= diastolica:
-        return ("Presión arterial peligrosamente alta", "Buscar atención médica inmediata.")
-    else:
-        return ("Presión arterial elevada", "Monitorizar y consultar con el médico.")
  
-def mostrar_datos_paciente(mediciones_df):
-    mediciones_df['Fecha'] = pd.to_datetime(mediciones_df['fecha']).dt.tz_localize(None)
-    mediciones_df.drop(columns=['fecha'], inplace=True)
+# Rango de fechas (días locales, ambos incluidos) de la sección de un paciente. Por defecto va
+# de la primera a la última medición del resumen precalculado.
+def elegir_rango_fechas(resumen_paciente, id_paciente, id_responsable=None):
+    primera, ultima = a_local(resumen_paciente['primera_fecha']).date(), a_local(resumen_paciente['ultima_fecha']).date()
+    rango = st.date_input("Rango de fechas", value=(primera, ultima), key=f"rango_fechas_{id_paciente}_{id_responsable}")
+    return (rango[0], rango[-1]) if len(rango) else (primera, ultima)
+
+# Tabla, gráfica y diagnóstico de las mediciones de un paciente en el rango desde-hasta.
+@instrumentacion.medir('mostrar_datos_paciente', tipo='vista')
+def mostrar_datos_paciente(mediciones_df, id_paciente, id_responsable, desde, hasta):
+    # Se trabaja sobre una copia: el DataFrame recibido puede venir de la caché compartida.
+    # La fecha se guarda en segundos UTC y se muestra en hora de Bogotá.
+    mediciones_df = mediciones_df.assign(Fecha=serie_local(mediciones_df['fecha'])).drop(columns=['fecha'])
     
     st.dataframe(mediciones_df)
 
-    fig, ax = plt.subplots()
-    ax.plot(mediciones_df['Fecha'], mediciones_df['sistolica'], label='Sistólica', color='blue')
-    ax.plot(mediciones_df['Fecha'], mediciones_df['diastolica'], label='Diastólica', color='red')
-    ax.set_title('Evolución de la Presión Arterial')
-    ax.set_xlabel('Fecha')
-    ax.set_ylabel('Presión Arterial (mmHg)')
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-    ax.xaxis.set_tick_params(rotation=45)
-    ax.grid(True)
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.legend()
-    plt.tight_layout()
-    st.pyplot(fig)
+    # La resolución de la gráfica (lecturas, días, semanas o meses) se elige según la amplitud del rango.
+    resolucion = elegir_resolucion(desde, hasta, len(mediciones_df))
+    motor = st.session_state.get('motor_graficas', 'matplotlib')
+    if resolucion == 'lecturas':
+        mostrar_grafica_presion(mediciones_df['Fecha'], mediciones_df['sistolica'], mediciones_df['diastolica'], motor=motor)
+    else:
+        if id_responsable is None:
+            serie = obtener_agregados_paciente(id_paciente, resolucion, desde, hasta)
+        else:
+            # Los agregados guardados incluyen las lecturas de todos los responsables.
+            serie = agregar_lecturas(mediciones_df['Fecha'], mediciones_df['sistolica'], mediciones_df['diastolica'], resolucion)
+        st.caption(f"Promedios por {NOMBRES_RESOLUCION[resolucion]} ({len(mediciones_df)} lecturas en el rango).")
+        mostrar_grafica_presion(serie['periodo'], serie['promedio_sistolica'], serie['promedio_diastolica'], motor=motor,
+                                etiqueta_x=NOMBRES_RESOLUCION[resolucion].capitalize(), formato_fecha='%Y-%m-%d')
     
-    ultima_medicion = mediciones_df.iloc[-1]
+    # Las mediciones llegan de la más reciente a la más antigua: se diagnostica la última del rango.
+    ultima_medicion = mediciones_df.iloc[0]
     diagnostico, recomendacion = generar_diagnostico(ultima_medicion['sistolica'], ultima_medicion['diastolica'])
     st.markdown(f"<div class='diagnostico-recomendacion'><strong>Diagnóstico:</strong> {diagnostico}</div>", unsafe_allow_html=True)
     st.markdown(f"<div class='diagnostico-recomendacion'><strong>Recomendación:</strong> {recomendacion}</div>", unsafe_allow_html=True) 
  
-def obtener_mediciones_con_nombres(id_paciente):
+NOMBRES_RESOLUCION = {'dia': 'día', 'semana': 'semana', 'mes': 'mes'}
+
+# Agregados guardados de un paciente en una resolución y rango de fechas.
+@instrumentacion.medir('obtener_agregados_paciente')
+def obtener_agregados_paciente(id_paciente, resolucion, desde, hasta):
+    clave = (id_paciente, f"agregados:{resolucion}:{desde}:{hasta}")
+    return cache_mediciones.obtener(clave, lambda: obtener_agregados(conn, id_paciente, resolucion, desde, hasta))
+
+# Resumen precalculado de un paciente (todas sus mediciones, de cualquier responsable).
+@instrumentacion.medir('obtener_resumen_paciente')
+def obtener_resumen_paciente(id_paciente):
+    return cache_mediciones.obtener(f"{CLAVE_LISTA_PACIENTES}:resumen:{id_paciente}", lambda: obtener_resumen(conn, id_paciente))
+
+# Encabezado del paciente con los agregados del resumen, sin recorrer sus mediciones.
+@instrumentacion.medir('mostrar_resumen_paciente', tipo='vista')
+def mostrar_resumen_paciente(resumen_paciente):
+    col_total, col_promedio, col_sistolica, col_diastolica = st.columns(4)
+    col_total.metric("Mediciones", resumen_paciente['total'])
+    col_promedio.metric("Promedio", f"{resumen_paciente['promedio_sistolica']:.0f}/{resumen_paciente['promedio_diastolica']:.0f}")
+    col_sistolica.metric("Sistólica mín./máx.", f"{resumen_paciente['min_sistolica']}/{resumen_paciente['max_sistolica']}")
+    col_diastolica.metric("Diastólica mín./máx.", f"{resumen_paciente['min_diastolica']}/{resumen_paciente['max_diastolica']}")
+    segundos_totales = sum(resumen_paciente['segundos_por_categoria'].values())
+    if segundos_totales > 0:
+        tiempo = ", ".join(
+            f"{CATEGORIAS[categoria]}: {segundos / segundos_totales:.0%}"
+            for categoria, segundos in sorted(resumen_paciente['segundos_por_categoria'].items())
+        )
+        st.caption(f"Tiempo en cada categoría: {tiempo}")
+
+# Mediciones de un paciente con los nombres de paciente y responsable.
+# Si se indica id_responsable, solo se devuelven las mediciones registradas por ese responsable.
+# desde y hasta (días locales, ambos incluidos) se convierten a segundos UTC y se filtran en
+# SQL con el índice por paciente y fecha, sin cargar el resto del historial.
+# El resultado se guarda en la caché por (id_paciente, id_responsable) o, con rango,
+# por (id_paciente, id_responsable, desde, hasta).
+@instrumentacion.medir('obtener_mediciones_con_nombres')
+def obtener_mediciones_con_nombres(id_paciente, id_responsable=None, desde=None, hasta=None):
     consulta = """
     SELECT m.id, p.nombre AS nombre_paciente, r.nombre AS nombre_responsable, m.sistolica, m.diastolica, m.fecha
     FROM mediciones m
     JOIN pacientes p ON m.id_paciente = p.id
     JOIN responsables r ON m.id_responsable = r.id
     WHERE m.id_paciente = ?
-    ORDER BY m.fecha DESC
     """
-    return pd.read_sql_query(consulta, conn, params=(id_paciente,))
+    params = [id_paciente]
+    if id_responsable is not None:
+        consulta += " AND m.id_responsable = ?"
+        params.append(id_responsable)
+    inicio, fin = rango_dias(desde, hasta)
+    if inicio is not None:
+        consulta += " AND m.fecha >= ?"
+        params.append(inicio)
+    if fin is not None:
+        consulta += " AND m.fecha < ?"
+        params.append(fin)
+    consulta += " ORDER BY m.fecha DESC"
+    clave = (id_paciente, id_responsable) if desde is None and hasta is None else (id_paciente, id_responsable, desde, hasta)
+    return cache_mediciones.obtener(clave, lambda: pd.read_sql_query(consulta, conn, params=params))
     
 # Estilo CSS personalizado
 st.markdown(
@@ -234,36 +423,8 @@ st.markdown(
     unsafe_allow_html=True
 ) 
 
-# Inicio de sesión y autenticación de usuario
-if 'autenticado' not in st.session_state:
-    st.session_state['autenticado'] = False
-    st.session_state['usuario'] = None
-    st.session_state['rol'] = None
-
-nombre_usuario = st.sidebar.text_input("Nombre de Usuario", key="nombre_usuario_login")
-contraseña_usuario = st.sidebar.text_input("Contraseña", type="password", key="contraseña_usuario_login")
-
-if not st.session_state['autenticado']:
-    if nombre_usuario and contraseña_usuario and st.sidebar.button("Iniciar Sesión", key="boton_iniciar_sesion"):
-        administradores = cargar_administradores()
-        if nombre_usuario in [admin['usuario'] for admin in administradores] and any(admin['contraseña'] == contraseña_usuario for admin in administradores):
-            st.session_state['autenticado'] = True
-            st.session_state['usuario'] = nombre_usuario
-            st.session_state['rol'] = 'Administrador'
-            st.sidebar.success("Inicio de sesión como Administrador.")
-        else:
-            responsables = obtener_responsables()
-            if nombre_usuario in [resp[1] for resp in responsables]:
-                st.session_state['autenticado'] = True
-                st.session_state['usuario'] = nombre_usuario
-                st.session_state['rol'] = 'Responsable'
-                st.sidebar.success("Inicio de sesión como Responsable.")
-            else:
-                st.sidebar.error("Inicio de sesión fallido. Verifica tus credenciales.")
-
-if not st.session_state['autenticado']:
-    st.warning("Por favor, inicia sesión.")
-    st.stop()
+with st.sidebar:
+    mostrar_bandeja_alertas(obtener_id_responsable_actual() if st.session_state['rol'] == 'Responsable' else None)
 
 # Interfaz para administrador para agregar responsables y pacientes
 if st.session_state['autenticado'] and st.session_state['rol'] == "Administrador":
@@ -271,8 +432,11 @@ if st.session_state['autenticado'] and st.session_state['rol'] == "Administrador
         st.header("Administrar Responsables")
         nombre_responsable = st.text_input("Nombre del Responsable", key="nombre_responsable")
         if st.button("Agregar Responsable", key="agregar_responsable"):
-            agregar_responsable(nombre_responsable, "Responsable")
-            st.success("Responsable agregado con éxito.")
+            try:
+                agregar_responsable(nombre_responsable, "Responsable")
+                st.success("Responsable agregado con éxito.")
+            except EscrituraNoConfirmada as e:
+                st.error(str(e))
 
     # Interfaz para agregar pacientes
     st.sidebar.title("Agregar Paciente")
@@ -280,21 +444,28 @@ if st.session_state['autenticado'] and st.session_state['rol'] == "Administrador
     edad_paciente = st.sidebar.number_input("Edad del Paciente", min_value=0, max_value=120, step=1)
     historial_paciente = st.sidebar.text_area("Historial Clínico")
     if st.sidebar.button("Agregar Paciente"):
-        agregar_paciente(nombre_paciente, edad_paciente, historial_paciente)
-        # Actualizar la lista de pacientes en el estado de la sesión
-        st.session_state['pacientes_dict'] = cargar_pacientes()
-        st.sidebar.success("Paciente agregado con éxito.")
-        # Para refrescar la lista de selección de pacientes en la interfaz
-        st.experimental_rerun()
+        try:
+            agregar_paciente(nombre_paciente, edad_paciente, historial_paciente)
+        except EscrituraNoConfirmada as e:
+            st.sidebar.error(str(e))
+        else:
+            # Actualizar la lista de pacientes en el estado de la sesión
+            st.session_state['pacientes_dict'] = cargar_pacientes()
+            st.sidebar.success("Paciente agregado con éxito.")
+            # Para refrescar la lista de selección de pacientes en la interfaz
+            instrumentacion.terminar_rerun()
+            st.rerun()
+
+    # Estado de la cola de escritura compartida por todas las sesiones.
+    with st.sidebar.expander("Cola de escritura"):
+        st.json(escritor.metricas())
 
 # Interfaz para agregar mediciones
 if 'rol' in st.session_state:
     # Identificar si el usuario es un administrador o responsable
     id_responsable_actual = None
     if st.session_state['rol'] == 'Responsable':
-        responsable_query = pd.read_sql_query("SELECT id FROM responsables WHERE nombre = ?", conn, params=(st.session_state['usuario'],))
-        if not responsable_query.empty:
-            id_responsable_actual = responsable_query.iloc[0]['id']
+        id_responsable_actual = obtener_id_responsable_actual()
     
     # Lista para seleccionar paciente
     pacientes_options = list(st.session_state['pacientes_dict'].keys())
@@ -309,67 +480,257 @@ if 'rol' in st.session_state:
     diastolica = st.sidebar.number_input("Presión Diastólica (mmHg)", min_value=30, max_value=150)
     if st.sidebar.button("Registrar Medición", key="registrar_medicion"):
         if id_responsable_actual is not None:  # Solo los responsables pueden registrar mediciones
-            agregar_medicion(st.session_state['pacientes_dict'][paciente_seleccionado], id_responsable_actual, fecha_hora_medicion, sistolica, diastolica)
-            st.sidebar.success("Medición registrada con éxito.")
+            try:
+                agregar_medicion(st.session_state['pacientes_dict'][paciente_seleccionado], id_responsable_actual, fecha_hora_medicion, sistolica, diastolica)
+                st.sidebar.success("Medición registrada con éxito.")
+            except EscrituraNoConfirmada as e:
+                st.sidebar.error(str(e))
+
+    # Importación masiva de mediciones desde un archivo CSV o Excel (una escritura del escritor diferido por lote)
+    with st.sidebar.expander("Importar mediciones"):
+        archivo_mediciones = st.file_uploader("Archivo CSV o Excel", type=['csv', 'xlsx'], key="archivo_mediciones")
+        st.caption("Columnas: paciente (o id_paciente), fecha, sistolica, diastolica y, opcionalmente, responsable.")
+        if archivo_mediciones is not None:
+            id_responsable_importacion = id_responsable_actual
+            if id_responsable_actual is None:
+                # El administrador elige el responsable para las filas que no indiquen uno.
+                responsables_dict = {nombre: id for id, nombre in obtener_responsables()}
+                responsable_importacion = st.selectbox("Responsable por defecto", options=list(responsables_dict.keys()), key="responsable_importacion")
+                id_responsable_importacion = responsables_dict.get(responsable_importacion)
+            if st.button("Importar", key="importar_mediciones"):
+                # Los lotes pasan por el escritor diferido, como el resto de las escrituras.
+                try:
+                    with instrumentacion.operacion('importar_mediciones', tipo='vista'):
+                        resultado = importar_mediciones(conn, archivo_mediciones, archivo_mediciones.name, id_responsable_importacion, escritor=escritor)
+                except EscrituraNoConfirmada as e:
+                    # Los lotes anteriores ya están guardados; la caché se sincroniza en el siguiente rerun.
+                    st.error(f"La importación se detuvo: {e}")
+                else:
+                    for id_paciente in resultado.pacientes_afectados:
+                        cache_mediciones.invalidar_paciente(id_paciente)
+                    invalidar_lista_pacientes()
+                    st.success(f"{resultado.insertadas} mediciones importadas en {resultado.segundos:.1f} s ({resultado.filas_por_segundo:,.0f} filas/s).")
+                    if resultado.rechazadas:
+                        st.warning(f"{len(resultado.rechazadas)} filas rechazadas.")
+                        st.dataframe(resultado.rechazadas_df())
+
+    # Exportación de mediciones por lotes (los responsables solo exportan sus propias mediciones)
+    with st.sidebar.expander("Exportar mediciones"):
+        formato_exportacion = st.selectbox("Formato", options=FORMATOS, key="formato_exportacion")
+        paciente_exportacion = st.selectbox("Paciente", options=["Todos"] + pacientes_options, key="paciente_exportacion")
+        filtrar_fechas = st.checkbox("Filtrar por fechas", key="filtrar_fechas_exportacion")
+        desde_exportacion = st.date_input("Desde", key="desde_exportacion") if filtrar_fechas else None
+        hasta_exportacion = st.date_input("Hasta", key="hasta_exportacion") if filtrar_fechas else None
+        if st.button("Preparar exportación", key="preparar_exportacion"):
+            archivo_exportado = exportar_mediciones(
+                conn,
+                formato_exportacion,
+                id_paciente=st.session_state['pacientes_dict'].get(paciente_exportacion),
+                id_responsable=id_responsable_actual,
+                desde=desde_exportacion,
+                hasta=hasta_exportacion,
+            )
+            # Streamlit necesita los bytes del archivo final para servir la descarga.
+            with archivo_exportado:
+                datos_exportados = archivo_exportado.read()
+            st.download_button(label="Descargar Mediciones", data=datos_exportados, file_name=f"mediciones.{formato_exportacion}",
+                               mime=TIPOS_MIME[formato_exportacion], key="descargar_exportacion")
+
+# Motor de gráficas: imagen de matplotlib o gráfica nativa dibujada en el navegador
+st.sidebar.selectbox("Tipo de gráfica", options=MOTORES, key='motor_graficas')
+
+# Paginación de pacientes: se guarda la pila de ids desde los que empieza cada página visitada.
+def reiniciar_paginacion():
+    st.session_state['inicios_pagina'] = [0]
+
+def pagina_siguiente(ultimo_id):
+    st.session_state['inicios_pagina'].append(ultimo_id)
+
+def pagina_anterior():
+    st.session_state['inicios_pagina'].pop()
+
+# Lista paginada de pacientes. Las mediciones, la gráfica y el diagnóstico de un paciente
+# solo se cargan cuando se abre su sección, así que el primer dibujo depende del tamaño de página.
+@instrumentacion.medir('mostrar_lista_pacientes', tipo='vista')
+def mostrar_lista_pacientes(id_responsable=None):
+    if 'inicios_pagina' not in st.session_state:
+        reiniciar_paginacion()
+    tamano_pagina = st.sidebar.selectbox("Pacientes por página", options=[10, 20, 50, 100], index=1, key='tamano_pagina', on_change=reiniciar_paginacion)
+    busqueda = st.text_input("Buscar paciente por nombre", key='busqueda_paciente', on_change=reiniciar_paginacion).strip()
+
+    inicios = st.session_state['inicios_pagina']
+    pacientes_pagina, hay_siguiente = obtener_pagina_pacientes(inicios[-1], tamano_pagina, busqueda)
+    if not pacientes_pagina:
+        st.write("No se encontraron pacientes.")
+
+    for id_paciente, nombre, total, ultima_sistolica, ultima_diastolica, ultima_categoria in pacientes_pagina:
+        # La etiqueta sale del resumen precalculado: no se leen las mediciones de los pacientes cerrados.
+        etiqueta = f"Paciente: {nombre}"
+        if total:
+            etiqueta += f" — {total} mediciones, última {ultima_sistolica}/{ultima_diastolica} ({CATEGORIAS[ultima_categoria]})"
+        detalle = st.expander(etiqueta, key=f"detalle_paciente_{id_paciente}", on_change="rerun")
+        with detalle:
+            if detalle.open:
+                resumen_paciente = obtener_resumen_paciente(id_paciente)
+                if resumen_paciente is None:
+                    st.write("No hay mediciones disponibles para este paciente.")
+                else:
+                    mostrar_resumen_paciente(resumen_paciente)
+                    desde, hasta = elegir_rango_fechas(resumen_paciente, id_paciente, id_responsable)
+                    mediciones_df = obtener_mediciones_con_nombres(id_paciente, id_responsable, desde, hasta)
+                    if not mediciones_df.empty:
+                        mostrar_datos_paciente(mediciones_df, id_paciente, id_responsable, desde, hasta)
+                    else:
+                        st.write("No hay mediciones en el rango seleccionado.")
+
+    col_anterior, col_pagina, col_siguiente = st.columns(3)
+    col_anterior.button("Anterior", key="pagina_anterior", disabled=len(inicios) == 1, on_click=pagina_anterior)
+    col_pagina.write(f"Página {len(inicios)}")
+    if pacientes_pagina:
+        col_siguiente.button("Siguiente", key="pagina_siguiente", disabled=not hay_siguiente, on_click=pagina_siguiente, args=(pacientes_pagina[-1][0],))
+
+# Tablas de la página de población, guardadas en la caché con la lista de pacientes: se
+# invalidan con cada medición o paciente nuevo.
+def obtener_poblacion(nombre, cargar):
+    with instrumentacion.operacion(f"poblacion:{nombre.split(':')[0]}") as operacion:
+        resultado = cache_mediciones.obtener(f"{CLAVE_LISTA_PACIENTES}:poblacion:{nombre}", cargar)
+        operacion['filas'] = contar_filas(resultado)
+    return resultado
+
+# Página de población (solo administradores). Todas las agregaciones se hacen con GROUP BY en
+# SQLite sobre el resumen, los agregados y el índice por responsable (ver poblacion.py); a
+# pandas solo llegan las filas agregadas.
+@instrumentacion.medir('mostrar_poblacion', tipo='vista')
+def mostrar_poblacion():
+    totales = obtener_poblacion('totales', lambda: poblacion.totales_poblacion(conn))
+    col_pacientes, col_con_mediciones, col_lecturas, col_hipertension = st.columns(4)
+    col_pacientes.metric("Pacientes", f"{totales['pacientes']:,}")
+    col_con_mediciones.metric("Con mediciones", f"{totales['con_mediciones']:,}")
+    col_lecturas.metric("Lecturas", f"{totales['lecturas']:,}")
+    proporcion = totales['hipertensos'] / totales['con_mediciones'] if totales['con_mediciones'] else 0
+    col_hipertension.metric("Con hipertensión", f"{totales['hipertensos']:,}", f"{proporcion:.0%} de los pacientes con mediciones", delta_color='off')
+
+    st.subheader("Categoría de la última lectura")
+    por_categoria = obtener_poblacion('pacientes_por_categoria', lambda: poblacion.pacientes_por_categoria(conn))
+    st.bar_chart(por_categoria, x='categoria', y='pacientes', x_label="", y_label="Pacientes", horizontal=True)
+    lecturas_categoria = obtener_poblacion('lecturas_por_categoria', lambda: poblacion.lecturas_por_categoria(conn))
+    st.dataframe(lecturas_categoria, hide_index=True, column_config={
+        'categoria': "Categoría", 'lecturas': "Lecturas",
+        'fraccion_tiempo': st.column_config.ProgressColumn("Tiempo en la categoría", format="percent", min_value=0, max_value=1),
+    })
+
+    st.subheader("Bandas de edad")
+    por_edad = obtener_poblacion('pacientes_por_edad', lambda: poblacion.pacientes_por_edad(conn))
+    categorias_edad = [columna for columna in por_edad.columns if not columna.startswith('promedio_')]
+    st.bar_chart(por_edad[categorias_edad], x_label="Edad", y_label="Pacientes")
+    st.dataframe(por_edad)
+
+    st.subheader("Lecturas por responsable")
+    por_responsable = obtener_poblacion('lecturas_por_responsable', lambda: poblacion.lecturas_por_responsable(conn))
+    st.bar_chart(por_responsable.head(30), x='responsable', y='lecturas', x_label="", y_label="Lecturas", horizontal=True)
+    st.dataframe(por_responsable, hide_index=True)
+
+    st.subheader("Lecturas en el tiempo")
+    col_resolucion, col_rango = st.columns(2)
+    resolucion = col_resolucion.selectbox("Resolución", options=['mes', 'semana', 'dia'], format_func=lambda r: NOMBRES_RESOLUCION[r], key='resolucion_poblacion')
+    rango = col_rango.date_input("Rango de fechas", value=(), key='rango_poblacion')
+    desde, hasta = (rango[0], rango[-1]) if len(rango) else (None, None)
+    serie = obtener_poblacion(f"tiempo:{resolucion}:{desde}:{hasta}", lambda: poblacion.lecturas_en_el_tiempo(conn, resolucion, desde, hasta))
+    if serie.empty:
+        st.write("No hay mediciones en el rango seleccionado.")
+    else:
+        st.line_chart(serie, x='periodo', y=['lecturas', 'pacientes'], x_label=NOMBRES_RESOLUCION[resolucion].capitalize())
+        st.line_chart(serie, x='periodo', y=['promedio_sistolica', 'promedio_diastolica'], x_label=NOMBRES_RESOLUCION[resolucion].capitalize(), y_label="mmHg")
+
+# Reporte entre clínicas (solo administradores, con más de una clínica). Cada base de datos se
+# consulta en su propio hilo sobre las tablas derivadas y los resultados se unen (ver
+# clinicas.py); no pasa por la caché de mediciones, que es de una sola clínica. Antes se migra
+# cada archivo (una vez por proceso, al crear su gestor de conexiones), como el de la sesión.
+@instrumentacion.medir('mostrar_clinicas', tipo='vista')
+def mostrar_clinicas():
+    for ruta in clinicas.values():
+        obtener_gestor_conexiones(ruta)
+    resolucion = st.selectbox("Resolución", options=['mes', 'semana', 'dia'], format_func=lambda r: NOMBRES_RESOLUCION[r], key='resolucion_clinicas')
+    with instrumentacion.operacion('clinicas:reporte') as operacion:
+        reporte, segundos = reporte_clinicas(clinicas, resolucion)
+        operacion['filas'] = len(reporte['lecturas_en_el_tiempo'])
+
+    st.dataframe(reporte['totales'], hide_index=True, column_config={
+        'clinica': "Clínica", 'pacientes': "Pacientes", 'con_mediciones': "Con mediciones",
+        'lecturas': "Lecturas", 'hipertensos': "Con hipertensión",
+    })
+    st.subheader("Categoría de la última lectura")
+    st.bar_chart(reporte['pacientes_por_categoria'], x_label="", y_label="Pacientes", horizontal=True)
+    st.subheader("Lecturas en el tiempo")
+    serie = reporte['lecturas_en_el_tiempo']
+    if serie.empty:
+        st.write("No hay mediciones.")
+    else:
+        por_clinica = serie.pivot_table(index='periodo', columns='clinica', values='lecturas', aggfunc='sum', fill_value=0)
+        st.line_chart(por_clinica, x_label=NOMBRES_RESOLUCION[resolucion].capitalize(), y_label="Lecturas")
+    st.caption(f"{len(clinicas)} clínicas consultadas en paralelo en {segundos * 1000:.0f} ms.")
 
 # Visualización de Datos y Generación de Diagnósticos basada en el rol del usuario
 if st.session_state['autenticado']:
     if st.session_state['rol'] == 'Administrador':
-        # El administrador puede ver todas las mediciones
-        st.header("Visualización de Mediciones (Administrador)")
-        for id_paciente, nombre in c.execute("SELECT id, nombre FROM pacientes").fetchall():
-            with st.container():
-                st.markdown(f"<div class='paciente-container'>", unsafe_allow_html=True)
-                st.markdown(f"<h2 class='paciente-header'>Paciente: {nombre}</h2>", unsafe_allow_html=True)
-                
-                mediciones_df = obtener_mediciones_con_nombres(id_paciente)
-                
-                if not mediciones_df.empty:
-                    #st.dataframe(mediciones_df[['nombre_paciente', 'nombre_responsable', 'sistolica', 'diastolica', 'fecha']])
-                    mostrar_datos_paciente(mediciones_df)
-                else:
-                    st.write("No hay mediciones disponibles para este paciente.")
-                st.markdown("</div>", unsafe_allow_html=True)
-            st.markdown("---")
+        vistas = ["Pacientes", "Población"] + (["Clínicas"] if len(clinicas) > 1 else [])
+        vista = st.sidebar.radio("Vista", options=vistas, key='vista_administrador', horizontal=True)
+        if vista == "Clínicas":
+            st.header("Reporte de Clínicas (Administrador)")
+            mostrar_clinicas()
+        elif vista == "Población":
+            st.header("Población de Pacientes (Administrador)")
+            mostrar_poblacion()
+        else:
+            # El administrador puede ver todas las mediciones
+            st.header("Visualización de Mediciones (Administrador)")
+            mostrar_lista_pacientes()
     elif st.session_state['rol'] == 'Responsable':
         # Los responsables solo pueden ver las mediciones asociadas a ellos
         st.header("Visualización de Mediciones (Responsable)")
-        # Realizar consulta para obtener el id del responsable
-        responsable_df = pd.read_sql_query("SELECT id FROM responsables WHERE nombre = ?", conn, params=(st.session_state['usuario'],))
+        # Obtener el id del responsable (guardado en la sesión tras la primera consulta)
+        id_responsable = obtener_id_responsable_actual()
         
         # Verificar si el responsable existe en la base de datos antes de continuar
-        if not responsable_df.empty:
-            id_responsable = responsable_df.iloc[0]['id']
-            
-            # Mostrar las mediciones para cada paciente asignado a este responsable
-            for id_paciente, nombre in c.execute("SELECT id, nombre FROM pacientes").fetchall():
-                with st.container():
-                    st.markdown(f"<div class='paciente-container'>", unsafe_allow_html=True)
-                    st.markdown(f"<h2 class='paciente-header'>Paciente: {nombre}</h2>", unsafe_allow_html=True)
-                    
-                    # Solo se muestran las mediciones para las que este responsable es responsable
-                    mediciones_df = pd.read_sql_query("""
-                        SELECT m.id, p.nombre AS nombre_paciente, r.nombre AS nombre_responsable, m.sistolica, m.diastolica, m.fecha
-                        FROM mediciones m
-                        JOIN pacientes p ON m.id_paciente = p.id
-                        JOIN responsables r ON m.id_responsable = r.id
-                        WHERE m.id_paciente = ? AND m.id_responsable = ?
-                        ORDER BY m.fecha DESC
-                        """, conn, params=(id_paciente, id_responsable))
-                    
-                    if not mediciones_df.empty:
-                        #st.dataframe(mediciones_df[['nombre_paciente', 'nombre_responsable', 'sistolica', 'diastolica', 'fecha']])
-                        mostrar_datos_paciente(mediciones_df)
-                    else:
-                        st.write("No hay mediciones disponibles para este paciente.")
-                        st.markdown("</div>", unsafe_allow_html=True)
-                    st.markdown("---")
+        if id_responsable is not None:
+            mostrar_lista_pacientes(id_responsable)
 
-# Cerrar conexión con la base de datos
-conn.close()
+# Panel de rendimiento (solo administradores): reparto del tiempo de los últimos reruns entre
+# consultas, gráficas, vistas y el resto (Streamlit), operaciones instrumentadas y consultas
+# lentas de todo el proceso. El rerun actual aparece en el siguiente.
+def mostrar_panel_rendimiento():
+    with st.sidebar.expander("Rendimiento"):
+        reruns = instrumentacion.reruns_recientes()
+        if reruns:
+            ultimo = reruns[0]
+            col_total, col_consultas, col_filas = st.columns(3)
+            col_total.metric("Último rerun", f"{ultimo['total_ms']:.0f} ms")
+            col_consultas.metric("Consultas", ultimo['consultas'])
+            col_filas.metric("Filas", f"{ultimo['filas']:,}")
+            st.bar_chart(pd.DataFrame(reruns[:20]).set_index('fecha')[['consulta_ms', 'grafica_ms', 'vista_ms', 'resto_ms']].iloc[::-1],
+                         y_label="ms", height=200)
+        st.caption("Operaciones")
+        st.dataframe(pd.DataFrame(instrumentacion.operaciones()), hide_index=True)
+        lentas = instrumentacion.consultas_lentas()
+        st.caption(f"Consultas de más de {instrumentacion.umbral_lenta_ms} ms ({instrumentacion.total_lentas})")
+        for lenta in lentas[:10]:
+            st.markdown(f"**{lenta['operacion']}** · {lenta['ms']} ms · {lenta['filas']} filas · {lenta['fecha']}")
+            for sentencia in lenta['sentencias']:
+                st.code(sentencia, language='sql')
+        if instrumentacion.servidor_metricas is not None:
+            host, puerto = instrumentacion.servidor_metricas.server_address[:2]
+            st.caption(f"Métricas Prometheus: http://{host}:{puerto}/metrics")
+        else:
+            st.caption("El endpoint de métricas no está activo.")
+
+if st.session_state['rol'] == 'Administrador':
+    mostrar_panel_rendimiento()
 
 # Sección de footer
 st.sidebar.markdown('---')
 st.sidebar.subheader('Creado por:')
 st.sidebar.markdown('Alexander Oviedo Fadul')
-st.sidebar.markdown("[GitHub](https://github.com/bladealex9848) | [Website](https://alexander.oviedo.isabellaea.com/) | [Instagram](https://www.instagram.com/alexander.oviedo.fadul) | [Twitter](https://twitter.com/alexanderofadul) | [Facebook](https://www.facebook.com/alexanderof/) | [WhatsApp](https://api.whatsapp.com/send?phone=573015930519&text=Hola%20!Quiero%20conversar%20contigo!%20)")
\ No newline at end of file
+st.sidebar.markdown("[GitHub](https://github.com/bladealex9848) | [Website](https://alexander.oviedo.isabellaea.com/) | [Instagram](https://www.instagram.com/alexander.oviedo.fadul) | [Twitter](https://twitter.com/alexanderofadul) | [Facebook](https://www.facebook.com/alexanderof/) | [WhatsApp](https://api.whatsapp.com/send?phone=573015930519&text=Hola%20!Quiero%20conversar%20contigo!%20)")
+
+# Cierre del rerun para el panel de rendimiento (al final del script, después del footer).
+instrumentacion.terminar_rerun()
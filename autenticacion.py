@@ -0,0 +1,146 @@
+import argparse
+import functools
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+
+# Credenciales de los administradores (administradores.json) y búsqueda de responsables.
+# Las contraseñas se guardan como hash PBKDF2-SHA256 con sal propia, en el formato
+# pbkdf2_sha256$iteraciones$sal$hash, y se comparan en tiempo constante. Las entradas
+# antiguas con la contraseña en texto plano (clave "contraseña") se siguen aceptando
+# hasta migrar el archivo:
+#
+#   python autenticacion.py --migrar [ruta_json]
+#   python autenticacion.py --agregar USUARIO [ruta_json]
+
+RUTA_ADMINISTRADORES = 'administradores.json'
+ALGORITMO = 'pbkdf2_sha256'
+ITERACIONES = 600_000
+
+# Función para calcular el hash de una contraseña con una sal aleatoria.
+def hash_contraseña(contraseña, iteraciones=ITERACIONES, sal=None):
+    sal = sal if sal is not None else secrets.token_hex(16)
+    derivada = hashlib.pbkdf2_hmac('sha256', contraseña.encode('utf-8'), sal.encode('ascii'), iteraciones)
+    return f"{ALGORITMO}${iteraciones}${sal}${derivada.hex()}"
+
+# Función para comprobar una contraseña contra un hash guardado, en tiempo constante.
+def verificar_hash(contraseña, hash_guardado):
+    try:
+        algoritmo, iteraciones, sal, _ = hash_guardado.split('$')
+        iteraciones = int(iteraciones)
+    except (AttributeError, ValueError):
+        return False
+    if algoritmo != ALGORITMO:
+        return False
+    return hmac.compare_digest(hash_contraseña(contraseña, iteraciones, sal), hash_guardado)
+
+# Hash de referencia para que un usuario inexistente tarde lo mismo que uno existente.
+# Se calcula la primera vez que se necesita para no encarecer la importación del módulo.
+@functools.lru_cache(maxsize=1)
+def _hash_ficticio():
+    return hash_contraseña(secrets.token_hex(16))
+
+# Administradores por nombre de usuario, leídos una vez y releídos solo si el archivo cambia
+# (fecha de modificación o tamaño distintos).
+class CredencialesAdministradores:
+    def __init__(self, ruta=RUTA_ADMINISTRADORES):
+        self.ruta = ruta
+        self._administradores = {}
+        self._firma = None
+        self._lock = threading.Lock()
+
+    def _recargar_si_cambio(self):
+        try:
+            estado = os.stat(self.ruta)
+        except FileNotFoundError:
+            self._administradores, self._firma = {}, None
+            return
+        firma = (estado.st_mtime_ns, estado.st_size)
+        if firma == self._firma:
+            return
+        with self._lock:
+            if firma != self._firma:
+                with open(self.ruta, encoding='utf-8') as archivo:
+                    self._administradores = {admin['usuario']: admin for admin in json.load(archivo)}
+                self._firma = firma
+
+    # Indica si existe el archivo de administradores.
+    def disponible(self):
+        self._recargar_si_cambio()
+        return self._firma is not None
+
+    # Comprueba la contraseña del administrador indicado (y solo la suya).
+    def verificar(self, usuario, contraseña):
+        self._recargar_si_cambio()
+        admin = self._administradores.get(usuario)
+        if admin is None:
+            verificar_hash(contraseña, _hash_ficticio())
+            return False
+        if 'hash' in admin:
+            return verificar_hash(contraseña, admin['hash'])
+        # Entrada antigua en texto plano.
+        return hmac.compare_digest(admin.get('contraseña', '').encode('utf-8'), contraseña.encode('utf-8'))
+
+# Función para obtener el id de un responsable por su nombre (usa idx_responsables_nombre).
+def buscar_responsable(conn, nombre):
+    fila = conn.execute("SELECT id FROM responsables WHERE nombre = ?", (nombre,)).fetchone()
+    return fila[0] if fila else None
+
+# Escribe el archivo de administradores de forma atómica.
+def _guardar_administradores(ruta, administradores):
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(administradores, archivo, ensure_ascii=False, indent=4)
+        archivo.write('\n')
+    os.replace(temporal, ruta)
+
+# Reemplaza las contraseñas en texto plano por su hash. Devuelve cuántas entradas se migraron.
+def migrar_archivo(ruta=RUTA_ADMINISTRADORES):
+    with open(ruta, encoding='utf-8') as archivo:
+        administradores = json.load(archivo)
+    migradas = 0
+    for admin in administradores:
+        if 'contraseña' in admin:
+            admin['hash'] = hash_contraseña(admin.pop('contraseña'))
+            migradas += 1
+    if migradas:
+        _guardar_administradores(ruta, administradores)
+    return migradas
+
+# Agrega un administrador o cambia su contraseña.
+def agregar_administrador(usuario, contraseña, ruta=RUTA_ADMINISTRADORES):
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            administradores = json.load(archivo)
+    except FileNotFoundError:
+        administradores = []
+    administradores = [admin for admin in administradores if admin['usuario'] != usuario]
+    administradores.append({'usuario': usuario, 'hash': hash_contraseña(contraseña)})
+    _guardar_administradores(ruta, administradores)
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestiona las credenciales de los administradores.")
+    parser.add_argument('ruta_json', nargs='?', default=RUTA_ADMINISTRADORES)
+    accion = parser.add_mutually_exclusive_group(required=True)
+    accion.add_argument('--migrar', action='store_true', help="Reemplaza las contraseñas en texto plano por hashes con sal.")
+    accion.add_argument('--agregar', metavar='USUARIO', help="Agrega un administrador o cambia su contraseña.")
+    args = parser.parse_args()
+
+    if args.migrar:
+        migradas = migrar_archivo(args.ruta_json)
+        print(f"{migradas} contraseñas migradas en {args.ruta_json}.")
+    else:
+        contraseña = getpass.getpass("Contraseña: ")
+        if contraseña != getpass.getpass("Repite la contraseña: "):
+            print("Las contraseñas no coinciden.")
+            sys.exit(1)
+        agregar_administrador(args.agregar, contraseña, args.ruta_json)
+        print(f"Administrador {args.agregar} guardado en {args.ruta_json}.")
+
+if __name__ == '__main__':
+    main()
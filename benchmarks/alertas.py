@@ -0,0 +1,99 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+import alertas
+from benchmarks.sintetico import crear_bd_sintetica
+from diagnostico import expresion_sql_codigo
+from tiempo import ahora
+
+# Evaluación de las reglas de alerta con una tasa de ingesta alta: se insertan lecturas
+# recientes por lotes (una transacción por lote) y se comparan tres variantes del trigger:
+#
+#   sin_alertas    sin trigger de alertas (referencia)
+#   incremental    el trigger de alertas.py, con la ventana deslizante por paciente
+#   reconsulta     la misma regla contando en cada lectura las lecturas altas del paciente
+#                  en las últimas VENTANA_HORAS horas (y desde su última escalada) en mediciones
+#
+# Las dos variantes con alertas deben generar exactamente las mismas alertas.
+#
+# Uso: python -m benchmarks.alertas --pacientes 200 --lecturas 100000 --lote 500
+
+def _trigger_reconsulta():
+    codigo = expresion_sql_codigo('NEW.sistolica', 'NEW.diastolica')
+    columnas = "tipo, id_paciente, id_responsable, id_medicion, fecha, sistolica, diastolica"
+    valores = "NEW.id_paciente, NEW.id_responsable, NEW.id, NEW.fecha, NEW.sistolica, NEW.diastolica"
+    return f"""
+    CREATE TRIGGER alertas_mediciones_insert AFTER INSERT ON mediciones
+    WHEN {codigo} IN {alertas.CODIGOS_ALTOS}
+        AND NEW.fecha >= CAST(strftime('%s', 'now') AS INTEGER) - {alertas.ANTIGUEDAD_MAXIMA_HORAS * 3600}
+    BEGIN
+        INSERT INTO alertas ({columnas}) SELECT 'crisis', {valores} WHERE {codigo} = {alertas.CODIGO_CRISIS};
+        INSERT INTO alertas ({columnas}) SELECT 'escalada', {valores}
+        WHERE (
+            SELECT COUNT(*) FROM mediciones
+            WHERE id_paciente = NEW.id_paciente
+              AND fecha > NEW.fecha - {alertas.VENTANA_HORAS * 3600}
+              AND fecha > COALESCE((SELECT MAX(fecha) FROM alertas WHERE id_paciente = NEW.id_paciente AND tipo = 'escalada'), 0)
+              AND {expresion_sql_codigo()} IN {alertas.CODIGOS_ALTOS}
+        ) >= {alertas.LECTURAS_ESCALADA};
+    END
+    """
+
+def preparar(ruta_bd, variante, pacientes):
+    conn = crear_bd_sintetica(ruta_bd, pacientes=pacientes, mediciones_por_paciente=20)
+    conn.execute("DROP TRIGGER IF EXISTS alertas_mediciones_insert")
+    if variante == 'incremental':
+        alertas.instalar(conn)
+    elif variante == 'reconsulta':
+        conn.execute("CREATE INDEX idx_alertas_paciente_tipo ON alertas(id_paciente, tipo, fecha)")
+        conn.execute(_trigger_reconsulta())
+    conn.commit()
+    return conn
+
+# Lecturas de las últimas horas en orden cronológico; una parte son altas o de crisis.
+def generar_lecturas(pacientes, cantidad, semilla=7):
+    rng = random.Random(semilla)
+    inicio = ahora() - (alertas.ANTIGUEDAD_MAXIMA_HORAS - 1) * 3600
+    paso = (alertas.ANTIGUEDAD_MAXIMA_HORAS - 2) * 3600 / cantidad
+    for i in range(cantidad):
+        fecha = inicio + int(paso * i)
+        yield (rng.randint(1, pacientes), 1, fecha, rng.randint(95, 190), rng.randint(60, 122))
+
+def ejecutar(conn, lecturas, lote):
+    inicio = time.perf_counter()
+    for i in range(0, len(lecturas), lote):
+        with conn:
+            conn.executemany(
+                "INSERT INTO mediciones (id_paciente, id_responsable, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?, ?)",
+                lecturas[i:i + lote],
+            )
+    return time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendimiento de las reglas de alerta con ingesta alta.")
+    parser.add_argument('--pacientes', type=int, default=200)
+    parser.add_argument('--lecturas', type=int, default=100_000)
+    parser.add_argument('--lote', type=int, default=500)
+    args = parser.parse_args()
+
+    lecturas = list(generar_lecturas(args.pacientes, args.lecturas))
+    print(f"{'variante':>12} {'segundos':>9} {'lecturas/s':>11} {'µs/lectura':>11} {'crisis':>7} {'escaladas':>10}")
+    generadas = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for variante in ('sin_alertas', 'incremental', 'reconsulta'):
+            conn = preparar(os.path.join(directorio, f"alertas_{variante}.db"), variante, args.pacientes)
+            segundos = ejecutar(conn, lecturas, args.lote)
+            conteos = dict(conn.execute("SELECT tipo, COUNT(*) FROM alertas GROUP BY tipo"))
+            generadas[variante] = conn.execute("SELECT tipo, id_medicion FROM alertas ORDER BY id").fetchall()
+            conn.close()
+            print(f"{variante:>12} {segundos:>9.2f} {args.lecturas / segundos:>11,.0f} {segundos / args.lecturas * 1e6:>11.1f} "
+                  f"{conteos.get('crisis', 0):>7} {conteos.get('escalada', 0):>10}")
+    if generadas['incremental'] != generadas['reconsulta']:
+        print("[ERROR] La ventana incremental y la reconsulta generaron alertas distintas.")
+    else:
+        print("Las variantes incremental y reconsulta generaron las mismas alertas.")
+
+if __name__ == '__main__':
+    main()
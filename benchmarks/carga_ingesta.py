@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.sintetico import crear_bd_sintetica
+
+# Prueba de carga del servicio de ingesta (servicio_ingesta.py): varios tensiómetros simulados
+# envían lecturas sueltas o en lotes por conexiones keep-alive durante un tiempo fijo. Informa
+# lecturas confirmadas por segundo y la latencia p50/p99 de cada petición.
+#
+# Sin --url arranca el servicio en un proceso aparte sobre una base de datos sintética.
+#
+# Uso: python -m benchmarks.carga_ingesta --clientes 1 16 64 --lote 1 50 --duracion 5
+#      python -m benchmarks.carga_ingesta --url http://127.0.0.1:8765 --pacientes 100
+
+# Cliente HTTP/1.1 mínimo sobre una conexión keep-alive.
+class ClienteHttp:
+    def __init__(self, host, puerto, token=None):
+        self.host, self.puerto, self.token = host, puerto, token
+        self._lector = self._escritor = None
+
+    async def conectar(self):
+        self._lector, self._escritor = await asyncio.open_connection(self.host, self.puerto)
+
+    async def peticion(self, metodo, ruta, datos=None):
+        cuerpo = json.dumps(datos).encode() if datos is not None else b''
+        autorizacion = f"Authorization: Bearer {self.token}\r\n" if self.token else ""
+        self._escritor.write(
+            f"{metodo} {ruta} HTTP/1.1\r\nHost: {self.host}\r\n{autorizacion}"
+            f"Content-Type: application/json\r\nContent-Length: {len(cuerpo)}\r\n\r\n".encode() + cuerpo
+        )
+        await self._escritor.drain()
+        estado = int((await self._lector.readline()).split()[1])
+        longitud = 0
+        while (linea := await self._lector.readline()) not in (b'\r\n', b''):
+            nombre, _, valor = linea.decode().partition(':')
+            if nombre.lower() == 'content-length':
+                longitud = int(valor)
+        return estado, json.loads(await self._lector.readexactly(longitud))
+
+    def cerrar(self):
+        self._escritor.close()
+
+# Un tensiómetro simulado: envía peticiones de `lote` lecturas hasta `fin`.
+async def simular_cliente(host, puerto, token, pacientes, lote, fin, semilla):
+    rng = random.Random(semilla)
+    cliente = ClienteHttp(host, puerto, token)
+    await cliente.conectar()
+    latencias, confirmadas, errores = [], 0, 0
+    try:
+        while time.perf_counter() < fin:
+            lecturas = [
+                {'id_paciente': rng.randint(1, pacientes), 'id_responsable': 1,
+                 'sistolica': rng.randint(90, 190), 'diastolica': rng.randint(55, 115)}
+                for _ in range(lote)
+            ]
+            inicio = time.perf_counter()
+            estado, respuesta = await cliente.peticion('POST', '/mediciones', lecturas if lote > 1 else lecturas[0])
+            latencias.append(time.perf_counter() - inicio)
+            if estado == 200:
+                confirmadas += respuesta['insertadas']
+            else:
+                errores += 1
+    finally:
+        cliente.cerrar()
+    return latencias, confirmadas, errores
+
+async def ejecutar(host, puerto, token, clientes, pacientes, lote, duracion):
+    fin = time.perf_counter() + duracion
+    resultados = await asyncio.gather(*(
+        simular_cliente(host, puerto, token, pacientes, lote, fin, i) for i in range(clientes)
+    ))
+    latencias = sorted(l for parcial, _, _ in resultados for l in parcial)
+    confirmadas = sum(c for _, c, _ in resultados)
+    errores = sum(e for _, _, e in resultados)
+    percentil = lambda p: latencias[min(len(latencias) - 1, int(len(latencias) * p))] if latencias else float('nan')
+    return confirmadas / duracion, percentil(0.5), percentil(0.99), errores
+
+# Espera a que el servicio responda en /salud.
+async def esperar_servicio(host, puerto, token, limite=30):
+    fin = time.perf_counter() + limite
+    while True:
+        try:
+            cliente = ClienteHttp(host, puerto, token)
+            await cliente.conectar()
+            estado, salud = await cliente.peticion('GET', '/salud')
+            cliente.cerrar()
+            return salud
+        except OSError:
+            if time.perf_counter() > fin:
+                raise
+            await asyncio.sleep(0.1)
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+async def ejecutar_escenarios(host, puerto, token, args):
+    await esperar_servicio(host, puerto, token)
+    print(f"{'clientes':>9} {'lote':>6} {'lecturas/s':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'errores':>8}")
+    for lote in args.lote:
+        for clientes in args.clientes:
+            por_segundo, p50, p99, errores = await ejecutar(host, puerto, token, clientes, args.pacientes, lote, args.duracion)
+            print(f"{clientes:>9} {lote:>6} {por_segundo:>11.0f} {p50 * 1000:>9.2f} {p99 * 1000:>9.2f} {errores:>8}")
+    salud = await esperar_servicio(host, puerto, token)
+    print(f"Servicio: {salud['lotes']} transacciones, {salud['lecturas_por_lote']} lecturas por transacción, "
+          f"{salud['ms_commit_promedio']} ms por COMMIT.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de ingesta de mediciones.")
+    parser.add_argument('--url', help="Servicio ya en marcha (p. ej. http://127.0.0.1:8765); sin ella se arranca uno.")
+    parser.add_argument('--token')
+    parser.add_argument('--clientes', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--lote', type=int, nargs='+', default=[1, 50], help="Lecturas por petición.")
+    parser.add_argument('--pacientes', type=int, default=100)
+    parser.add_argument('--duracion', type=float, default=5.0, help="Segundos por escenario.")
+    parser.add_argument('--ventana-ms', type=float, default=None, help="Ventana de agrupación del servicio arrancado.")
+    args = parser.parse_args()
+
+    if args.url:
+        host, _, puerto = args.url.split('://', 1)[-1].rstrip('/').partition(':')
+        asyncio.run(ejecutar_escenarios(host, int(puerto or 80), args.token, args))
+        return
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_bd = os.path.join(directorio, 'ingesta.db')
+        crear_bd_sintetica(ruta_bd, pacientes=args.pacientes, mediciones_por_paciente=10).close()
+        puerto = _puerto_libre()
+        comando = [sys.executable, 'servicio_ingesta.py', '--bd', ruta_bd, '--puerto', str(puerto)]
+        if args.token:
+            comando += ['--token', args.token]
+        if args.ventana_ms is not None:
+            comando += ['--ventana-ms', str(args.ventana_ms)]
+        servicio = subprocess.Popen(comando, stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(ejecutar_escenarios('127.0.0.1', puerto, args.token, args))
+        finally:
+            servicio.terminate()
+            servicio.wait()
+
+if __name__ == '__main__':
+    main()
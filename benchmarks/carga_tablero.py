@@ -0,0 +1,57 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.sintetico import crear_bd_sintetica
+from datos import cargar_tablero
+
+# Compara la carga del tablero con una consulta por paciente (N+1, como hacía app.py)
+# frente a la carga por conjuntos de datos.cargar_tablero.
+#
+# Uso: python -m benchmarks.carga_tablero --pacientes 100 500 2000 --mediciones 50
+
+# Reproduce el bucle original: historial y mediciones consultados paciente por paciente.
+def cargar_n_mas_uno(conn):
+    c = conn.cursor()
+    resultado = {}
+    for id_paciente, nombre in c.execute("SELECT id, nombre FROM pacientes").fetchall():
+        c.execute("SELECT historial FROM pacientes WHERE id = ?", (id_paciente,))
+        historial = c.fetchone()[0]
+        mediciones_df = pd.read_sql_query("SELECT * FROM mediciones WHERE id_paciente = ? ORDER BY fecha", conn, params=(id_paciente,))
+        resultado[id_paciente] = (historial, mediciones_df)
+    return resultado
+
+# Ejecuta una función varias veces y devuelve el mejor tiempo en segundos.
+def medir(funcion, conn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(conn)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga del tablero: N+1 frente a consultas por conjuntos.")
+    parser.add_argument('--pacientes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--mediciones', type=int, default=50, help="Mediciones por paciente.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'pacientes':>10} {'filas':>10} {'N+1 (s)':>10} {'conjuntos (s)':>14} {'mejora':>8}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for cantidad in args.pacientes:
+            ruta_bd = os.path.join(directorio, f"sintetica_{cantidad}.db")
+            crear_bd_sintetica(ruta_bd, pacientes=cantidad, mediciones_por_paciente=args.mediciones).close()
+            conn = sqlite3.connect(ruta_bd)
+            t_n_mas_uno = medir(cargar_n_mas_uno, conn, args.repeticiones)
+            t_conjuntos = medir(cargar_tablero, conn, args.repeticiones)
+            conn.close()
+            filas = cantidad * args.mediciones
+            print(f"{cantidad:>10} {filas:>10} {t_n_mas_uno:>10.3f} {t_conjuntos:>14.3f} {t_n_mas_uno / t_conjuntos:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
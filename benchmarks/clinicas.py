@@ -0,0 +1,81 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+from benchmarks.escritura_diferida import EscrituraDiferida, ejecutar
+from benchmarks.sintetico import crear_bd_sintetica
+from clinicas import reporte_clinicas
+
+# Varias clínicas: una base de datos compartida frente a un archivo por clínica.
+#
+#   escritura  N clínicas con --sesiones sesiones cada una registran mediciones a la vez. Con un
+#              solo archivo todas pasan por el mismo escritor (un bloqueo de escritura); con un
+#              archivo por clínica cada una tiene su escritor y sus COMMIT van en paralelo.
+#   reporte    reporte entre clínicas (clinicas.reporte_clinicas) consultando los archivos uno
+#              tras otro (un hilo) o en paralelo.
+#
+# Uso: python -m benchmarks.clinicas --clinicas 1 4 8 --sesiones 8 --duracion 5
+
+def crear_clinicas(directorio, cantidad, pacientes, mediciones):
+    clinicas = {}
+    for i in range(cantidad):
+        ruta = os.path.join(directorio, f"clinica_{i}.db")
+        if not os.path.exists(ruta):
+            crear_bd_sintetica(ruta, pacientes=pacientes, mediciones_por_paciente=mediciones, semilla=i).close()
+        clinicas[f"Clinica {i}"] = ruta
+    return clinicas
+
+# Escrituras por segundo de todas las clínicas juntas, con un escritor por archivo.
+def medir_escritura(rutas, sesiones, pacientes, duracion):
+    modos = [EscrituraDiferida(ruta) for ruta in rutas]
+    resultados = [None] * len(modos)
+
+    def ejecutar_modo(i):
+        resultados[i] = ejecutar(modos[i], sesiones, pacientes, duracion)
+
+    hilos = [threading.Thread(target=ejecutar_modo, args=(i,)) for i in range(len(modos))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    for modo in modos:
+        modo.cerrar()
+    return sum(por_segundo for por_segundo, _, _ in resultados), max(p95 for _, p95, _ in resultados), sum(e for _, _, e in resultados)
+
+def main():
+    parser = argparse.ArgumentParser(description="Una base de datos compartida frente a un archivo por clínica.")
+    parser.add_argument('--clinicas', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--sesiones', type=int, default=8, help="Sesiones que escriben en cada clínica.")
+    parser.add_argument('--pacientes', type=int, default=200, help="Pacientes por clínica.")
+    parser.add_argument('--mediciones', type=int, default=200, help="Mediciones por paciente.")
+    parser.add_argument('--duracion', type=float, default=5.0, help="Segundos por escenario de escritura.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        print(f"{'clínicas':>9} {'archivos':>9} {'escrituras/s':>13} {'p95 (ms)':>10} {'errores':>8}")
+        for cantidad in args.clinicas:
+            for compartida in (True, False):
+                subdirectorio = os.path.join(directorio, f"escritura_{cantidad}_{'compartida' if compartida else 'clinicas'}")
+                os.makedirs(subdirectorio)
+                rutas = list(crear_clinicas(subdirectorio, 1 if compartida else cantidad, args.pacientes, 20).values())
+                # Con un archivo compartido, las sesiones de todas las clínicas usan el mismo escritor.
+                sesiones = args.sesiones * cantidad if compartida else args.sesiones
+                por_segundo, p95, errores = medir_escritura(rutas, sesiones, args.pacientes, args.duracion)
+                print(f"{cantidad:>9} {len(rutas):>9} {por_segundo:>13.0f} {p95 * 1000:>10.2f} {errores:>8}")
+
+        print(f"\n{'clínicas':>9} {'mediciones':>11} {'secuencial (ms)':>16} {'paralelo (ms)':>14}")
+        for cantidad in args.clinicas:
+            clinicas = crear_clinicas(directorio, cantidad, args.pacientes, args.mediciones)
+            lecturas = 0
+            for ruta in clinicas.values():
+                conn = sqlite3.connect(ruta)
+                lecturas += conn.execute("SELECT COUNT(*) FROM mediciones").fetchone()[0]
+                conn.close()
+            secuencial = min(reporte_clinicas(clinicas, max_hilos=1)[1] for _ in range(args.repeticiones))
+            paralelo = min(reporte_clinicas(clinicas)[1] for _ in range(args.repeticiones))
+            print(f"{cantidad:>9} {lecturas:>11,} {secuencial * 1000:>16.1f} {paralelo * 1000:>14.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.sintetico import crear_bd_sintetica
+from catalogo_bd import CatalogoEsquema, actualizar_registro, eliminar_registro, insertar_registro, leer_registro
+
+# Micro-benchmark de las operaciones CRUD de db_manager.py sobre la tabla de pacientes.
+#
+#   antes:   cada operación vuelve a leer sqlite_master y PRAGMA table_info con pandas y arma
+#            el SQL con f-strings (texto distinto en cada llamada: sin sentencia reutilizable).
+#   despues: catálogo en caché validado con PRAGMA schema_version y sentencias parametrizadas
+#            de texto fijo, que sqlite3 reutiliza desde su caché de sentencias preparadas.
+#
+# Uso: python -m benchmarks.crud_db_manager --operaciones 2000
+
+def crud_antes(conn, operaciones):
+    tiempos = {}
+    ids = []
+    inicio = time.perf_counter()
+    for i in range(operaciones):
+        pd.read_sql_query("SELECT name FROM sqlite_master WHERE type='table';", conn)
+        columnas = pd.read_sql_query("PRAGMA table_info(pacientes);", conn)['name'].tolist()
+        valores = {'nombre': f"Paciente {i}", 'edad': 40 + i % 40}
+        c = conn.execute(f"INSERT INTO pacientes ({', '.join(valores)}) VALUES ({', '.join(['?'] * len(valores))})", list(valores.values()))
+        conn.commit()
+        ids.append(c.lastrowid)
+    tiempos['insertar'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for id_registro in ids:
+        pd.read_sql_query("PRAGMA table_info(pacientes);", conn)
+        pd.read_sql_query(f"SELECT * FROM pacientes WHERE id = {id_registro};", conn)
+    tiempos['leer'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for id_registro in ids:
+        columnas = pd.read_sql_query("PRAGMA table_info(pacientes);", conn)['name'].tolist()
+        conn.execute("UPDATE pacientes SET nombre = ?, edad = ? WHERE id = ?", ('Editado', 50, id_registro))
+        conn.commit()
+    tiempos['actualizar'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for id_registro in ids:
+        pd.read_sql_query("SELECT name FROM sqlite_master WHERE type='table';", conn)
+        conn.execute(f"DELETE FROM pacientes WHERE id = {id_registro}")
+        conn.commit()
+    tiempos['eliminar'] = time.perf_counter() - inicio
+    return tiempos
+
+def crud_despues(conn, operaciones):
+    catalogo = CatalogoEsquema()
+    tiempos = {}
+    ids = []
+    inicio = time.perf_counter()
+    for i in range(operaciones):
+        tabla = catalogo.actualizar(conn).tabla('pacientes')
+        ids.append(insertar_registro(conn, tabla, {'nombre': f"Paciente {i}", 'edad': 40 + i % 40}))
+    tiempos['insertar'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for id_registro in ids:
+        leer_registro(conn, catalogo.actualizar(conn).tabla('pacientes'), id_registro)
+    tiempos['leer'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for id_registro in ids:
+        actualizar_registro(conn, catalogo.actualizar(conn).tabla('pacientes'), id_registro, {'nombre': 'Editado', 'edad': 50})
+    tiempos['actualizar'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for id_registro in ids:
+        eliminar_registro(conn, catalogo.actualizar(conn).tabla('pacientes'), id_registro)
+    tiempos['eliminar'] = time.perf_counter() - inicio
+    return tiempos
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de las operaciones CRUD de db_manager.py.")
+    parser.add_argument('--operaciones', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        resultados = {}
+        for nombre, funcion in (('antes', crud_antes), ('despues', crud_despues)):
+            ruta_bd = os.path.join(directorio, f"{nombre}.db")
+            crear_bd_sintetica(ruta_bd, pacientes=100, mediciones_por_paciente=10)
+            conn = sqlite3.connect(ruta_bd)
+            # Sin fsync en cada confirmación, para medir el coste de las sentencias y no el del disco.
+            conn.execute("PRAGMA synchronous = OFF")
+            resultados[nombre] = funcion(conn, args.operaciones)
+            conn.close()
+
+    print(f"{'operación':>12} {'antes op/s':>12} {'después op/s':>14} {'mejora':>8}")
+    for operacion in resultados['antes']:
+        antes = args.operaciones / resultados['antes'][operacion]
+        despues = args.operaciones / resultados['despues'][operacion]
+        print(f"{operacion:>12} {antes:12,.0f} {despues:14,.0f} {despues / antes:7.1f}x")
+
+if __name__ == '__main__':
+    main()
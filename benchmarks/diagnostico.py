@@ -0,0 +1,66 @@
+import argparse
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from diagnostico import DIAGNOSTICOS, clasificar_mediciones, codigos_diagnostico, expresion_sql_codigo, generar_diagnostico
+
+# Verifica que la clasificación vectorizada y la expresión SQL coinciden con generar_diagnostico en todo el
+# rango de los formularios (sistólica 50–250, diastólica 30–150, todos los pares) y mide
+# el rendimiento de ambas versiones sobre lecturas aleatorias.
+#
+# Uso: python -m benchmarks.diagnostico --lecturas 1000000
+
+# Comparación exhaustiva sobre todos los pares enteros del rango; devuelve los pares distintos.
+def verificar_equivalencia():
+    s, d = np.meshgrid(np.arange(50, 251), np.arange(30, 151), indexing='ij')
+    s, d = s.ravel(), d.ravel()
+    codigos = codigos_diagnostico(s, d)
+    categorias = clasificar_mediciones(s, d)
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE pares (sistolica INTEGER, diastolica INTEGER)")
+    conn.executemany("INSERT INTO pares VALUES (?, ?)", zip(s.tolist(), d.tolist()))
+    codigos_sql = [fila[0] for fila in conn.execute(f"SELECT {expresion_sql_codigo()} FROM pares ORDER BY rowid")]
+    diferencias = []
+    for i in range(len(s)):
+        esperado = generar_diagnostico(int(s[i]), int(d[i]))
+        if DIAGNOSTICOS[codigos[i]] != esperado or categorias[i] != esperado[0] or DIAGNOSTICOS[codigos_sql[i]] != esperado:
+            diferencias.append((int(s[i]), int(d[i])))
+    return len(s), diferencias
+
+def main():
+    parser = argparse.ArgumentParser(description="Equivalencia y rendimiento del clasificador vectorizado.")
+    parser.add_argument('--lecturas', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    total, diferencias = verificar_equivalencia()
+    if diferencias:
+        print(f"[ERROR] {len(diferencias)} de {total} pares difieren, por ejemplo: {diferencias[:5]}")
+        sys.exit(1)
+    print(f"Equivalencia verificada en los {total} pares del rango 50–250 / 30–150.")
+    s, d = np.meshgrid(np.arange(50, 251), np.arange(30, 151), indexing='ij')
+    inalcanzables = sorted(set(range(len(DIAGNOSTICOS))) - set(codigos_diagnostico(s.ravel(), d.ravel()).tolist()))
+    if inalcanzables:
+        print(f"[ERROR] Categorías que ninguna lectura alcanza: {[DIAGNOSTICOS[c][0] for c in inalcanzables]}")
+        sys.exit(1)
+
+    rng = np.random.default_rng(42)
+    s = rng.integers(50, 251, args.lecturas)
+    d = rng.integers(30, 151, args.lecturas)
+
+    inicio = time.perf_counter()
+    [generar_diagnostico(a, b) for a, b in zip(s.tolist(), d.tolist())]
+    t_escalar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    clasificar_mediciones(s, d)
+    t_vectorizado = time.perf_counter() - inicio
+
+    print(f"{'versión':>12} {'segundos':>10} {'lecturas/s':>14}")
+    print(f"{'escalar':>12} {t_escalar:>10.3f} {args.lecturas / t_escalar:>14,.0f}")
+    print(f"{'vectorizada':>12} {t_vectorizado:>10.3f} {args.lecturas / t_vectorizado:>14,.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import agregados
+import poblacion
+from benchmarks.sintetico import ESCALAS, crear_bd_escala, dimensiones
+from datos import cargar_tablero, listar_pacientes_pagina
+from diagnostico import clasificar_mediciones, generar_diagnostico
+from explorador_tablas import contar_filas, leer_pagina
+from exportar import consulta_exportacion, exportar_mediciones
+from graficas import renderizar_png
+from imprimir_mediciones import ESCRITORES as ESCRITORES_TERMINAL, imprimir_lotes
+from migraciones import CONSULTAS_CRITICAS, aplicar_migraciones
+from resumen import obtener_resumen
+from tiempo import serie_local
+
+# Suite de escalas: genera bases de datos sintéticas de 1k a 10M mediciones (ver
+# benchmarks/sintetico.py) y mide en cada una las operaciones de las aplicaciones:
+#
+#   consulta:*     consultas críticas de migraciones.CONSULTAS_CRITICAS
+#   app_v4:*       lista de pacientes, resumen, DataFrame del paciente, agregados y gráfica
+#   diagnostico:*  clasificación vectorizada de las lecturas del paciente y una lectura suelta
+#   poblacion      página de población completa
+#   app:tablero    tablero de app.py (todos los pacientes y todas las mediciones)
+#   exportar:*     CSV del paciente y de todas las mediciones
+#   imprimir       imprimir_mediciones.py en CSV sobre todas las mediciones
+#   db_manager:*   primera página y conteo de la tabla de mediciones
+#
+# Las operaciones que recorren todas las mediciones se miden una vez; las demás, el mejor de
+# --repeticiones. Los resultados se guardan en JSON (--json) con el commit y la versión de
+# SQLite, y --comparar muestra la razón frente a un archivo anterior; con --umbral-regresion
+# el script falla si alguna operación se vuelve más lenta que esa razón. Las bases de datos
+# de --directorio se reutilizan entre ejecuciones (y se migran al esquema actual).
+#
+# Uso: python -m benchmarks.escalas --escalas 1k 100k 1m --directorio bd_sinteticas --json escalas.json
+
+# La consulta de app_v4.obtener_mediciones_con_nombres (app_v4 no se puede importar sin Streamlit).
+CONSULTA_MEDICIONES_PACIENTE = """
+    SELECT m.id, p.nombre AS nombre_paciente, r.nombre AS nombre_responsable, m.sistolica, m.diastolica, m.fecha
+    FROM mediciones m
+    JOIN pacientes p ON m.id_paciente = p.id
+    JOIN responsables r ON m.id_responsable = r.id
+    WHERE m.id_paciente = ?
+    ORDER BY m.fecha DESC
+"""
+
+# Por debajo de este tiempo la razón entre dos ejecuciones es sobre todo ruido y no cuenta
+# como regresión.
+MINIMO_MS_REGRESION = 1.0
+
+# Devuelve el mejor tiempo en segundos de varias ejecuciones de la función.
+def medir(funcion, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+def _exportar(conn, **filtros):
+    exportar_mediciones(conn, 'csv', **filtros).close()
+
+def _imprimir(conn):
+    consulta, params = consulta_exportacion(orden='id')
+    imprimir_lotes(conn, consulta, params, ESCRITORES_TERMINAL['csv'](io.StringIO()), 1000, 0)
+
+# Operaciones de la suite: nombre -> (función(conn, mediciones_df), recorre_todo).
+# mediciones_df son las lecturas del paciente 1, cargadas como en app_v4.
+def operaciones():
+    lista = {
+        f"consulta:{nombre}": ((lambda conn, _, sql=sql, params=params: conn.execute(sql, params).fetchall()), False)
+        for nombre, (sql, params) in CONSULTAS_CRITICAS.items()
+    }
+    lista.update({
+        'app_v4:lista_pacientes': (lambda conn, _: listar_pacientes_pagina(conn), False),
+        'app_v4:resumen': (lambda conn, _: obtener_resumen(conn, 1), False),
+        'app_v4:mediciones_paciente': (lambda conn, _: pd.read_sql_query(CONSULTA_MEDICIONES_PACIENTE, conn, params=(1,)), False),
+        'app_v4:agregados_semana': (lambda conn, _: agregados.obtener_agregados(conn, 1, 'semana'), False),
+        'app_v4:grafica': (lambda conn, df: renderizar_png(serie_local(df['fecha']), df['sistolica'], df['diastolica']), False),
+        'diagnostico:paciente': (lambda conn, df: clasificar_mediciones(df['sistolica'], df['diastolica']), False),
+        'diagnostico:lectura': (lambda conn, df: generar_diagnostico(df['sistolica'].iloc[0], df['diastolica'].iloc[0]), False),
+        'poblacion': (lambda conn, _: poblacion.reporte_poblacion(conn), False),
+        'exportar:paciente_csv': (lambda conn, _: _exportar(conn, id_paciente=1), False),
+        'db_manager:pagina': (lambda conn, _: leer_pagina(conn, 'mediciones'), False),
+        'db_manager:conteo': (lambda conn, _: contar_filas(conn, 'mediciones'), False),
+        'app:tablero': (lambda conn, _: cargar_tablero(conn), True),
+        'exportar:todo_csv': (lambda conn, _: _exportar(conn), True),
+        'imprimir': (lambda conn, _: _imprimir(conn), True),
+    })
+    return lista
+
+# Abre la base de datos de la escala en el directorio, generándola si no existe.
+def abrir_bd(directorio, escala):
+    ruta = os.path.join(directorio, f"escala_{escala}.db")
+    if os.path.exists(ruta):
+        conn = sqlite3.connect(ruta)
+        aplicar_migraciones(conn)
+        return conn, None
+    inicio = time.perf_counter()
+    conn = crear_bd_escala(ruta, ESCALAS[escala])
+    return conn, time.perf_counter() - inicio
+
+def medir_escala(conn, repeticiones, omitir):
+    mediciones_df = pd.read_sql_query(CONSULTA_MEDICIONES_PACIENTE, conn, params=(1,))
+    tiempos = {}
+    for nombre, (funcion, recorre_todo) in operaciones().items():
+        if any(nombre.startswith(prefijo) for prefijo in omitir):
+            continue
+        segundos = medir(lambda: funcion(conn, mediciones_df), 1 if recorre_todo else repeticiones)
+        tiempos[nombre] = round(segundos * 1000, 3)
+    return tiempos
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Compara con un archivo de resultados anterior; devuelve las operaciones que superan el umbral.
+def comparar(resultados, anterior, umbral):
+    regresiones = []
+    print(f"\nComparación con {anterior.get('commit') or 'resultados anteriores'}:")
+    for escala, actual in resultados['escalas'].items():
+        previo = anterior['escalas'].get(escala)
+        if previo is None:
+            continue
+        for nombre, ms in actual['tiempos_ms'].items():
+            ms_previo = previo['tiempos_ms'].get(nombre)
+            if not ms_previo:
+                continue
+            razon = ms / ms_previo
+            marca = ''
+            if umbral is not None and razon > umbral and ms >= MINIMO_MS_REGRESION:
+                marca = '  <-- regresión'
+                regresiones.append((escala, nombre, razon))
+            print(f"  {escala:>4} {nombre:<46} {ms_previo:>10.2f} -> {ms:>10.2f} ms  x{razon:.2f}{marca}")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de rendimiento por escala de la base de datos.")
+    parser.add_argument('--escalas', nargs='+', choices=ESCALAS, default=['1k', '10k', '100k'])
+    parser.add_argument('--directorio', help="Directorio donde se guardan y reutilizan las bases de datos generadas.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--omitir', nargs='*', default=[], help="Prefijos de operaciones a omitir (p. ej. app:tablero exportar:todo).")
+    parser.add_argument('--json', default=None, help="Guarda los resultados en este archivo.")
+    parser.add_argument('--comparar', default=None, help="Archivo JSON de una ejecución anterior.")
+    parser.add_argument('--umbral-regresion', type=float, default=None,
+                        help="Con --comparar, falla si alguna operación tarda más que esta razón (p. ej. 1.5).")
+    args = parser.parse_args()
+
+    resultados = {
+        'commit': _commit_actual(),
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'repeticiones': args.repeticiones,
+        'escalas': {},
+    }
+    with tempfile.TemporaryDirectory() as temporal:
+        directorio = args.directorio or temporal
+        os.makedirs(directorio, exist_ok=True)
+        for escala in args.escalas:
+            conn, generacion = abrir_bd(directorio, escala)
+            try:
+                mediciones = conn.execute("SELECT COUNT(*) FROM mediciones").fetchone()[0]
+                pacientes, _, _ = dimensiones(ESCALAS[escala])
+                detalle = f"generada en {generacion:.1f} s" if generacion is not None else "reutilizada"
+                print(f"== {escala}: {mediciones:,} mediciones, {pacientes:,} pacientes ({detalle})")
+                tiempos = medir_escala(conn, args.repeticiones, args.omitir)
+            finally:
+                conn.close()
+            for nombre, ms in tiempos.items():
+                print(f"  {nombre:<46} {ms:>10.2f} ms")
+            resultados['escalas'][escala] = {
+                'mediciones': mediciones, 'pacientes': pacientes,
+                'generacion_s': round(generacion, 1) if generacion is not None else None,
+                'tiempos_ms': tiempos,
+            }
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            regresiones = comparar(resultados, json.load(archivo), args.umbral_regresion)
+        if regresiones:
+            print(f"[ERROR] {len(regresiones)} operaciones superan el umbral de regresión x{args.umbral_regresion}.")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
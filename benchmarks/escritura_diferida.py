@@ -0,0 +1,95 @@
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from benchmarks.sintetico import crear_bd_sintetica
+from conexion import GestorConexiones
+from escritor_diferido import EscritorDiferido
+from tiempo import ahora
+
+# Prueba de carga de escritura: N sesiones en hilos registran mediciones tan rápido como pueden.
+# Compara el INSERT + commit en la conexión de cada hilo (como hacía app_v4.py) con el
+# EscritorDiferido, que confirma juntas las inserciones de todas las sesiones. En ambos casos
+# cada sesión espera la confirmación de su escritura antes de la siguiente.
+#
+# Uso: python -m benchmarks.escritura_diferida --sesiones 1 8 32 --duracion 5
+
+INSERTAR = "INSERT INTO mediciones (id_paciente, id_responsable, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?, ?)"
+
+# Escritura directa desde el hilo de la sesión.
+class EscrituraDirecta:
+    def __init__(self, ruta_bd):
+        self.gestor = GestorConexiones(ruta_bd)
+
+    def ejecutar(self, sql, parametros):
+        conn = self.gestor.conexion()
+        cursor = conn.execute(sql, parametros)
+        conn.commit()
+        return cursor.lastrowid
+
+    def cerrar(self):
+        self.gestor.cerrar_todas()
+
+class EscrituraDiferida:
+    def __init__(self, ruta_bd):
+        self.escritor = EscritorDiferido(ruta_bd)
+
+    def ejecutar(self, sql, parametros):
+        return self.escritor.ejecutar(sql, parametros)
+
+    def cerrar(self):
+        self.escritor.cerrar()
+
+def simular_sesion(modo, pacientes, fin, resultados, semilla):
+    rng = random.Random(semilla)
+    latencias, errores = [], 0
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        try:
+            modo.ejecutar(INSERTAR, (rng.randint(1, pacientes), 1, ahora(),
+                                     rng.randint(90, 180), rng.randint(60, 110)))
+        except Exception:
+            errores += 1
+            continue
+        latencias.append(time.perf_counter() - inicio)
+    resultados.append((latencias, errores))
+
+def ejecutar(modo, sesiones, pacientes, duracion):
+    resultados = []
+    fin = time.perf_counter() + duracion
+    hilos = [threading.Thread(target=simular_sesion, args=(modo, pacientes, fin, resultados, i)) for i in range(sesiones)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    latencias = sorted(l for parcial, _ in resultados for l in parcial)
+    errores = sum(e for _, e in resultados)
+    p95 = latencias[int(len(latencias) * 0.95) - 1] if latencias else float('nan')
+    return len(latencias) / duracion, p95, errores
+
+def main():
+    parser = argparse.ArgumentParser(description="Escritura directa frente a escritura diferida con sesiones concurrentes.")
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--pacientes', type=int, default=100)
+    parser.add_argument('--duracion', type=float, default=5.0, help="Segundos por escenario.")
+    args = parser.parse_args()
+
+    print(f"{'modo':>9} {'sesiones':>9} {'escrituras/s':>13} {'p95 (ms)':>10} {'errores':>8}  lotes")
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre, clase in (('directa', EscrituraDirecta), ('diferida', EscrituraDiferida)):
+            ruta_bd = os.path.join(directorio, f"escritura_{nombre}.db")
+            crear_bd_sintetica(ruta_bd, pacientes=args.pacientes, mediciones_por_paciente=20).close()
+            for sesiones in args.sesiones:
+                modo = clase(ruta_bd)
+                por_segundo, p95, errores = ejecutar(modo, sesiones, args.pacientes, args.duracion)
+                detalle = ""
+                if isinstance(modo, EscrituraDiferida):
+                    metricas = modo.escritor.metricas()
+                    detalle = f"promedio {metricas['lote_promedio']}, máximo {metricas['lote_maximo']}, commit p95 {metricas['ms_commit_p95']} ms"
+                modo.cerrar()
+                print(f"{nombre:>9} {sesiones:>9} {por_segundo:>13.0f} {p95 * 1000:>10.2f} {errores:>8}  {detalle}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Mide el tiempo de dibujo por paciente y el pico de memoria (RSS) del proceso, antes y
+# después de la caché de gráficas. Cada modo se ejecuta en un subproceso propio para que
+# el pico de memoria de uno no contamine al otro.
+#
+#   antes:   una figura de pyplot nueva por paciente y rerun, sin cerrarla (código original).
+#   despues: graficas.grafica_presion_png (caché por contenido, figuras liberadas).
+#
+# Uso: python -m benchmarks.graficas --pacientes 50 --mediciones 200 --reruns 5
+
+# Series sintéticas deterministas, una por paciente.
+def series_sinteticas(pacientes, mediciones):
+    rng = np.random.default_rng(42)
+    fechas = pd.date_range('2024-01-01 07:00', periods=mediciones, freq='12h')
+    return [
+        (fechas, rng.normal(130, 12, mediciones).round(), rng.normal(85, 8, mediciones).round())
+        for _ in range(pacientes)
+    ]
+
+def dibujar_antes(fechas, sistolica, diastolica):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    ax.plot(fechas, sistolica, label='Sistólica', color='blue')
+    ax.plot(fechas, diastolica, label='Diastólica', color='red')
+    ax.set_title('Evolución de la Presión Arterial')
+    ax.set_xlabel('Fecha')
+    ax.set_ylabel('Presión Arterial (mmHg)')
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
+    ax.xaxis.set_tick_params(rotation=45)
+    ax.grid(True)
+    ax.legend()
+    plt.tight_layout()
+    # st.pyplot guarda la figura como PNG; la figura queda abierta en pyplot.
+    fig.savefig(io.BytesIO(), format='png', dpi=150)
+
+def dibujar_despues(fechas, sistolica, diastolica):
+    from graficas import grafica_presion_png
+    grafica_presion_png(fechas, sistolica, diastolica)
+
+# Ejecuta un modo dentro del subproceso y devuelve sus métricas.
+def medir_modo(modo, pacientes, mediciones, reruns):
+    dibujar = dibujar_antes if modo == 'antes' else dibujar_despues
+    series = series_sinteticas(pacientes, mediciones)
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tiempos = []
+    for _ in range(reruns):
+        for fechas, sistolica, diastolica in series:
+            inicio = time.perf_counter()
+            dibujar(fechas, sistolica, diastolica)
+            tiempos.append(time.perf_counter() - inicio)
+    rss_final = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'modo': modo,
+        'ms_por_paciente': 1000 * sum(tiempos) / len(tiempos),
+        'ms_primer_rerun': 1000 * sum(tiempos[:pacientes]) / pacientes,
+        'pico_rss_mb': rss_final / 1024,
+        'crecimiento_rss_mb': (rss_final - rss_inicial) / 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de dibujo de gráficas por paciente.")
+    parser.add_argument('--pacientes', type=int, default=50)
+    parser.add_argument('--mediciones', type=int, default=200, help="Mediciones por paciente.")
+    parser.add_argument('--reruns', type=int, default=5)
+    parser.add_argument('--modo', choices=['antes', 'despues'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(medir_modo(args.modo, args.pacientes, args.mediciones, args.reruns)))
+        return
+
+    print(f"{'modo':>8} {'ms/paciente':>12} {'ms 1er rerun':>13} {'pico RSS (MB)':>14} {'crecimiento (MB)':>17}")
+    for modo in ('antes', 'despues'):
+        salida = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.graficas', '--modo', modo,
+             '--pacientes', str(args.pacientes), '--mediciones', str(args.mediciones), '--reruns', str(args.reruns)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(salida.strip().splitlines()[-1])
+        print(f"{modo:>8} {r['ms_por_paciente']:>12.1f} {r['ms_primer_rerun']:>13.1f} {r['pico_rss_mb']:>14.1f} {r['crecimiento_rss_mb']:>17.1f}")
+
+if __name__ == '__main__':
+    main()
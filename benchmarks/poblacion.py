@@ -0,0 +1,84 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import poblacion
+from benchmarks.sintetico import crear_bd_sintetica
+from diagnostico import codigos_diagnostico
+from tiempo import serie_local
+
+# Página de población: agregación en SQLite (poblacion.py) frente a cargar todas las
+# mediciones en pandas y agrupar en memoria con el clasificador vectorizado. Verifica que
+# ambas variantes dan los mismos conteos. Con --bd se mide una base de datos existente; con
+# --umbral-ms falla si la página agregada en SQLite tarda más.
+#
+# Uso: python -m benchmarks.poblacion --pacientes 1000 --mediciones 200 --umbral-ms 1000
+
+# Categoría actual, lecturas por responsable y lecturas por mes calculadas en pandas.
+def reporte_en_memoria(conn):
+    mediciones = pd.read_sql_query("SELECT id, id_paciente, id_responsable, fecha, sistolica, diastolica FROM mediciones", conn)
+    mediciones['codigo'] = codigos_diagnostico(mediciones['sistolica'], mediciones['diastolica'])
+    ultimas = mediciones.sort_values(['fecha', 'id']).groupby('id_paciente').tail(1)
+    por_mes = serie_local(mediciones['fecha']).dt.to_period('M')
+    return {
+        'pacientes_por_categoria': ultimas['codigo'].value_counts().sort_index().tolist(),
+        'lecturas_por_responsable': sorted(mediciones.groupby('id_responsable').size().tolist(), reverse=True),
+        'lecturas_por_mes': mediciones.groupby(por_mes).size().tolist(),
+    }
+
+def medir(funcion, repeticiones):
+    mejor, resultado = float('inf'), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Página de población: GROUP BY en SQLite frente a agregación en pandas.")
+    parser.add_argument('--bd', help="Base de datos existente (por defecto se genera una sintética).")
+    parser.add_argument('--pacientes', type=int, default=1000)
+    parser.add_argument('--mediciones', type=int, default=200, help="Mediciones por paciente.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--sin-memoria', action='store_true', help="No mide la variante en pandas (lenta con millones de filas).")
+    parser.add_argument('--umbral-ms', type=float, default=None, help="Falla si la página agregada en SQLite tarda más.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        if args.bd:
+            conn = sqlite3.connect(args.bd)
+        else:
+            conn = crear_bd_sintetica(os.path.join(directorio, "poblacion.db"), pacientes=args.pacientes,
+                                      mediciones_por_paciente=args.mediciones, responsables=50)
+        try:
+            lecturas = conn.execute("SELECT COUNT(*) FROM mediciones").fetchone()[0]
+            print(f"{lecturas:,} mediciones")
+            segundos_sql, (reporte, tiempos) = medir(lambda: poblacion.reporte_poblacion(conn), args.repeticiones)
+            for nombre, segundos in tiempos.items():
+                print(f"  {nombre:>26} {segundos * 1000:>9.1f} ms")
+            print(f"{'sql':>8} {segundos_sql * 1000:>10.1f} ms")
+            if not args.sin_memoria:
+                segundos_memoria, en_memoria = medir(lambda: reporte_en_memoria(conn), 1)
+                print(f"{'memoria':>8} {segundos_memoria * 1000:>10.1f} ms")
+                en_sql = {
+                    'pacientes_por_categoria': reporte['pacientes_por_categoria']['pacientes'].tolist(),
+                    'lecturas_por_responsable': reporte['lecturas_por_responsable']['lecturas'].tolist(),
+                    'lecturas_por_mes': reporte['lecturas_en_el_tiempo']['lecturas'].tolist(),
+                }
+                if en_sql != en_memoria:
+                    print("[ERROR] La agregación en SQLite y la agregación en pandas no coinciden.")
+                    sys.exit(1)
+                print("La agregación en SQLite coincide con la agregación en pandas.")
+        finally:
+            conn.close()
+    if args.umbral_ms is not None and segundos_sql * 1000 > args.umbral_ms:
+        print(f"[ERROR] La página de población tarda {segundos_sql * 1000:.0f} ms (umbral {args.umbral_ms:.0f} ms).")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from benchmarks.sintetico import crear_bd_sintetica
+from conexion import GestorConexiones
+from tiempo import ahora
+
+# Prueba de carga: N sesiones simuladas en hilos que leen el tablero de un paciente y,
+# de vez en cuando, registran una medición. Compara la conexión única compartida que
+# usaba app_v4.py con el GestorConexiones (una conexión por hilo en modo WAL).
+#
+# Uso: python -m benchmarks.sesiones_concurrentes --sesiones 1 8 32 --duracion 5
+
+CONSULTA_PACIENTE = """
+SELECT m.id, p.nombre AS nombre_paciente, r.nombre AS nombre_responsable, m.sistolica, m.diastolica, m.fecha
+FROM mediciones m
+JOIN pacientes p ON m.id_paciente = p.id
+JOIN responsables r ON m.id_responsable = r.id
+WHERE m.id_paciente = ?
+ORDER BY m.fecha DESC
+"""
+
+# Conexión única compartida por todos los hilos, como el módulo original.
+class ConexionUnica:
+    def __init__(self, ruta_bd):
+        self._conn = sqlite3.connect(ruta_bd, check_same_thread=False)
+
+    def conexion(self):
+        return self._conn
+
+    def cerrar_todas(self):
+        self._conn.close()
+
+# Bucle de una sesión: lecturas continuas con una proporción de escrituras.
+def simular_sesion(gestor, pacientes, proporcion_escritura, fin, resultados, semilla):
+    rng = random.Random(semilla)
+    latencias, errores = [], 0
+    while time.perf_counter() < fin:
+        id_paciente = rng.randint(1, pacientes)
+        inicio = time.perf_counter()
+        try:
+            conn = gestor.conexion()
+            if rng.random() < proporcion_escritura:
+                conn.execute(
+                    "INSERT INTO mediciones (id_paciente, id_responsable, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?, ?)",
+                    (id_paciente, 1, ahora(), rng.randint(90, 180), rng.randint(60, 110)),
+                )
+                conn.commit()
+            else:
+                conn.execute("SELECT id, nombre FROM pacientes").fetchall()
+                conn.execute(CONSULTA_PACIENTE, (id_paciente,)).fetchall()
+        except sqlite3.Error:
+            errores += 1
+            continue
+        latencias.append(time.perf_counter() - inicio)
+    resultados.append((latencias, errores))
+
+# Lanza las sesiones en paralelo y resume operaciones por segundo, latencia p95 y errores.
+def ejecutar(gestor, sesiones, pacientes, proporcion_escritura, duracion):
+    resultados = []
+    fin = time.perf_counter() + duracion
+    hilos = [
+        threading.Thread(target=simular_sesion, args=(gestor, pacientes, proporcion_escritura, fin, resultados, i))
+        for i in range(sesiones)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    latencias = sorted(l for parcial, _ in resultados for l in parcial)
+    errores = sum(e for _, e in resultados)
+    p95 = latencias[int(len(latencias) * 0.95) - 1] if latencias else float('nan')
+    return len(latencias) / duracion, p95, errores
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones concurrentes sobre SQLite.")
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--pacientes', type=int, default=200)
+    parser.add_argument('--mediciones', type=int, default=100, help="Mediciones por paciente.")
+    parser.add_argument('--escrituras', type=float, default=0.1, help="Proporción de operaciones que son escrituras.")
+    parser.add_argument('--duracion', type=float, default=5.0, help="Segundos por escenario.")
+    args = parser.parse_args()
+
+    print(f"{'modo':>10} {'sesiones':>9} {'ops/s':>10} {'p95 (ms)':>10} {'errores':>8}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for modo, clase in (('unica', ConexionUnica), ('gestor', GestorConexiones)):
+            ruta_bd = os.path.join(directorio, f"carga_{modo}.db")
+            crear_bd_sintetica(ruta_bd, pacientes=args.pacientes, mediciones_por_paciente=args.mediciones).close()
+            for sesiones in args.sesiones:
+                gestor = clase(ruta_bd)
+                ops, p95, errores = ejecutar(gestor, sesiones, args.pacientes, args.escrituras, args.duracion)
+                gestor.cerrar_todas()
+                print(f"{modo:>10} {sesiones:>9} {ops:>10.0f} {p95 * 1000:>10.2f} {errores:>8}")
+
+if __name__ == '__main__':
+    main()
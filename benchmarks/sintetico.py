@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime
+
+import agregados
+import alertas
+import poblacion
+import resumen
+from migraciones import OBJETOS_DERIVADOS, aplicar_migraciones
+from tiempo import a_epoch
+
+# Generación de bases de datos sintéticas para las pruebas de rendimiento.
+# Las lecturas son deterministas para una misma semilla, de modo que los
+# resultados de distintas ejecuciones sean comparables.
+#
+# Las mediciones se insertan sin los triggers de las tablas derivadas (resumen, agregados y
+# población), que se reinstalan y reconstruyen al final: con millones de filas es mucho más
+# rápido que mantenerlas lectura a lectura y el resultado es el mismo. Tampoco se evalúan las
+# reglas de alerta: los datos sintéticos no son lecturas nuevas y la bandeja queda vacía.
+#
+# Uso: python -m benchmarks.sintetico sintetica.db --escala 1m
+
+INICIO = datetime(2024, 1, 1, 7, 0)
+
+# Escalas con nombre (número total de mediciones) para la suite de escalas.
+ESCALAS = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+
+# Pacientes, mediciones por paciente y responsables para un total de mediciones: unas 500
+# lecturas por paciente (unos ocho meses con dos al día), entre 10 y 20.000 pacientes.
+def dimensiones(mediciones):
+    pacientes = min(20_000, max(10, mediciones // 500))
+    return pacientes, mediciones // pacientes, max(5, pacientes // 100)
+
+# Genera las filas de mediciones de un paciente: dos lecturas diarias con ruido alrededor de su presión base.
+# La hora de Bogotá no tiene cambios de horario, así que la fecha se suma en segundos.
+def _mediciones_paciente(rng, id_paciente, cantidad, responsables):
+    base_sistolica = rng.randint(100, 170)
+    base_diastolica = rng.randint(60, 105)
+    inicio = a_epoch(INICIO)
+    for i in range(cantidad):
+        fecha = inicio + 12 * 3600 * i + 60 * rng.randint(0, 90)
+        sistolica = min(250, max(50, int(rng.gauss(base_sistolica, 8))))
+        diastolica = min(150, max(30, int(rng.gauss(base_diastolica, 6))))
+        yield (id_paciente, rng.randint(1, responsables), fecha, sistolica, diastolica)
+
+# Crea (o rellena) una base de datos con pacientes, responsables y mediciones sintéticas.
+def crear_bd_sintetica(ruta_bd, pacientes=100, mediciones_por_paciente=50, responsables=10, semilla=42):
+    rng = random.Random(semilla)
+    conn = sqlite3.connect(ruta_bd)
+    aplicar_migraciones(conn)
+    with conn:
+        for modulo in (resumen, agregados, poblacion, alertas):
+            modulo.eliminar_triggers(conn)
+        conn.executemany(
+            "INSERT INTO responsables (nombre, rol) VALUES (?, ?)",
+            ((f"Responsable {i}", "Responsable") for i in range(1, responsables + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO pacientes (nombre, edad, historial) VALUES (?, ?, ?)",
+            ((f"Paciente {i}", rng.randint(18, 95), f"Historial del paciente {i}") for i in range(1, pacientes + 1)),
+        )
+        for id_paciente in range(1, pacientes + 1):
+            conn.executemany(
+                "INSERT INTO mediciones (id_paciente, id_responsable, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?, ?)",
+                _mediciones_paciente(rng, id_paciente, mediciones_por_paciente, responsables),
+            )
+        for instalar in OBJETOS_DERIVADOS:
+            instalar(conn)
+    return conn
+
+# Crea una base de datos con el total de mediciones indicado (ver dimensiones).
+def crear_bd_escala(ruta_bd, mediciones, semilla=42):
+    pacientes, por_paciente, responsables = dimensiones(mediciones)
+    return crear_bd_sintetica(ruta_bd, pacientes=pacientes, mediciones_por_paciente=por_paciente,
+                              responsables=responsables, semilla=semilla)
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una base de datos sintética de presión arterial.")
+    parser.add_argument('ruta_bd')
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--escala', choices=ESCALAS, default='100k')
+    grupo.add_argument('--mediciones', type=int, help="Total de mediciones (en lugar de --escala).")
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.ruta_bd):
+        parser.error(f"{args.ruta_bd} ya existe; las lecturas se añadirían a las que tiene.")
+    mediciones = args.mediciones if args.mediciones is not None else ESCALAS[args.escala]
+    pacientes, por_paciente, responsables = dimensiones(mediciones)
+    inicio = time.perf_counter()
+    crear_bd_escala(args.ruta_bd, mediciones, args.semilla).close()
+    segundos = time.perf_counter() - inicio
+    print(f"{pacientes * por_paciente:,} mediciones de {pacientes:,} pacientes y {responsables:,} responsables "
+          f"en {segundos:.1f} s ({pacientes * por_paciente / segundos:,.0f} filas/s).")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Perfil de tiempo de importación (python -X importtime) del arranque de las aplicaciones.
+# Cada conjunto de módulos se importa en un intérprete nuevo, varias veces, y se informa
+# el mejor tiempo total y los módulos más costosos. Con --umbral-ms el script falla si la
+# pantalla de inicio de sesión supera el umbral, para detectar regresiones de arranque.
+#
+# Uso: python -m benchmarks.tiempo_importacion --repeticiones 5 --umbral-ms 800
+
+# Módulos que app_v4.py importa antes del inicio de sesión y los que añade con la sesión iniciada.
+CONJUNTOS = {
+    'inicio_sesion': [
+        'streamlit', 'migraciones', 'conexion', 'cache_mediciones', 'diagnostico',
+        'resumen', 'agregados', 'autenticacion', 'instrumentacion', 'clinicas',
+        'escritor_diferido', 'tiempo', 'cambios',
+    ],
+    'sesion_iniciada': [
+        'pandas', 'graficas', 'datos', 'importar_mediciones', 'exportar',
+    ],
+    'grafica_matplotlib': [
+        'matplotlib.figure', 'matplotlib.dates',
+    ],
+}
+
+# Importa los módulos en un intérprete nuevo y devuelve {módulo: (propio_us, acumulado_us)}.
+def perfil_importacion(modulos, precargados=()):
+    sentencias = [f"import {modulo}" for modulo in precargados]
+    sentencias += ["import sys", "sys.stderr.write('--inicio--\\n')"]
+    sentencias += [f"import {modulo}" for modulo in modulos]
+    codigo = ';'.join(sentencias)
+    entorno = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                             capture_output=True, text=True, check=True, env=entorno)
+    # Solo cuentan los módulos importados después de los precargados.
+    salida = proceso.stderr.split('--inicio--\n', 1)[-1]
+    perfil = {}
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        perfil[nombre.strip()] = (int(propio), int(acumulado))
+    return perfil
+
+# Tiempo total del conjunto: suma de los tiempos propios de todos los módulos cargados.
+def total_ms(perfil):
+    return sum(propio for propio, _ in perfil.values()) / 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de tiempo de importación del arranque de las aplicaciones.")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="Módulos más costosos a mostrar por conjunto.")
+    parser.add_argument('--umbral-ms', type=float, default=None, help="Falla si el inicio de sesión tarda más.")
+    parser.add_argument('--json', default=None, help="Guarda los resultados en este archivo.")
+    args = parser.parse_args()
+
+    resultados = {}
+    precargados = []
+    for nombre, modulos in CONJUNTOS.items():
+        # Cada conjunto se mide sobre los anteriores ya importados, como ocurre en la aplicación.
+        perfiles = [perfil_importacion(modulos, precargados) for _ in range(args.repeticiones)]
+        mejor = min(perfiles, key=total_ms)
+        resultados[nombre] = {'total_ms': round(total_ms(mejor), 1), 'modulos': len(mejor)}
+        print(f"{nombre}: {total_ms(mejor):.1f} ms ({len(mejor)} módulos)")
+        costosos = sorted(mejor.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+        for modulo, (_, acumulado) in costosos:
+            print(f"    {acumulado / 1000:8.1f} ms  {modulo}")
+        precargados += modulos
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2)
+    if args.umbral_ms is not None and resultados['inicio_sesion']['total_ms'] > args.umbral_ms:
+        print(f"[ERROR] El inicio de sesión tarda {resultados['inicio_sesion']['total_ms']} ms (umbral {args.umbral_ms} ms).")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
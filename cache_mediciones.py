@@ -0,0 +1,116 @@
+import sys
+import threading
+from collections import OrderedDict
+
+# Caché en memoria del servidor para los DataFrames de mediciones.
+# Las entradas se guardan por clave (normalmente (id_paciente, id_responsable), con
+# id_responsable = None para la vista del administrador) y se descartan en orden LRU
+# cuando el total supera el presupuesto de memoria. Las funciones de escritura invalidan
+# solo las claves afectadas; los cambios de otros procesos se detectan comparando la versión
+# de los datos (ver cambios.py) al empezar cada rerun.
+
+# Tamaño aproximado en bytes de un valor guardado en la caché (las listas de tuplas de las
+# páginas de pacientes se cuentan con su contenido).
+def _tamano(valor):
+    if hasattr(valor, 'memory_usage'):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_tamano(elemento) for elemento in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamano(clave) + _tamano(elemento) for clave, elemento in valor.items())
+    return sys.getsizeof(valor)
+
+class CacheMediciones:
+    def __init__(self, presupuesto_bytes=64 * 1024 * 1024):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        # Claves que se están cargando: clave -> [generación, cargas en curso]. Invalidar una
+        # clave en carga sube su generación, y el valor de esa carga ya no se guarda.
+        self._cargas = {}
+        self.bytes_usados = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.version_datos = None
+
+    # Devuelve el valor de la clave; si no está, lo calcula con cargar() y lo guarda.
+    # Los valores guardados se comparten entre sesiones y no deben modificarse. cargar() se
+    # ejecuta fuera del lock; si la clave se invalida mientras tanto (una escritura confirmada
+    # durante la carga), el valor se devuelve pero no se guarda.
+    def obtener(self, clave, cargar):
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave][0]
+            self.fallos += 1
+            carga = self._cargas.setdefault(clave, [0, 0])
+            carga[1] += 1
+            generacion = carga[0]
+        try:
+            valor = cargar()
+        except BaseException:
+            with self._lock:
+                self._terminar_carga(clave)
+            raise
+        self._guardar(clave, valor, generacion)
+        return valor
+
+    def _terminar_carga(self, clave):
+        carga = self._cargas[clave]
+        carga[1] -= 1
+        if not carga[1]:
+            del self._cargas[clave]
+        return carga[0]
+
+    def _guardar(self, clave, valor, generacion):
+        tamano = _tamano(valor)
+        with self._lock:
+            if self._terminar_carga(clave) != generacion or tamano > self.presupuesto_bytes:
+                return
+            if clave in self._entradas:
+                self.bytes_usados -= self._entradas.pop(clave)[1]
+            self._entradas[clave] = (valor, tamano)
+            self.bytes_usados += tamano
+            while self.bytes_usados > self.presupuesto_bytes:
+                _, (_, tamano_descartado) = self._entradas.popitem(last=False)
+                self.bytes_usados -= tamano_descartado
+
+    # Elimina una clave concreta.
+    def invalidar(self, clave):
+        with self._lock:
+            if clave in self._entradas:
+                self.bytes_usados -= self._entradas.pop(clave)[1]
+            if clave in self._cargas:
+                self._cargas[clave][0] += 1
+
+    # Elimina todas las claves (id_paciente, *) de un paciente.
+    def invalidar_paciente(self, id_paciente):
+        self.invalidar_si(lambda clave: isinstance(clave, tuple) and clave[0] == id_paciente)
+
+    # Elimina todas las claves (*, id_responsable) de un responsable.
+    def invalidar_responsable(self, id_responsable):
+        self.invalidar_si(lambda clave: isinstance(clave, tuple) and clave[1] == id_responsable)
+
+    # Elimina las claves que cumplen la condición.
+    def invalidar_si(self, condicion):
+        with self._lock:
+            for clave in [clave for clave in self._entradas if condicion(clave)]:
+                self.bytes_usados -= self._entradas.pop(clave)[1]
+            for clave, carga in self._cargas.items():
+                if condicion(clave):
+                    carga[0] += 1
+
+    # Elimina todas las claves.
+    def invalidar_todo(self):
+        self.invalidar_si(lambda clave: True)
+
+    # Guarda la versión de los datos vista y devuelve la anterior (None la primera vez). Solo
+    # una de las sesiones que ven el mismo cambio recibe la versión anterior a él.
+    def cambiar_version(self, version):
+        with self._lock:
+            anterior, self.version_datos = self.version_datos, version
+            return anterior
+
+    def __len__(self):
+        return len(self._entradas)
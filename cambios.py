@@ -0,0 +1,50 @@
+# Versión de los datos para las cachés de las aplicaciones.
+# Otros procesos escriben en la misma base de datos (servicio de ingesta, gestor de base de
+# datos, importación por consola), así que una caché en memoria no puede depender solo de las
+# escrituras que ella misma hace. La versión de los datos son tres números baratos de leer:
+#
+#   ultima_medicion  id más alto de mediciones: las mediciones nuevas tienen id mayor
+#                    (AUTOINCREMENT), de modo que se sabe qué pacientes las recibieron
+#   ultimo_paciente  id más alto de pacientes (pacientes nuevos)
+#   ediciones        contador que los triggers incrementan con cada UPDATE o DELETE en
+#                    mediciones, pacientes o responsables, y instalar() con cada reconstrucción
+#
+# Una caché compara la versión con la última que vio: con mediciones o pacientes nuevos
+# invalida solo lo afectado; si cambió ediciones, no puede saber qué filas cambiaron y se vacía.
+
+TABLAS_EDITABLES = ('mediciones', 'pacientes', 'responsables')
+
+def _nombres_triggers():
+    return [f"cambios_{tabla}_{evento}" for tabla in TABLAS_EDITABLES for evento in ('update', 'delete')]
+
+# Quita los triggers; las ediciones posteriores no se cuentan hasta instalar().
+def eliminar_triggers(conn):
+    for nombre in _nombres_triggers():
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+# (Re)crea los triggers con la definición actual. Como se instala después de migrar o de
+# reconstruir las tablas derivadas tras un lote grande, también cuenta como una edición.
+def instalar(conn):
+    eliminar_triggers(conn)
+    for tabla in TABLAS_EDITABLES:
+        for evento in ('UPDATE', 'DELETE'):
+            conn.execute(f"""
+            CREATE TRIGGER cambios_{tabla}_{evento.lower()} AFTER {evento} ON {tabla}
+            BEGIN UPDATE version_datos SET ediciones = ediciones + 1; END
+            """)
+    marcar_edicion(conn)
+
+def marcar_edicion(conn):
+    conn.execute("UPDATE version_datos SET ediciones = ediciones + 1")
+
+# Versión actual de los datos: (ultima_medicion, ultimo_paciente, ediciones).
+def version_datos(conn):
+    return conn.execute("""
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM mediciones), (SELECT COALESCE(MAX(id), 0) FROM pacientes),
+               (SELECT ediciones FROM version_datos)
+    """).fetchone()
+
+# Pacientes con mediciones de id entre desde_id (excluido) y hasta_id (incluido).
+def pacientes_con_mediciones_nuevas(conn, desde_id, hasta_id):
+    return [fila[0] for fila in conn.execute(
+        "SELECT DISTINCT id_paciente FROM mediciones WHERE id > ? AND id <= ?", (desde_id, hasta_id))]
@@ -0,0 +1,119 @@
+import threading
+
+# Catálogo del esquema de una base de datos SQLite y operaciones CRUD parametrizadas para
+# db_manager.py. El catálogo lee sqlite_master y PRAGMA table_info una sola vez y solo los
+# vuelve a leer cuando cambia PRAGMA schema_version (que SQLite incrementa con cada CREATE,
+# ALTER o DROP). Los nombres de tabla y columna se validan contra el catálogo antes de
+# entrar en una sentencia; los valores siempre viajan como parámetros. Las sentencias de
+# cada tabla tienen un texto fijo, así que sqlite3 reutiliza la sentencia preparada de su
+# caché interna en cada ejecución.
+
+# Cita un identificador de SQLite (tabla o columna) entre comillas dobles.
+def citar_identificador(nombre):
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+# Estructura de una tabla y sus sentencias CRUD (texto SQL con parámetros).
+class TablaCatalogo:
+    def __init__(self, nombre, columnas, clave, con_rowid):
+        self.nombre = nombre
+        self.columnas = columnas
+        self.clave = clave
+        self.con_rowid = con_rowid
+        # Identificador de fila para la edición por lotes: rowid o, sin él, la clave de una columna.
+        self.clave_fila = 'rowid' if con_rowid else clave
+        tabla = citar_identificador(nombre)
+        clave_sql = citar_identificador(clave) if clave != 'rowid' else 'rowid'
+        self.sql_leer = f"SELECT * FROM {tabla} WHERE {clave_sql} = ?"
+        self.sql_eliminar = f"DELETE FROM {tabla} WHERE {clave_sql} = ?"
+        self._tabla_sql = tabla
+        self._clave_sql = clave_sql
+
+    # INSERT con las columnas indicadas (validadas), en el orden de la tabla.
+    def sql_insertar(self, columnas):
+        columnas = self.validar_columnas(columnas)
+        if not columnas:
+            return f"INSERT INTO {self._tabla_sql} DEFAULT VALUES", columnas
+        lista = ', '.join(citar_identificador(columna) for columna in columnas)
+        return f"INSERT INTO {self._tabla_sql} ({lista}) VALUES ({', '.join('?' * len(columnas))})", columnas
+
+    # UPDATE de las columnas indicadas (validadas) para el registro con la clave dada.
+    def sql_actualizar(self, columnas):
+        columnas = self.validar_columnas(columnas)
+        asignaciones = ', '.join(f"{citar_identificador(columna)} = ?" for columna in columnas)
+        return f"UPDATE {self._tabla_sql} SET {asignaciones} WHERE {self._clave_sql} = ?", columnas
+
+    # Devuelve las columnas en el orden de la tabla; falla si alguna no existe.
+    def validar_columnas(self, columnas):
+        desconocidas = set(columnas) - set(self.columnas)
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas en {self.nombre}: {', '.join(sorted(desconocidas))}")
+        return [columna for columna in self.columnas if columna in columnas]
+
+# Catálogo de una base de datos, compartido entre sesiones y recargado por schema_version.
+class CatalogoEsquema:
+    def __init__(self):
+        self.version = None
+        self.tablas = {}
+        self.lecturas = 0
+        self._lock = threading.Lock()
+
+    # Actualiza el catálogo si el esquema cambió y lo devuelve.
+    def actualizar(self, conn):
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    self.tablas = self._leer(conn)
+                    self.version = version
+                    self.lecturas += 1
+        return self
+
+    def _leer(self, conn):
+        tablas = {}
+        nombres = [fila[0] for fila in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        for nombre in nombres:
+            info = conn.execute(f"PRAGMA table_info({citar_identificador(nombre)})").fetchall()
+            columnas = [fila[1] for fila in info]
+            clave = [fila[1] for fila in sorted(info, key=lambda fila: fila[5]) if fila[5] > 0]
+            sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (nombre,)).fetchone()[0] or ''
+            con_rowid = 'WITHOUT ROWID' not in sql.upper()
+            # Las operaciones por registro usan la clave primaria de una columna o, si no la hay, rowid.
+            clave = clave[0] if len(clave) == 1 else ('rowid' if con_rowid else None)
+            tablas[nombre] = TablaCatalogo(nombre, columnas, clave, con_rowid)
+        return tablas
+
+    # Devuelve la tabla del catálogo; falla si no existe (nombre no válido).
+    def tabla(self, nombre):
+        if nombre not in self.tablas:
+            raise ValueError(f"La tabla {nombre!r} no existe en la base de datos.")
+        return self.tablas[nombre]
+
+# Inserta un registro; las columnas sin valor toman su valor por defecto. Devuelve el rowid.
+def insertar_registro(conn, tabla, valores):
+    consulta, columnas = tabla.sql_insertar(valores.keys())
+    with conn:
+        return conn.execute(consulta, [valores[columna] for columna in columnas]).lastrowid
+
+# Lee un registro por su clave. Devuelve un diccionario o None si no existe.
+def leer_registro(conn, tabla, clave):
+    if tabla.clave is None:
+        raise ValueError(f"La tabla {tabla.nombre} no tiene una clave de una sola columna.")
+    cursor = conn.execute(tabla.sql_leer, (clave,))
+    fila = cursor.fetchone()
+    return dict(zip([columna[0] for columna in cursor.description], fila)) if fila else None
+
+# Actualiza las columnas indicadas de un registro. Devuelve el número de filas modificadas.
+def actualizar_registro(conn, tabla, clave, valores):
+    if tabla.clave is None:
+        raise ValueError(f"La tabla {tabla.nombre} no tiene una clave de una sola columna.")
+    consulta, columnas = tabla.sql_actualizar(valores.keys())
+    with conn:
+        return conn.execute(consulta, [valores[columna] for columna in columnas] + [clave]).rowcount
+
+# Elimina un registro por su clave. Devuelve el número de filas eliminadas.
+def eliminar_registro(conn, tabla, clave):
+    if tabla.clave is None:
+        raise ValueError(f"La tabla {tabla.nombre} no tiene una clave de una sola columna.")
+    with conn:
+        return conn.execute(tabla.sql_eliminar, (clave,)).rowcount
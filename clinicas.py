@@ -0,0 +1,152 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import poblacion
+from migraciones import aplicar_migraciones
+
+# Una base de datos por clínica.
+# Cada archivo clinicas/<nombre>.db es una clínica con su propio esquema completo (pacientes,
+# responsables, mediciones y tablas derivadas): cada clínica tiene su propio bloqueo de
+# escritura y su archivo crece solo con sus mediciones. Si el directorio no tiene ninguna base
+# de datos, la aplicación funciona como antes con presion_arterial.db como clínica única.
+#
+# Los reportes entre clínicas consultan cada archivo en paralelo (un hilo y una conexión por
+# clínica; sqlite3 libera el GIL mientras SQLite ejecuta la consulta) y unen los resultados,
+# que llevan una columna 'clinica'.
+#
+# Uso:
+#   python clinicas.py crear "Clinica Norte" [--desde presion_arterial.db]
+#   python clinicas.py listar
+#   python clinicas.py reporte [--resolucion mes]
+
+DIRECTORIO_CLINICAS = 'clinicas'
+BD_PRINCIPAL = 'presion_arterial.db'
+CLINICA_PRINCIPAL = 'Principal'
+
+# Letras, números, espacios, guiones y guiones bajos: el nombre es también el del archivo.
+PATRON_NOMBRE = re.compile(r"[\w\- ]+")
+
+MAX_HILOS = 8
+
+# Clínicas disponibles {nombre: ruta}, ordenadas por nombre. Sin archivos en el directorio,
+# la única clínica es la base de datos principal.
+def listar_clinicas(directorio=DIRECTORIO_CLINICAS):
+    if os.path.isdir(directorio):
+        archivos = sorted(archivo for archivo in os.listdir(directorio) if archivo.endswith('.db'))
+        if archivos:
+            return {archivo[:-3]: os.path.join(directorio, archivo) for archivo in archivos}
+    return {CLINICA_PRINCIPAL: BD_PRINCIPAL}
+
+# Crea la base de datos de una clínica con el esquema actual. Con desde, copia antes el
+# contenido de otra base de datos (por ejemplo, la principal al pasar a varias clínicas).
+def crear_clinica(nombre, desde=None, directorio=DIRECTORIO_CLINICAS):
+    if not PATRON_NOMBRE.fullmatch(nombre) or not nombre.strip():
+        raise ValueError(f"Nombre de clínica no válido: '{nombre}' (use letras, números, espacios y guiones).")
+    ruta = os.path.join(directorio, f"{nombre.strip()}.db")
+    if os.path.exists(ruta):
+        raise ValueError(f"La clínica '{nombre}' ya existe ({ruta}).")
+    os.makedirs(directorio, exist_ok=True)
+    conn = sqlite3.connect(ruta)
+    try:
+        if desde is not None:
+            origen = sqlite3.connect(desde)
+            try:
+                origen.backup(conn)
+            finally:
+                origen.close()
+        aplicar_migraciones(conn)
+    finally:
+        conn.close()
+    return ruta
+
+# Ejecuta consulta(conn) en cada clínica en paralelo y devuelve {nombre: resultado} en el orden
+# de clinicas. Cada hilo abre y cierra su propia conexión.
+def consultar_clinicas(clinicas, consulta, max_hilos=MAX_HILOS):
+    def ejecutar(ruta):
+        conn = sqlite3.connect(ruta, timeout=5)
+        try:
+            return consulta(conn)
+        finally:
+            conn.close()
+
+    if not clinicas:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_hilos, len(clinicas)), thread_name_prefix='clinica') as hilos:
+        return dict(zip(clinicas, hilos.map(ejecutar, clinicas.values())))
+
+# Tablas de una clínica para el reporte entre clínicas (del resumen y los agregados de la
+# población, sin recorrer las mediciones).
+def _reporte_clinica(conn, resolucion):
+    return {
+        'totales': poblacion.totales_poblacion(conn),
+        'pacientes_por_categoria': poblacion.pacientes_por_categoria(conn),
+        'lecturas_en_el_tiempo': poblacion.lecturas_en_el_tiempo(conn, resolucion),
+    }
+
+# Reporte de todas las clínicas:
+#   totales                  una fila por clínica y una fila "Total"
+#   pacientes_por_categoria  categorías por clínica (una columna por clínica)
+#   lecturas_en_el_tiempo    serie de cada clínica, con la columna 'clinica'
+# Devuelve (reporte, segundos).
+def reporte_clinicas(clinicas, resolucion='mes', max_hilos=MAX_HILOS):
+    import pandas as pd
+
+    inicio = time.perf_counter()
+    por_clinica = consultar_clinicas(clinicas, lambda conn: _reporte_clinica(conn, resolucion), max_hilos)
+    totales = pd.DataFrame([{'clinica': nombre, **reporte['totales']} for nombre, reporte in por_clinica.items()])
+    if not totales.empty:
+        totales = pd.concat([totales, totales.drop(columns='clinica').sum().to_frame().T.assign(clinica='Total')], ignore_index=True)
+    categorias = {
+        nombre: reporte['pacientes_por_categoria'].set_index('categoria')['pacientes']
+        for nombre, reporte in por_clinica.items()
+    }
+    por_categoria = pd.DataFrame(categorias).fillna(0).astype(int) if categorias else pd.DataFrame()
+    series = [reporte['lecturas_en_el_tiempo'].assign(clinica=nombre) for nombre, reporte in por_clinica.items()]
+    en_el_tiempo = pd.concat(series, ignore_index=True) if series else pd.DataFrame()
+    reporte = {'totales': totales, 'pacientes_por_categoria': por_categoria, 'lecturas_en_el_tiempo': en_el_tiempo}
+    return reporte, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description="Bases de datos por clínica.")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    crear = subcomandos.add_parser('crear', help="Crea la base de datos de una clínica.")
+    crear.add_argument('nombre')
+    crear.add_argument('--desde', help="Copia el contenido de esta base de datos.")
+    subcomandos.add_parser('listar', help="Muestra las clínicas y el tamaño de sus archivos.")
+    reporte = subcomandos.add_parser('reporte', help="Reporte de población de todas las clínicas.")
+    reporte.add_argument('--resolucion', choices=('dia', 'semana', 'mes'), default='mes')
+    args = parser.parse_args()
+
+    if args.comando == 'crear':
+        try:
+            print(f"Clínica creada en {crear_clinica(args.nombre, args.desde)}.")
+        except (ValueError, sqlite3.Error) as e:
+            print(f"[ERROR] {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.comando == 'listar':
+        for nombre, ruta in listar_clinicas().items():
+            tamano = os.path.getsize(ruta) / (1024 * 1024) if os.path.exists(ruta) else 0
+            print(f"{nombre:<30} {ruta:<40} {tamano:>10.1f} MB")
+    else:
+        import pandas as pd
+        clinicas = listar_clinicas()
+        for ruta in clinicas.values():
+            conn = sqlite3.connect(ruta)
+            try:
+                aplicar_migraciones(conn)
+            finally:
+                conn.close()
+        reporte, segundos = reporte_clinicas(clinicas, args.resolucion)
+        with pd.option_context('display.width', 160, 'display.max_columns', 20):
+            for nombre, tabla in reporte.items():
+                print(f"== {nombre}")
+                print(tabla)
+        print(f"Total: {segundos * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import sqlite3
+import threading
+
+# Gestor de conexiones SQLite seguro entre hilos.
+# Streamlit ejecuta cada sesión (y cada rerun) en su propio hilo, así que cada hilo
+# recibe su propia conexión. Las conexiones de hilos que ya terminaron vuelven a un
+# conjunto de conexiones libres para reutilizarse sin tener que abrir otra.
+# El modo WAL permite que muchos lectores consulten mientras un escritor inserta.
+
+class GestorConexiones:
+    def __init__(self, ruta_bd, busy_timeout_ms=5000, mmap_size=256 * 1024 * 1024):
+        self.ruta_bd = ruta_bd
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self._lock = threading.Lock()
+        self._asignadas = {}
+        self._libres = []
+        # journal_mode=WAL es persistente en el archivo: basta con activarlo una vez.
+        self.conexion().execute("PRAGMA journal_mode = WAL")
+
+    # Abre una conexión nueva con los PRAGMA de rendimiento.
+    def _abrir(self):
+        conn = sqlite3.connect(self.ruta_bd, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    # Devuelve a la lista de libres las conexiones de hilos que ya terminaron.
+    def _recuperar_conexiones(self):
+        for hilo in [hilo for hilo in self._asignadas if not hilo.is_alive()]:
+            conn = self._asignadas.pop(hilo)
+            if conn.in_transaction:
+                conn.rollback()
+            self._libres.append(conn)
+
+    # Devuelve la conexión del hilo actual, creándola o reutilizando una libre si hace falta.
+    def conexion(self):
+        hilo = threading.current_thread()
+        with self._lock:
+            conn = self._asignadas.get(hilo)
+            if conn is None:
+                self._recuperar_conexiones()
+                conn = self._libres.pop() if self._libres else self._abrir()
+                self._asignadas[hilo] = conn
+        return conn
+
+    # Número de conexiones abiertas (asignadas y libres).
+    def total_conexiones(self):
+        with self._lock:
+            return len(self._asignadas) + len(self._libres)
+
+    # Cierra todas las conexiones; se usa al apagar el proceso o en pruebas.
+    def cerrar_todas(self):
+        with self._lock:
+            for conn in list(self._asignadas.values()) + self._libres:
+                conn.close()
+            self._asignadas.clear()
+            self._libres.clear()
@@ -0,0 +1,52 @@
+import pandas as pd
+
+# Capa de acceso a datos para el tablero de pacientes.
+# En lugar de lanzar dos consultas por paciente (historial y mediciones), se cargan
+# todos los pacientes y todas las mediciones con dos consultas y se agrupan en memoria.
+
+COLUMNAS_MEDICIONES = ['id', 'id_paciente', 'fecha', 'sistolica', 'diastolica']
+
+# Función para cargar todos los pacientes con su historial clínico en una sola consulta.
+def cargar_pacientes_con_historial(conn):
+    return pd.read_sql_query("SELECT id, nombre, edad, historial FROM pacientes ORDER BY id", conn)
+
+# Función para cargar las mediciones de todos los pacientes, ordenadas por paciente y fecha.
+def cargar_mediciones(conn):
+    consulta = f"SELECT {', '.join(COLUMNAS_MEDICIONES)} FROM mediciones ORDER BY id_paciente, fecha"
+    return pd.read_sql_query(consulta, conn)
+
+# Función para separar las mediciones por paciente con un único groupby.
+# Devuelve un diccionario {id_paciente: DataFrame} con índices reiniciados.
+def agrupar_por_paciente(mediciones_df):
+    return {
+        id_paciente: grupo.reset_index(drop=True)
+        for id_paciente, grupo in mediciones_df.groupby('id_paciente', sort=False)
+    }
+
+# Función que reúne todo lo necesario para dibujar el tablero con dos consultas en total.
+def cargar_tablero(conn):
+    pacientes_df = cargar_pacientes_con_historial(conn)
+    mediciones_por_paciente = agrupar_por_paciente(cargar_mediciones(conn))
+    return pacientes_df, mediciones_por_paciente
+
+# Función para obtener una página de pacientes por keyset: los que tienen id mayor que despues_de_id.
+# Con busqueda se filtra por nombre (sin distinguir mayúsculas). Devuelve (filas, hay_siguiente).
+# Cada fila es (id, nombre, total, ultima_sistolica, ultima_diastolica, ultima_categoria), leídos
+# del resumen precalculado; total es None si el paciente no tiene mediciones.
+def listar_pacientes_pagina(conn, despues_de_id=0, tamano_pagina=20, busqueda=None):
+    consulta = """
+    SELECT p.id, p.nombre, r.total, r.ultima_sistolica, r.ultima_diastolica, r.ultima_categoria
+    FROM pacientes p
+    LEFT JOIN resumen_paciente r ON r.id_paciente = p.id
+    WHERE p.id > ?
+    """
+    params = [despues_de_id]
+    if busqueda:
+        patron = busqueda.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        consulta += " AND p.nombre LIKE ? ESCAPE '\\'"
+        params.append(f"%{patron}%")
+    # Se pide una fila de más para saber si existe una página siguiente.
+    consulta += " ORDER BY p.id LIMIT ?"
+    params.append(tamano_pagina + 1)
+    filas = conn.execute(consulta, params).fetchall()
+    return filas[:tamano_pagina], len(filas) > tamano_pagina
@@ -1,8 +1,11 @@
 import streamlit as st
-from PIL import Image
 import os
 import sqlite3
 import pandas as pd
+from catalogo_bd import CatalogoEsquema, actualizar_registro, eliminar_registro, insertar_registro, leer_registro
+from clinicas import DIRECTORIO_CLINICAS
+from explorador_tablas import OPERADORES, contar_filas, firma_archivo, leer_pagina
+from edicion_lotes import aplicar_diff, contar_filtradas, diff_editor, eliminar_filtradas
 
 # Configuración inicial de la página de Streamlit
 st.set_page_config(
@@ -20,8 +23,13 @@ st.set_page_config(
 )
 
 # Funciones auxiliares
+# Bases de datos del directorio y, si existe, las de las clínicas (clinicas/<nombre>.db).
 def listar_bases_datos(ruta_directorio):
-    return [archivo for archivo in os.listdir(ruta_directorio) if archivo.endswith('.db')]
+    archivos = sorted(archivo for archivo in os.listdir(ruta_directorio) if archivo.endswith('.db'))
+    ruta_clinicas = os.path.join(ruta_directorio, DIRECTORIO_CLINICAS)
+    if os.path.isdir(ruta_clinicas):
+        archivos += [os.path.join(DIRECTORIO_CLINICAS, archivo) for archivo in sorted(os.listdir(ruta_clinicas)) if archivo.endswith('.db')]
+    return archivos
 
 def conectar_bd(ruta_bd):
     try:
@@ -30,26 +38,35 @@ def conectar_bd(ruta_bd):
         st.error(f"Error al conectar con la base de datos: {e}")
         return None
 
-def obtener_esquema_bd(conn):
-    return pd.read_sql_query("SELECT name FROM sqlite_master WHERE type='table';", conn)
+# Catálogo del esquema de cada archivo, compartido entre reruns y sesiones; se recarga solo
+# cuando cambia PRAGMA schema_version.
+@st.cache_resource(show_spinner=False)
+def obtener_catalogo(ruta_absoluta):
+    return CatalogoEsquema()
 
-def obtener_datos_tabla(conn, tabla):
-    return pd.read_sql_query(f"SELECT * FROM {tabla};", conn)
+# Conteo acotado de filas, en caché hasta que cambie el archivo de la base de datos.
+@st.cache_data(show_spinner=False, max_entries=256)
+def contar_filas_en_cache(ruta_bd, firma, tabla, filtros):
+    conn = sqlite3.connect(ruta_bd)
+    try:
+        return contar_filas(conn, tabla, filtros)
+    finally:
+        conn.close()
+
+# Reinicia la paginación cuando cambia la tabla, la proyección, el filtro o el orden.
+def reiniciar_paginas_si_cambia(firma_consulta):
+    if st.session_state.get('firma_consulta_tabla') != firma_consulta:
+        st.session_state['firma_consulta_tabla'] = firma_consulta
+        st.session_state['paginas_tabla'] = [None]
 
-def obtener_columnas_tabla(conn, tabla):
-    columnas = pd.read_sql_query(f"PRAGMA table_info({tabla});", conn)
-    return columnas['name'].tolist()
 
-def actualizar_registro(conn, tabla, id_registro, valores_nuevos):
-    columnas = ', '.join([f"{k} = ?" for k in valores_nuevos.keys()])
-    valores = list(valores_nuevos.values()) + [id_registro]
-    query = f"UPDATE {tabla} SET {columnas} WHERE id = ?"
-    conn.execute(query, valores)
-    conn.commit()
+# Logo de la aplicación, leído una vez por proceso como bytes PNG.
+@st.cache_resource(show_spinner=False)
+def cargar_logo(ruta='img/logo_bd.png'):
+    with open(ruta, 'rb') as archivo:
+        return archivo.read()
 
-# Carga y muestra el logo de la aplicación.
-logo = Image.open('img/logo_bd.png')
-st.image(logo, width=250)
+st.image(cargar_logo(), width=250)
 
 # Título principal y descripción de la aplicación.
 st.title('🗃️ Gestor de Base de Datos SQLite')
@@ -68,63 +85,148 @@ with st.sidebar:
     if base_datos_seleccionada:
         conn = conectar_bd(base_datos_seleccionada)
         if conn:
-            c = conn.cursor()
-            esquema = obtener_esquema_bd(conn)
-            tabla_seleccionada = st.selectbox('Selecciona una tabla', esquema['name'])
+            catalogo = obtener_catalogo(os.path.abspath(base_datos_seleccionada)).actualizar(conn)
+            tabla_seleccionada = st.selectbox('Selecciona una tabla', list(catalogo.tablas))
+            tabla = catalogo.tabla(tabla_seleccionada) if tabla_seleccionada else None
 
-            # Inserción de registros
+            # Inserción de registros (las columnas vacías toman su valor por defecto)
             st.subheader(f"Añadir registro a {tabla_seleccionada}")
-            if tabla_seleccionada:
-                columnas_tabla = obtener_columnas_tabla(conn, tabla_seleccionada)
-                valores_nuevos = {col: st.text_input(f"Valor para {col}", key=col) for col in columnas_tabla}
+            if tabla:
+                valores_nuevos = {col: st.text_input(f"Valor para {col}", key=col) for col in tabla.columnas}
                 if st.button(f"Añadir registro a {tabla_seleccionada}"):
-                    columnas = ', '.join(valores_nuevos.keys())
-                    placeholders = ', '.join(['?'] * len(valores_nuevos))
-                    query = f"INSERT INTO {tabla_seleccionada} ({columnas}) VALUES ({placeholders})"
                     try:
-                        c.execute(query, list(valores_nuevos.values()))
-                        conn.commit()
+                        insertar_registro(conn, tabla, {col: valor for col, valor in valores_nuevos.items() if valor != ''})
                         st.success("Registro añadido exitosamente.")
                     except sqlite3.DatabaseError as e:
                         st.error(f"Error al añadir registro: {e}")
 
             # Actualización de registros
             st.subheader(f"Actualizar registro en {tabla_seleccionada}")
-            if tabla_seleccionada:
-                id_actualizar = st.text_input("ID del registro a actualizar", key="update")
+            if tabla and tabla.clave:
+                id_actualizar = st.text_input(f"{tabla.clave} del registro a actualizar", key="update")
                 if id_actualizar:
                     try:
-                        registro_actual = pd.read_sql_query(f"SELECT * FROM {tabla_seleccionada} WHERE id = {id_actualizar};", conn)
-                        if not registro_actual.empty:
-                            st.write("Registro Actual:", registro_actual)
-                            valores_actualizados = {col: st.text_input(f"Nuevo valor para {col}", value=str(registro_actual.iloc[0][col]), key=col + "_update") for col in columnas_tabla}
+                        registro_actual = leer_registro(conn, tabla, id_actualizar)
+                        if registro_actual is not None:
+                            st.write("Registro Actual:", pd.DataFrame([registro_actual]))
+                            # Un valor vacío se guarda como NULL.
+                            valores_actualizados = {col: st.text_input(f"Nuevo valor para {col}", value='' if registro_actual[col] is None else str(registro_actual[col]), key=col + "_update") for col in tabla.columnas}
                             if st.button(f"Actualizar registro en {tabla_seleccionada}"):
-                                actualizar_registro(conn, tabla_seleccionada, id_actualizar, valores_actualizados)
+                                actualizar_registro(conn, tabla, id_actualizar, {col: valor if valor != '' else None for col, valor in valores_actualizados.items()})
                                 st.success("Registro actualizado exitosamente.")
+                        else:
+                            st.write("No existe un registro con ese valor.")
                     except sqlite3.DatabaseError as e:
                         st.error(f"Error al actualizar registro: {e}")
+            elif tabla:
+                st.caption("La tabla no tiene una clave de una sola columna.")
 
             # Eliminación de registros
             st.subheader(f"Eliminar registro de {tabla_seleccionada}")
-            if tabla_seleccionada:
-                registro_id = st.text_input("ID del registro a eliminar", key="delete")
+            if tabla and tabla.clave:
+                registro_id = st.text_input(f"{tabla.clave} del registro a eliminar", key="delete")
                 if st.button(f"Eliminar registro de {tabla_seleccionada}"):
                     try:
-                        c.execute(f"DELETE FROM {tabla_seleccionada} WHERE id = ?", (registro_id,))
-                        conn.commit()
-                        st.success("Registro eliminado exitosamente.")
+                        if eliminar_registro(conn, tabla, registro_id):
+                            st.success("Registro eliminado exitosamente.")
+                        else:
+                            st.warning("No existe un registro con ese valor.")
                     except sqlite3.DatabaseError as e:
                         st.error(f"Error al eliminar registro: {e}")
+            elif tabla:
+                st.caption("La tabla no tiene una clave de una sola columna.")
 
-# Área principal para la visualización de la base de datos
+# Área principal para la visualización de la base de datos: una página cada vez, con la
+# proyección, el filtro y el orden resueltos en SQLite.
 if base_datos_seleccionada and tabla_seleccionada:
     st.header(f"Datos de la tabla {tabla_seleccionada}")
+    if 'resultado_lote' in st.session_state:
+        st.success(st.session_state.pop('resultado_lote'))
+    filtros = ()
     try:
-        datos_tabla = obtener_datos_tabla(conn, tabla_seleccionada)
-        st.write(datos_tabla)
+        todas_columnas = tabla.columnas
+        columnas_visibles = st.multiselect("Columnas", options=todas_columnas, default=todas_columnas, key=f"columnas_{tabla_seleccionada}")
+
+        # Dos condiciones combinadas con Y, suficientes para un rango (p. ej. fecha ≥ ... y fecha < ...).
+        for numero, etiqueta in enumerate(("Filtrar por", "Y además")):
+            sufijo = f"_{numero}" if numero else ""
+            col_filtro, col_operador, col_valor = st.columns(3)
+            columna_filtro = col_filtro.selectbox(etiqueta, options=['(sin filtro)'] + todas_columnas, key=f"columna_filtro{sufijo}")
+            operador_filtro = col_operador.selectbox("Operador", options=list(OPERADORES), key=f"operador_filtro{sufijo}")
+            valor_filtro = col_valor.text_input("Valor", key=f"valor_filtro{sufijo}")
+            if columna_filtro != '(sin filtro)' and (valor_filtro or not OPERADORES[operador_filtro][1]):
+                filtros += ((columna_filtro, operador_filtro, valor_filtro),)
+
+        col_orden, col_direccion, col_tamano = st.columns(3)
+        columna_orden = col_orden.selectbox("Ordenar por", options=['(orden de inserción)'] + todas_columnas, key="columna_orden")
+        descendente = col_direccion.radio("Dirección", options=["Ascendente", "Descendente"], horizontal=True, key="direccion_orden") == "Descendente"
+        tamano_pagina = col_tamano.selectbox("Filas por página", options=[50, 100, 500, 1000], index=1, key="tamano_pagina_tabla")
+        orden = None if columna_orden == '(orden de inserción)' else columna_orden
+
+        reiniciar_paginas_si_cambia((base_datos_seleccionada, tabla_seleccionada, tuple(columnas_visibles), filtros, orden, descendente, tamano_pagina))
+        paginas = st.session_state['paginas_tabla']
+        # Pila de páginas visitadas: cada entrada es el último rowid de la página anterior
+        # (paginación keyset); con LIMIT/OFFSET solo cuenta la posición en la pila.
+        inicio = paginas[-1]
+        pagina, hay_siguiente, ultimo_rowid = leer_pagina(
+            conn, tabla_seleccionada, columnas_visibles or None, filtros, orden, descendente, tamano_pagina,
+            numero_pagina=len(paginas) - 1, despues_de_rowid=inicio, con_rowid=tabla.con_rowid)
+
+        total, exacto = contar_filas_en_cache(base_datos_seleccionada, firma_archivo(base_datos_seleccionada), tabla_seleccionada, filtros)
+        st.caption(f"{total:,}{'' if exacto else '+'} filas · página {len(paginas)}")
+
+        # Sin rowid, la clave de la fila tiene que estar entre las columnas mostradas para poder editar.
+        editable = tabla.clave_fila is not None and (tabla.con_rowid or tabla.clave_fila in pagina.columns)
+        if editable:
+            st.caption("Edita, agrega o elimina filas en la cuadrícula y guarda todos los cambios en una transacción.")
+            clave_editor = f"editor_{st.session_state.get('version_editor', 0)}_{hash(st.session_state['firma_consulta_tabla'])}_{len(paginas)}"
+            st.data_editor(pagina, num_rows="dynamic", key=clave_editor,
+                           disabled=[] if tabla.con_rowid else [tabla.clave_fila])
+            claves_filas = [int(clave) for clave in pagina.index] if tabla.con_rowid else pagina[tabla.clave_fila].tolist()
+            diff = diff_editor(st.session_state.get(clave_editor, {}), claves_filas)
+            pendientes = sum(len(cambios) for cambios in diff.values())
+            if st.button(f"Guardar cambios ({pendientes})", key="guardar_cambios", disabled=pendientes == 0):
+                try:
+                    resultado = aplicar_diff(conn, tabla, diff)
+                    st.session_state['version_editor'] = st.session_state.get('version_editor', 0) + 1
+                    st.session_state['resultado_lote'] = f"Cambios guardados: {resultado}."
+                    st.rerun()
+                except (sqlite3.DatabaseError, ValueError) as e:
+                    st.error(f"No se guardó ningún cambio: {e}")
+        else:
+            st.dataframe(pagina)
+
+        col_anterior, _, col_siguiente = st.columns(3)
+        if col_anterior.button("Anterior", key="tabla_anterior", disabled=len(paginas) == 1):
+            paginas.pop()
+            st.rerun()
+        if col_siguiente.button("Siguiente", key="tabla_siguiente", disabled=not hay_siguiente):
+            paginas.append(ultimo_rowid)
+            st.rerun()
     except sqlite3.DatabaseError as e:
         st.error(f"Error al cargar datos de la tabla {tabla_seleccionada}: {e}")
 
+    # Eliminación en bloque de las filas que cumplen el filtro actual, con conteo previo.
+    with st.expander("Eliminar filas que cumplen el filtro"):
+        if not filtros:
+            st.write("Define al menos un filtro en la parte superior para elegir las filas a eliminar.")
+        else:
+            condicion = " y ".join(f"{columna} {operador} {valor}".strip() for columna, operador, valor in filtros)
+            st.write(f"Condición: {condicion}")
+            if st.button("Contar filas afectadas", key="contar_eliminacion"):
+                st.session_state['conteo_eliminacion'] = (filtros, contar_filtradas(conn, tabla, filtros))
+            conteo = st.session_state.get('conteo_eliminacion')
+            if conteo and conteo[0] == filtros:
+                st.info(f"Se eliminarían {conteo[1]:,} filas.")
+                if st.button(f"Eliminar {conteo[1]:,} filas", key="confirmar_eliminacion", type="primary"):
+                    try:
+                        resultado = eliminar_filtradas(conn, tabla, filtros)
+                        del st.session_state['conteo_eliminacion']
+                        st.session_state['resultado_lote'] = f"{resultado.eliminadas:,} filas eliminadas en {resultado.segundos * 1000:.1f} ms."
+                        st.rerun()
+                    except (sqlite3.DatabaseError, ValueError) as e:
+                        st.error(f"Error al eliminar filas: {e}")
+
     if conn:
         conn.close()
         
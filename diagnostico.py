@@ -0,0 +1,63 @@
+# Clasificación de mediciones de presión arterial.
+# generar_diagnostico clasifica una sola lectura; codigos_diagnostico y clasificar_mediciones
+# aplican exactamente las mismas reglas a columnas completas con np.select, que evalúa las
+# condiciones en el mismo orden que la cadena if/elif. numpy y pandas se importan dentro de
+# las versiones vectorizadas: el módulo se carga (a través de las migraciones) antes del
+# inicio de sesión y la versión escalar no los necesita.
+
+NORMAL = ("Normal", "Mantener estilo de vida saludable y monitoreo regular.")
+ALTA = ("Presión arterial alta", "Consultar con el médico para evaluación y posible tratamiento.")
+ALTA_CON_RIESGO = ("Presión arterial alta (con factores de riesgo)", "Seguimiento cercano con el médico y considerar cambios en el estilo de vida.")
+PELIGROSAMENTE_ALTA = ("Presión arterial peligrosamente alta", "Buscar atención médica inmediata.")
+ELEVADA = ("Presión arterial elevada", "Monitorizar y consultar con el médico.")
+
+# Orden de las ramas; el código de cada categoría es su posición en esta tupla.
+DIAGNOSTICOS = (NORMAL, ALTA, ALTA_CON_RIESGO, PELIGROSAMENTE_ALTA, ELEVADA)
+CATEGORIAS = tuple(diagnostico for diagnostico, _ in DIAGNOSTICOS)
+
+# Función para generar diagnósticos y recomendaciones basados en las mediciones de presión arterial.
+# La crisis hipertensiva (≥180 o ≥120) se evalúa primero: en el orden anterior las ramas de
+# presión alta la capturaban y "peligrosamente alta" nunca se devolvía.
+def generar_diagnostico(sistolica, diastolica):
+    if 180 <= sistolica or 120 <= diastolica:
+        return PELIGROSAMENTE_ALTA
+    elif sistolica < 120 and diastolica < 80:
+        return NORMAL
+    elif 140 <= sistolica or 90 <= diastolica:
+        return ALTA
+    elif 130 <= sistolica or 80 <= diastolica:
+        return ALTA_CON_RIESGO
+    else:
+        return ELEVADA
+
+# Versión vectorizada: devuelve el código (posición en DIAGNOSTICOS) de cada par sistólica/diastólica.
+def codigos_diagnostico(sistolica, diastolica):
+    import numpy as np
+
+    s = np.asarray(sistolica)
+    d = np.asarray(diastolica)
+    condiciones = [
+        (180 <= s) | (120 <= d),
+        (s < 120) & (d < 80),
+        (140 <= s) | (90 <= d),
+        (130 <= s) | (80 <= d),
+    ]
+    return np.select(condiciones, [3, 0, 1, 2], default=4).astype(np.int8)
+
+# Versión vectorizada: devuelve el diagnóstico de cada lectura como pd.Categorical con CATEGORIAS.
+def clasificar_mediciones(sistolica, diastolica):
+    import pandas as pd
+
+    return pd.Categorical.from_codes(codigos_diagnostico(sistolica, diastolica), categories=CATEGORIAS)
+
+# Versión SQL de las mismas reglas, para usarla en consultas y triggers de SQLite.
+# Devuelve una expresión CASE que evalúa al código de la categoría.
+def expresion_sql_codigo(sistolica='sistolica', diastolica='diastolica'):
+    s, d = sistolica, diastolica
+    return (
+        f"(CASE WHEN 180 <= {s} OR 120 <= {d} THEN 3"
+        f" WHEN {s} < 120 AND {d} < 80 THEN 0"
+        f" WHEN 140 <= {s} OR 90 <= {d} THEN 1"
+        f" WHEN 130 <= {s} OR 80 <= {d} THEN 2"
+        f" ELSE 4 END)"
+    )
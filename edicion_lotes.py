@@ -0,0 +1,130 @@
+import time
+
+import agregados
+import cambios
+import poblacion
+import resumen
+from catalogo_bd import citar_identificador
+from explorador_tablas import clausula_filtros
+from migraciones import OBJETOS_DERIVADOS
+
+# Edición por lotes para db_manager.py: los cambios hechos en la cuadrícula editable
+# (st.data_editor) se aplican como un diff en una sola transacción, agrupando las filas que
+# modifican las mismas columnas en un executemany, y los borrados por filtro o rango se
+# pueden contar antes de ejecutarlos. Cada operación informa filas afectadas y duración.
+#
+# Las filas se identifican por rowid o, en las tablas WITHOUT ROWID, por su clave primaria
+# de una sola columna (TablaCatalogo.clave_fila).
+#
+# Los triggers del resumen y de los agregados mantienen las tablas calculadas fila por fila;
+# con lotes grandes de mediciones es más barato quitarlos, aplicar el lote y reconstruir esas
+# tablas una sola vez en la misma transacción.
+UMBRAL_RECONSTRUCCION = 500
+
+class ResultadoLote:
+    def __init__(self):
+        self.actualizadas = 0
+        self.insertadas = 0
+        self.eliminadas = 0
+        self.sentencias = 0
+        self.segundos = 0.0
+
+    @property
+    def filas_afectadas(self):
+        return self.actualizadas + self.insertadas + self.eliminadas
+
+    def __str__(self):
+        return (f"{self.actualizadas} actualizadas, {self.insertadas} insertadas y {self.eliminadas} eliminadas "
+                f"en {self.segundos * 1000:.1f} ms ({self.sentencias} sentencias)")
+
+# Quita los triggers de los objetos derivados si el lote es lo bastante grande para que
+# compense reconstruirlos. Debe llamarse dentro de una transacción abierta con BEGIN.
+def _suspender_derivados(conn, tabla, filas):
+    if tabla.nombre != 'mediciones' or filas < UMBRAL_RECONSTRUCCION:
+        return False
+    resumen.eliminar_triggers(conn)
+    agregados.eliminar_triggers(conn)
+    poblacion.eliminar_triggers(conn)
+    cambios.eliminar_triggers(conn)
+    return True
+
+# Reinstala los triggers y reconstruye las tablas calculadas tras un lote grande.
+def _reinstalar_derivados(conn):
+    for instalar in OBJETOS_DERIVADOS:
+        instalar(conn)
+
+# Convierte el estado de st.data_editor ({'edited_rows', 'added_rows', 'deleted_rows'}, con
+# posiciones de fila) en un diff con las claves de las filas. claves es la lista de claves de
+# las filas mostradas, en orden.
+def diff_editor(estado, claves):
+    return {
+        'actualizaciones': [(claves[int(posicion)], cambios) for posicion, cambios in estado.get('edited_rows', {}).items() if cambios],
+        'inserciones': [fila for fila in estado.get('added_rows', []) if fila],
+        'eliminaciones': [claves[int(posicion)] for posicion in estado.get('deleted_rows', [])],
+    }
+
+# Agrupa diccionarios {columna: valor} por su conjunto de columnas (en el orden de la tabla).
+def _agrupar_por_columnas(tabla, filas):
+    grupos = {}
+    for clave, valores in filas:
+        columnas = tuple(tabla.validar_columnas(valores.keys()))
+        grupos.setdefault(columnas, []).append((clave, valores))
+    return grupos
+
+# Aplica el diff en una transacción. Si una sentencia falla no se aplica ningún cambio.
+def aplicar_diff(conn, tabla, diff):
+    if tabla.clave_fila is None:
+        raise ValueError(f"La tabla {tabla.nombre} no tiene rowid ni una clave de una sola columna.")
+    resultado = ResultadoLote()
+    nombre = citar_identificador(tabla.nombre)
+    clave = tabla.clave_fila if tabla.clave_fila == 'rowid' else citar_identificador(tabla.clave_fila)
+    inicio = time.perf_counter()
+    with conn:
+        # BEGIN explícito: sqlite3 no abre la transacción antes de un DROP TRIGGER.
+        conn.execute("BEGIN")
+        suspendidos = _suspender_derivados(conn, tabla, sum(len(diff[parte]) for parte in diff))
+        for columnas, filas in _agrupar_por_columnas(tabla, diff['actualizaciones']).items():
+            asignaciones = ', '.join(f"{citar_identificador(columna)} = ?" for columna in columnas)
+            cursor = conn.executemany(f"UPDATE {nombre} SET {asignaciones} WHERE {clave} = ?",
+                                      [[valores[columna] for columna in columnas] + [clave_fila] for clave_fila, valores in filas])
+            resultado.actualizadas += cursor.rowcount
+            resultado.sentencias += 1
+        for columnas, filas in _agrupar_por_columnas(tabla, [(None, fila) for fila in diff['inserciones']]).items():
+            lista = ', '.join(citar_identificador(columna) for columna in columnas)
+            cursor = conn.executemany(f"INSERT INTO {nombre} ({lista}) VALUES ({', '.join('?' * len(columnas))})",
+                                      [[valores[columna] for columna in columnas] for _, valores in filas])
+            resultado.insertadas += cursor.rowcount
+            resultado.sentencias += 1
+        if diff['eliminaciones']:
+            cursor = conn.executemany(f"DELETE FROM {nombre} WHERE {clave} = ?", [(clave_fila,) for clave_fila in diff['eliminaciones']])
+            resultado.eliminadas += cursor.rowcount
+            resultado.sentencias += 1
+        if suspendidos:
+            _reinstalar_derivados(conn)
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+# Cuenta (sin modificar nada) las filas que eliminaría eliminar_filtradas.
+def contar_filtradas(conn, tabla, filtros):
+    tabla.validar_columnas([columna for columna, _, _ in filtros])
+    where, params = clausula_filtros(filtros)
+    return conn.execute(f"SELECT COUNT(*) FROM {citar_identificador(tabla.nombre)}{where}", params).fetchone()[0]
+
+# Elimina en una transacción las filas que cumplen todos los filtros (columna, operador, valor).
+# Sin filtros no se elimina nada: vaciar una tabla no es un borrado por rango.
+def eliminar_filtradas(conn, tabla, filtros):
+    if not filtros:
+        raise ValueError("Se necesita al menos un filtro para eliminar filas en bloque.")
+    tabla.validar_columnas([columna for columna, _, _ in filtros])
+    where, params = clausula_filtros(filtros)
+    resultado = ResultadoLote()
+    inicio = time.perf_counter()
+    with conn:
+        conn.execute("BEGIN")
+        suspendidos = _suspender_derivados(conn, tabla, contar_filtradas(conn, tabla, filtros))
+        resultado.eliminadas = conn.execute(f"DELETE FROM {citar_identificador(tabla.nombre)}{where}", params).rowcount
+        if suspendidos:
+            _reinstalar_derivados(conn)
+    resultado.sentencias = 1
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
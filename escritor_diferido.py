@@ -0,0 +1,217 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Escritura diferida (write-behind) para las inserciones de las aplicaciones.
+# Un único hilo escritor, con su propia conexión, toma las inserciones de una cola acotada y
+# aplica todas las pendientes en una sola transacción. Así las sesiones de Streamlit no
+# compiten entre sí por el bloqueo de escritura de SQLite y el COMMIT (y su fsync) se reparte
+# entre todas las inserciones del lote.
+#
+# enviar() devuelve un Future que se resuelve con el lastrowid después del COMMIT: quien
+# espera el resultado tiene la confirmación de que la fila está en disco. Cada inserción va en
+# su propio SAVEPOINT, de modo que una que falla no arrastra a las demás del lote.
+# Si la cola está llena, enviar() espera hasta espera_cola segundos y lanza ColaLlena. Si el
+# hilo escritor no puede abrir la base de datos, el lote falla con EscrituraNoConfirmada y el
+# siguiente lote vuelve a intentarlo. ejecutar() lanza la misma excepción si la confirmación
+# no llega en espera_confirmacion segundos o si SQLite rechazó la escritura (la causa queda
+# encadenada). ejecutar_varias() aplica muchas filas con una sola sentencia (executemany),
+# para las importaciones: cada lote del archivo es una escritura más de la cola, así que no
+# retiene el bloqueo de escritura frente a las sesiones que guardan mediciones sueltas.
+
+# La escritura no llegó a confirmarse.
+class EscrituraNoConfirmada(RuntimeError):
+    pass
+
+class ColaLlena(EscrituraNoConfirmada):
+    pass
+
+class EscritorDiferido:
+    def __init__(self, ruta_bd, max_pendientes=1000, max_lote=500, espera_cola=5.0, busy_timeout_ms=5000, espera_confirmacion=None):
+        self.ruta_bd = ruta_bd
+        self.max_lote = max_lote
+        self.espera_cola = espera_cola
+        self.espera_confirmacion = espera_confirmacion
+        self.busy_timeout_ms = busy_timeout_ms
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._lock = threading.Lock()
+        self._cerrado = False
+        self.lotes = 0
+        self.escrituras = 0
+        self.fallidas = 0
+        self.lote_maximo = 0
+        self.rechazos_cola = 0
+        self._latencias_commit = deque(maxlen=1000)
+        self._hilo = threading.Thread(target=self._ejecutar, name='escritor_diferido', daemon=True)
+        self._hilo.start()
+
+    # Encola una sentencia de escritura y devuelve un Future con su lastrowid (con varias, la
+    # sentencia se aplica a cada fila de parametros y el Future da las filas afectadas).
+    def enviar(self, sql, parametros=(), varias=False):
+        if self._cerrado:
+            raise RuntimeError("El escritor diferido está cerrado.")
+        if not self._hilo.is_alive():
+            raise EscrituraNoConfirmada("El hilo escritor terminó de forma inesperada.")
+        futuro = Future()
+        try:
+            self._cola.put((sql, parametros, futuro, varias), timeout=self.espera_cola)
+        except queue.Full:
+            with self._lock:
+                self.rechazos_cola += 1
+            raise ColaLlena(f"Hay {self._cola.qsize()} escrituras pendientes; inténtalo de nuevo en unos segundos.") from None
+        # El hilo pudo terminar entre la comprobación y el put; nadie más vaciaría la cola.
+        if not self._hilo.is_alive():
+            self._fallar_pendientes(EscrituraNoConfirmada("El hilo escritor terminó de forma inesperada."))
+        return futuro
+
+    # Encola y espera la confirmación (hasta timeout o espera_confirmacion segundos; sin
+    # límite si ambos son None); devuelve el lastrowid.
+    def ejecutar(self, sql, parametros=(), timeout=None):
+        return self._esperar(self.enviar(sql, parametros), timeout)
+
+    # Como ejecutar, con una fila de parámetros por elemento de filas; devuelve las filas afectadas.
+    def ejecutar_varias(self, sql, filas, timeout=None):
+        return self._esperar(self.enviar(sql, filas, varias=True), timeout)
+
+    def _esperar(self, futuro, timeout):
+        timeout = self.espera_confirmacion if timeout is None else timeout
+        try:
+            return futuro.result(timeout)
+        except TimeoutError:
+            raise EscrituraNoConfirmada(f"La escritura no se confirmó en {timeout:g} s; puede aplicarse más tarde.") from None
+        except sqlite3.Error as e:
+            raise EscrituraNoConfirmada(f"No se pudo guardar: {e}") from e
+
+    def _abrir(self):
+        conn = sqlite3.connect(self.ruta_bd, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            # FULL: una escritura confirmada sobrevive a un corte de luz; el fsync se paga una vez por lote.
+            conn.execute("PRAGMA synchronous = FULL")
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    # Toma la primera escritura (bloqueando) y las que ya estén en cola, hasta max_lote.
+    # Devuelve None si llegó la señal de cierre y no queda nada pendiente.
+    def _siguiente_lote(self):
+        lote = []
+        item = self._cola.get()
+        while item is not None:
+            lote.append(item)
+            if len(lote) >= self.max_lote:
+                break
+            try:
+                item = self._cola.get_nowait()
+            except queue.Empty:
+                break
+        else:
+            # Señal de cierre: se escribe lo que ya se había tomado y se termina.
+            return lote or None
+        return lote
+
+    # La conexión se abre con el primer lote; si no se puede abrir (archivo inaccesible,
+    # base de datos bloqueada), ese lote falla y el siguiente lo intenta de nuevo.
+    def _ejecutar(self):
+        conn = None
+        try:
+            while True:
+                lote = self._siguiente_lote()
+                if lote is None:
+                    break
+                if conn is None:
+                    try:
+                        conn = self._abrir()
+                    except sqlite3.Error as e:
+                        self._fallar_lote(lote, EscrituraNoConfirmada(f"No se pudo abrir la base de datos {self.ruta_bd}: {e}"))
+                        continue
+                self._escribir_lote(conn, lote)
+                if self._cerrado and self._cola.empty():
+                    break
+        finally:
+            if conn is not None:
+                conn.close()
+            # Escrituras que llegaron a encolarse mientras se cerraba.
+            self._fallar_pendientes(RuntimeError("El escritor diferido está cerrado."))
+
+    def _fallar_lote(self, lote, error):
+        with self._lock:
+            self.lotes += 1
+            self.fallidas += len(lote)
+            self.lote_maximo = max(self.lote_maximo, len(lote))
+        for _, _, futuro, _ in lote:
+            futuro.set_exception(error)
+
+    # Resuelve con el error los futuros de todas las escrituras que siguen en la cola.
+    def _fallar_pendientes(self, error):
+        while True:
+            try:
+                item = self._cola.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and not item[2].done():
+                item[2].set_exception(error)
+
+    # Aplica un lote en una transacción y resuelve los futuros tras el COMMIT.
+    def _escribir_lote(self, conn, lote):
+        resultados = []
+        inicio = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql, parametros, _, varias in lote:
+                conn.execute("SAVEPOINT escritura")
+                try:
+                    if varias:
+                        resultados.append((conn.executemany(sql, parametros).rowcount, None))
+                    else:
+                        resultados.append((conn.execute(sql, parametros).lastrowid, None))
+                    conn.execute("RELEASE escritura")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO escritura")
+                    conn.execute("RELEASE escritura")
+                    resultados.append((None, e))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            resultados = [(None, e)] * len(lote)
+        duracion = time.perf_counter() - inicio
+        with self._lock:
+            self.lotes += 1
+            self.escrituras += sum(1 for _, error in resultados if error is None)
+            self.fallidas += sum(1 for _, error in resultados if error is not None)
+            self.lote_maximo = max(self.lote_maximo, len(lote))
+            self._latencias_commit.append(duracion)
+        for (_, _, futuro, _), (resultado, error) in zip(lote, resultados):
+            if error is None:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(error)
+
+    # Profundidad de la cola, tamaño de los lotes y latencia de las últimas transacciones.
+    def metricas(self):
+        with self._lock:
+            latencias = sorted(self._latencias_commit)
+            return {
+                'pendientes': self._cola.qsize(),
+                'lotes': self.lotes,
+                'escrituras': self.escrituras,
+                'fallidas': self.fallidas,
+                'rechazos_cola_llena': self.rechazos_cola,
+                'lote_promedio': round((self.escrituras + self.fallidas) / self.lotes, 2) if self.lotes else 0,
+                'lote_maximo': self.lote_maximo,
+                'ms_commit_p50': round(latencias[len(latencias) // 2] * 1000, 3) if latencias else 0,
+                'ms_commit_p95': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000, 3) if latencias else 0,
+            }
+
+    # Deja de aceptar escrituras, escribe todas las pendientes y espera al hilo escritor.
+    def cerrar(self, timeout=None):
+        if self._cerrado:
+            return
+        self._cerrado = True
+        self._cola.put(None)
+        self._hilo.join(timeout)
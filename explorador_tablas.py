@@ -0,0 +1,117 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from catalogo_bd import citar_identificador
+
+# Lectura paginada de tablas arbitrarias para db_manager.py.
+# Todo se resuelve en SQLite: proyección de columnas, filtro, orden y paginación, de modo
+# que solo viaja al navegador una página de filas. Sin orden explícito se pagina por rowid
+# (keyset: cada página empieza después del último rowid de la anterior, coste constante
+# en cualquier página); con orden por columna o en tablas sin rowid se usa LIMIT/OFFSET.
+# Los conteos se acotan a LIMITE_CONTEO filas para no recorrer tablas enormes.
+
+LIMITE_CONTEO = 100_000
+
+# Operadores de filtro: nombre visible -> (plantilla SQL, necesita valor).
+OPERADORES = {
+    '=': ("{columna} = ?", True),
+    '≠': ("{columna} <> ?", True),
+    '<': ("{columna} < ?", True),
+    '≤': ("{columna} <= ?", True),
+    '>': ("{columna} > ?", True),
+    '≥': ("{columna} >= ?", True),
+    'contiene': ("{columna} LIKE ? ESCAPE '\\'", True),
+    'empieza por': ("{columna} LIKE ? ESCAPE '\\'", True),
+    'es nulo': ("{columna} IS NULL", False),
+    'no es nulo': ("{columna} IS NOT NULL", False),
+}
+
+# Indica si la tabla tiene rowid (no lo tienen las tablas WITHOUT ROWID ni las vistas).
+def tiene_rowid(conn, tabla):
+    try:
+        conn.execute(f"SELECT rowid FROM {citar_identificador(tabla)} LIMIT 0")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+# Convierte el texto del filtro en un número cuando la columna se compara numéricamente.
+def _valor_filtro(operador, valor):
+    if operador in ('contiene', 'empieza por'):
+        patron = str(valor).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f"%{patron}%" if operador == 'contiene' else f"{patron}%"
+    for tipo in (int, float):
+        try:
+            return tipo(valor)
+        except (TypeError, ValueError):
+            pass
+    return valor
+
+# Cláusula WHERE y parámetros para una lista de filtros (columna, operador, valor).
+def clausula_filtros(filtros):
+    condiciones, params = [], []
+    for columna, operador, valor in filtros:
+        plantilla, necesita_valor = OPERADORES[operador]
+        condiciones.append(plantilla.format(columna=citar_identificador(columna)))
+        if necesita_valor:
+            params.append(_valor_filtro(operador, valor))
+    return (" WHERE " + " AND ".join(condiciones)) if condiciones else "", params
+
+# Lee una página de la tabla. Devuelve (DataFrame, hay_siguiente, ultimo_rowid); en las
+# tablas con rowid el índice del DataFrame es el rowid de cada fila.
+# Con paginación keyset se pasa despues_de_rowid (el ultimo_rowid de la página anterior);
+# en otro caso, numero_pagina (desde 0). con_rowid evita la comprobación si ya se conoce.
+def leer_pagina(conn, tabla, columnas=None, filtros=(), orden=None, descendente=False,
+                tamano_pagina=100, numero_pagina=0, despues_de_rowid=None, con_rowid=None):
+    if con_rowid is None:
+        con_rowid = tiene_rowid(conn, tabla)
+    usa_rowid = orden is None and con_rowid
+    proyeccion = ', '.join(citar_identificador(columna) for columna in columnas) if columnas else '*'
+    if con_rowid:
+        proyeccion = f"rowid AS __rowid__, {proyeccion}"
+    where, params = clausula_filtros(filtros)
+    consulta = f"SELECT {proyeccion} FROM {citar_identificador(tabla)}{where}"
+    direccion = 'DESC' if descendente else 'ASC'
+    if usa_rowid:
+        if despues_de_rowid is not None:
+            consulta += (" AND " if where else " WHERE ") + ("rowid < ?" if descendente else "rowid > ?")
+            params.append(despues_de_rowid)
+        consulta += f" ORDER BY rowid {direccion} LIMIT ?"
+        params.append(tamano_pagina + 1)
+    else:
+        if orden is not None:
+            consulta += f" ORDER BY {citar_identificador(orden)} {direccion}"
+        consulta += " LIMIT ? OFFSET ?"
+        params += [tamano_pagina + 1, numero_pagina * tamano_pagina]
+    # Se pide una fila de más para saber si existe una página siguiente.
+    pagina = pd.read_sql_query(consulta, conn, params=params)
+    hay_siguiente = len(pagina) > tamano_pagina
+    pagina = pagina.iloc[:tamano_pagina]
+    ultimo_rowid = None
+    if usa_rowid and not pagina.empty:
+        ultimo_rowid = int(pagina['__rowid__'].iloc[-1])
+    if con_rowid:
+        pagina = pagina.set_index('__rowid__').rename_axis('rowid')
+    else:
+        pagina.index += numero_pagina * tamano_pagina
+    return pagina, hay_siguiente, ultimo_rowid
+
+# Cuenta las filas que cumplen los filtros, sin pasar de limite. Devuelve (total, exacto).
+def contar_filas(conn, tabla, filtros=(), limite=LIMITE_CONTEO):
+    where, params = clausula_filtros(filtros)
+    consulta = f"SELECT COUNT(*) FROM (SELECT 1 FROM {citar_identificador(tabla)}{where} LIMIT ?)"
+    total = conn.execute(consulta, params + [limite + 1]).fetchone()[0]
+    return min(total, limite), total <= limite
+
+# Firma del contenido del archivo de base de datos (y de su WAL): cambia con cada escritura
+# confirmada, así que sirve como clave de caché para los conteos.
+def firma_archivo(ruta_bd):
+    firma = []
+    for ruta in (ruta_bd, f"{ruta_bd}-wal"):
+        try:
+            estado = os.stat(ruta)
+            firma.append((estado.st_mtime_ns, estado.st_size))
+        except FileNotFoundError:
+            firma.append(None)
+    return tuple(firma)
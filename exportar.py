@@ -0,0 +1,124 @@
+import csv
+import io
+import tempfile
+from datetime import date, datetime, timedelta
+
+from tiempo import a_epoch, sql_local
+
+# Exportación de mediciones por lotes, sin cargar la tabla completa en memoria.
+# Las filas se leen del cursor con fetchmany y se escriben directamente en un
+# SpooledTemporaryFile: en memoria mientras es pequeño y en el directorio temporal del
+# sistema (nunca en el directorio de trabajo) cuando supera max_tamano_memoria.
+
+FORMATOS = ('csv', 'parquet', 'xlsx')
+TIPOS_MIME = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+COLUMNAS = ['id', 'paciente', 'responsable', 'fecha', 'sistolica', 'diastolica']
+TAMANO_LOTE = 5_000
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+# Convierte un límite de fecha (hora de Bogotá si no tiene zona) a segundos UTC, comparables
+# con la columna fecha. Una fecha sin hora como límite superior incluye el día completo.
+def _limite_fecha(valor, es_hasta):
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, date) and not isinstance(valor, datetime) and es_hasta:
+        valor = valor + timedelta(days=1)
+    return a_epoch(valor)
+
+# Construye la consulta con los filtros indicados; hasta es exclusivo.
+# La fecha se exporta como texto en hora de Bogotá (FORMATO_FECHA).
+# Con despues_de_id solo se devuelven mediciones más nuevas que ese id (para seguir la ingesta).
+# orden='paciente' agrupa por paciente y fecha; orden='id' sigue el orden de inserción.
+def consulta_exportacion(id_paciente=None, id_responsable=None, desde=None, hasta=None,
+                         despues_de_id=None, orden='paciente', limite=None):
+    consulta = f"""
+    SELECT m.id, p.nombre, r.nombre, strftime('{FORMATO_FECHA}', {sql_local('m.fecha')}), m.sistolica, m.diastolica
+    FROM mediciones m
+    JOIN pacientes p ON m.id_paciente = p.id
+    LEFT JOIN responsables r ON m.id_responsable = r.id
+    WHERE 1 = 1
+    """
+    params = []
+    if id_paciente is not None:
+        consulta += " AND m.id_paciente = ?"
+        params.append(id_paciente)
+    if id_responsable is not None:
+        consulta += " AND m.id_responsable = ?"
+        params.append(id_responsable)
+    if desde is not None:
+        consulta += " AND m.fecha >= ?"
+        params.append(_limite_fecha(desde, es_hasta=False))
+    if hasta is not None:
+        consulta += " AND m.fecha < ?"
+        params.append(_limite_fecha(hasta, es_hasta=True))
+    if despues_de_id is not None:
+        consulta += " AND m.id > ?"
+        params.append(despues_de_id)
+    consulta += " ORDER BY m.id" if orden == 'id' else " ORDER BY m.id_paciente, m.fecha"
+    if limite is not None:
+        consulta += " LIMIT ?"
+        params.append(limite)
+    return consulta, params
+
+# Recorre el resultado de la consulta en lotes de tamano_lote filas.
+def iterar_lotes(conn, consulta, params, tamano_lote=TAMANO_LOTE):
+    cursor = conn.execute(consulta, params)
+    try:
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                break
+            yield filas
+    finally:
+        cursor.close()
+
+def _escribir_csv(lotes, destino):
+    texto = io.StringIO()
+    escritor = csv.writer(texto)
+    escritor.writerow(COLUMNAS)
+    for filas in lotes:
+        escritor.writerows(filas)
+        destino.write(texto.getvalue().encode('utf-8'))
+        texto.seek(0)
+        texto.truncate()
+    destino.write(texto.getvalue().encode('utf-8'))
+
+def _escribir_parquet(lotes, destino):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    esquema = pa.schema([
+        ('id', pa.int64()), ('paciente', pa.string()), ('responsable', pa.string()),
+        ('fecha', pa.string()), ('sistolica', pa.int64()), ('diastolica', pa.int64()),
+    ])
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for filas in lotes:
+            columnas = [list(columna) for columna in zip(*filas)]
+            escritor.write_table(pa.Table.from_arrays(columnas, schema=esquema))
+
+def _escribir_xlsx(lotes, destino):
+    from openpyxl import Workbook
+    # En modo write_only openpyxl escribe cada fila al añadirla en lugar de guardar la hoja en memoria.
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('mediciones')
+    hoja.append(COLUMNAS)
+    for filas in lotes:
+        for fila in filas:
+            hoja.append(fila)
+    libro.save(destino)
+
+ESCRITORES = {'csv': _escribir_csv, 'parquet': _escribir_parquet, 'xlsx': _escribir_xlsx}
+
+# Exporta las mediciones filtradas y devuelve un archivo temporal posicionado al inicio.
+def exportar_mediciones(conn, formato='csv', id_paciente=None, id_responsable=None, desde=None, hasta=None,
+                        tamano_lote=TAMANO_LOTE, max_tamano_memoria=32 * 1024 * 1024):
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato no soportado: {formato}. Use uno de {FORMATOS}.")
+    consulta, params = consulta_exportacion(id_paciente, id_responsable, desde, hasta)
+    destino = tempfile.SpooledTemporaryFile(max_size=max_tamano_memoria)
+    ESCRITORES[formato](iterar_lotes(conn, consulta, params, tamano_lote), destino)
+    destino.seek(0)
+    return destino
@@ -0,0 +1,67 @@
+import hashlib
+import io
+
+import pandas as pd
+import streamlit as st
+
+from cache_mediciones import CacheMediciones
+
+# Gráficas de evolución de la presión arterial.
+# Las imágenes PNG se guardan en caché por una huella del contenido de la serie, de modo
+# que un rerun sin mediciones nuevas no vuelve a dibujar nada. Las figuras se crean con
+# matplotlib.figure.Figure y no con pyplot: no quedan registradas en el estado global de
+# pyplot y se liberan explícitamente en cuanto se obtiene el PNG. matplotlib se importa al
+# dibujar la primera imagen, así que con el motor nativo no llega a cargarse.
+
+MOTORES = ('matplotlib', 'nativo')
+
+# Caché de imágenes PNG compartida por todo el proceso.
+cache_graficas = CacheMediciones(presupuesto_bytes=32 * 1024 * 1024)
+
+# Huella del contenido de la serie y de las opciones de dibujo.
+def huella_serie(fechas, sistolica, diastolica, **opciones):
+    serie = pd.DataFrame({'fecha': fechas, 'sistolica': sistolica, 'diastolica': diastolica})
+    huella = hashlib.blake2b(pd.util.hash_pandas_object(serie, index=False).values.tobytes(), digest_size=16)
+    huella.update(repr(sorted(opciones.items())).encode())
+    return huella.hexdigest()
+
+# Dibuja la gráfica con matplotlib y devuelve los bytes PNG.
+def renderizar_png(fechas, sistolica, diastolica, etiqueta_x='Fecha', formato_fecha='%Y-%m-%d %H:%M', dpi=150):
+    import matplotlib.dates as mdates
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    try:
+        ax = fig.subplots()
+        ax.plot(fechas, sistolica, label='Sistólica', color='blue')
+        ax.plot(fechas, diastolica, label='Diastólica', color='red')
+        ax.set_title('Evolución de la Presión Arterial')
+        ax.set_xlabel(etiqueta_x)
+        ax.set_ylabel('Presión Arterial (mmHg)')
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter(formato_fecha))
+        ax.xaxis.set_tick_params(rotation=45)
+        ax.grid(True)
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.legend()
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi)
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+# Devuelve el PNG de la serie desde la caché, dibujándolo solo si su contenido cambió.
+def grafica_presion_png(fechas, sistolica, diastolica, **opciones):
+    clave = huella_serie(fechas, sistolica, diastolica, **opciones)
+    return cache_graficas.obtener(clave, lambda: renderizar_png(fechas, sistolica, diastolica, **opciones))
+
+# Muestra la gráfica en Streamlit. Con motor='nativo' se usa st.line_chart, que dibuja
+# en el navegador (Vega-Lite) y evita rasterizar la imagen en el servidor.
+def mostrar_grafica_presion(fechas, sistolica, diastolica, motor='matplotlib', **opciones):
+    if motor == 'nativo':
+        serie = pd.DataFrame({'Sistólica': list(sistolica), 'Diastólica': list(diastolica)}, index=pd.Index(fechas, name='Fecha'))
+        st.line_chart(serie.sort_index(), color=['#0000ff', '#ff0000'])
+    else:
+        st.image(grafica_presion_png(fechas, sistolica, diastolica, **opciones))
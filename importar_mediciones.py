@@ -0,0 +1,201 @@
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from tiempo import serie_epoch
+
+# Importación masiva de mediciones desde archivos CSV o Excel.
+# El archivo se lee por lotes; cada lote se valida con operaciones vectorizadas, los nombres
+# de paciente y responsable se resuelven con diccionarios cargados una sola vez y las filas
+# válidas se insertan con executemany dentro de una única transacción por lote. Con un
+# escritor (escritor_diferido.EscritorDiferido) cada lote se encola como una escritura más, en
+# lugar de escribir en conn, para no competir por el bloqueo con el resto de las sesiones.
+#
+# Columnas reconocidas (sin distinguir mayúsculas):
+#   paciente o id_paciente, responsable o id_responsable (opcional), fecha, sistolica, diastolica
+# Las fechas son ISO 8601 ('2025-01-31 08:00', '2025-01-31T08:00:00', '2025-01-31T13:00:00Z',
+# '2025-01-31T08:00:00-05:00'); las que no tienen zona horaria se interpretan en hora de Bogotá.
+# Se guardan en segundos UTC. Las filas sin responsable usan el responsable por defecto; un
+# nombre o id que no existe se rechaza, para no asignar la lectura a otro responsable.
+
+# Mismos rangos que los number_input del formulario de mediciones.
+RANGO_SISTOLICA = (50, 250)
+RANGO_DIASTOLICA = (30, 150)
+TAMANO_LOTE = 10_000
+# Fecha con zona horaria al final: 'Z', '+00:00', '-05:00' o '-0500'.
+PATRON_ZONA = r'(?:Z|[+-]\d{2}:?\d{2})$'
+INSERTAR = "INSERT INTO mediciones (id_paciente, id_responsable, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?, ?)"
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.insertadas = 0
+        self.rechazadas = []  # (número de fila en el archivo, motivo)
+        self.pacientes_afectados = set()
+        self.segundos = 0.0
+
+    @property
+    def filas_por_segundo(self):
+        return self.insertadas / self.segundos if self.segundos else 0.0
+
+    # DataFrame con las filas rechazadas, útil para mostrarlas o exportarlas.
+    def rechazadas_df(self):
+        return pd.DataFrame(self.rechazadas, columns=['fila', 'motivo'])
+
+# Lee un CSV por lotes; archivo puede ser una ruta o un objeto tipo archivo (p. ej. de st.file_uploader).
+def _leer_lotes_csv(archivo, tamano_lote):
+    yield from pd.read_csv(archivo, chunksize=tamano_lote, dtype=str, skipinitialspace=True)
+
+# Lee una hoja de Excel en modo de solo lectura, sin cargar el libro completo en memoria.
+def _leer_lotes_excel(archivo, tamano_lote):
+    from openpyxl import load_workbook
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = [str(columna) for columna in next(filas)]
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) == tamano_lote:
+                yield pd.DataFrame(lote, columns=encabezado)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=encabezado)
+    finally:
+        libro.close()
+
+# Devuelve el lector adecuado según la extensión del nombre del archivo.
+def leer_lotes(archivo, nombre_archivo, tamano_lote=TAMANO_LOTE):
+    if nombre_archivo.lower().endswith(('.xlsx', '.xlsm')):
+        return _leer_lotes_excel(archivo, tamano_lote)
+    return _leer_lotes_csv(archivo, tamano_lote)
+
+# Resuelve una columna de ids o de nombres a ids numéricos (NaN si no existe).
+def _resolver_ids(lote, columna_id, columna_nombre, ids_por_nombre, ids_validos):
+    if columna_id in lote:
+        ids = pd.to_numeric(lote[columna_id], errors='coerce')
+        return ids.where(ids.isin(ids_validos))
+    if columna_nombre in lote:
+        return lote[columna_nombre].astype(str).str.strip().map(ids_por_nombre)
+    return None
+
+# Convierte una columna de fechas a segundos UTC (NaN si no es una fecha ISO 8601). pandas no
+# admite zonas distintas en una misma conversión, así que las fechas con zona se convierten a
+# UTC aparte y las demás se interpretan en hora de Bogotá.
+def _fechas_epoch(columna):
+    con_zona = columna.astype(str).str.strip().str.contains(PATRON_ZONA)
+    segundos = pd.Series(np.nan, index=columna.index)
+    segundos[~con_zona] = serie_epoch(pd.to_datetime(columna[~con_zona], errors='coerce', format='ISO8601'))
+    segundos[con_zona] = serie_epoch(pd.to_datetime(columna[con_zona], errors='coerce', format='ISO8601', utc=True))
+    return segundos
+
+# Valida un lote y devuelve (filas válidas para executemany, lista de rechazadas).
+def preparar_lote(lote, pacientes, responsables, id_responsable_defecto, primera_fila):
+    lote = lote.rename(columns=lambda columna: str(columna).strip().lower())
+    numeros_fila = np.arange(primera_fila, primera_fila + len(lote))
+
+    ids_paciente = _resolver_ids(lote, 'id_paciente', 'paciente', pacientes, set(pacientes.values()))
+    if ids_paciente is None:
+        ids_paciente = pd.Series(np.nan, index=lote.index)
+    ids_responsable = _resolver_ids(lote, 'id_responsable', 'responsable', responsables, set(responsables.values()))
+    if ids_responsable is None:
+        ids_responsable = pd.Series(id_responsable_defecto, index=lote.index, dtype='float64')
+    elif id_responsable_defecto is not None:
+        # Solo las celdas vacías; un responsable que no existe queda sin id y se rechaza.
+        columna = lote['id_responsable' if 'id_responsable' in lote else 'responsable']
+        sin_responsable = columna.isna() | (columna.astype(str).str.strip() == '')
+        ids_responsable = ids_responsable.mask(sin_responsable, id_responsable_defecto)
+
+    vacia = pd.Series(np.nan, index=lote.index)
+    fechas = _fechas_epoch(lote.get('fecha', vacia))
+    sistolica = pd.to_numeric(lote.get('sistolica', vacia), errors='coerce')
+    diastolica = pd.to_numeric(lote.get('diastolica', vacia), errors='coerce')
+
+    motivos = np.select(
+        [
+            ids_paciente.isna(),
+            ids_responsable.isna(),
+            fechas.isna(),
+            ~sistolica.between(*RANGO_SISTOLICA),
+            ~diastolica.between(*RANGO_DIASTOLICA),
+        ],
+        [
+            'Paciente desconocido',
+            'Responsable desconocido',
+            'Fecha inválida',
+            f'Sistólica fuera de rango {RANGO_SISTOLICA}',
+            f'Diastólica fuera de rango {RANGO_DIASTOLICA}',
+        ],
+        default='',
+    )
+    validas = motivos == ''
+    rechazadas = list(zip(numeros_fila[~validas].tolist(), motivos[~validas].tolist()))
+    filas = list(zip(
+        ids_paciente[validas].astype(int).tolist(),
+        ids_responsable[validas].astype(int).tolist(),
+        fechas[validas].astype('int64').tolist(),
+        sistolica[validas].astype(int).tolist(),
+        diastolica[validas].astype(int).tolist(),
+    ))
+    return filas, rechazadas
+
+# Importa el archivo completo en la base de datos y devuelve un ResultadoImportacion.
+def importar_mediciones(conn, archivo, nombre_archivo, id_responsable_defecto=None, tamano_lote=TAMANO_LOTE, escritor=None):
+    resultado = ResultadoImportacion()
+    inicio = time.perf_counter()
+    pacientes = {nombre: id for id, nombre in conn.execute("SELECT id, nombre FROM pacientes")}
+    responsables = {nombre: id for id, nombre in conn.execute("SELECT id, nombre FROM responsables")}
+
+    # La fila 1 del archivo es el encabezado.
+    primera_fila = 2
+    for lote in leer_lotes(archivo, nombre_archivo, tamano_lote):
+        filas, rechazadas = preparar_lote(lote, pacientes, responsables, id_responsable_defecto, primera_fila)
+        primera_fila += len(lote)
+        if filas and escritor is not None:
+            escritor.ejecutar_varias(INSERTAR, filas)
+        elif filas:
+            with conn:
+                conn.executemany(INSERTAR, filas)
+        resultado.insertadas += len(filas)
+        resultado.rechazadas.extend(rechazadas)
+        resultado.pacientes_afectados.update(fila[0] for fila in filas)
+
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa mediciones desde un archivo CSV o Excel.")
+    parser.add_argument('archivo', help="Ruta del archivo .csv o .xlsx.")
+    parser.add_argument('--bd', default='presion_arterial.db', help="Base de datos SQLite de destino.")
+    parser.add_argument('--responsable', help="Nombre del responsable para las filas que no indiquen uno.")
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Filas por lote (y por transacción).")
+    parser.add_argument('--rechazadas', help="Ruta de un CSV donde guardar las filas rechazadas.")
+    args = parser.parse_args()
+
+    from migraciones import aplicar_migraciones
+    conn = sqlite3.connect(args.bd)
+    try:
+        aplicar_migraciones(conn)
+        id_responsable = None
+        if args.responsable:
+            fila = conn.execute("SELECT id FROM responsables WHERE nombre = ?", (args.responsable,)).fetchone()
+            if fila is None:
+                parser.error(f"No existe el responsable '{args.responsable}'.")
+            id_responsable = fila[0]
+        resultado = importar_mediciones(conn, args.archivo, args.archivo, id_responsable, args.lote)
+    finally:
+        conn.close()
+
+    print(f"Filas insertadas: {resultado.insertadas}")
+    print(f"Filas rechazadas: {len(resultado.rechazadas)}")
+    print(f"Tiempo: {resultado.segundos:.2f} s ({resultado.filas_por_segundo:,.0f} filas/s)")
+    for numero_fila, motivo in resultado.rechazadas[:20]:
+        print(f"  fila {numero_fila}: {motivo}")
+    if args.rechazadas and resultado.rechazadas:
+        resultado.rechazadas_df().to_csv(args.rechazadas, index=False)
+        print(f"Filas rechazadas guardadas en {args.rechazadas}")
+
+if __name__ == '__main__':
+    main()
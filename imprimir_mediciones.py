@@ -1,18 +1,122 @@
+import argparse
+import csv
+import json
 import sqlite3
+import sys
+import time
+from datetime import date, datetime
 
-# Establecer conexión con la base de datos.
-conn = sqlite3.connect('presion_arterial.db')
-c = conn.cursor()
-
-# Consultar las mediciones de la base de datos y mostrarlas.
-try:
-    c.execute("SELECT fecha, sistolica, diastolica FROM mediciones")
-    mediciones = c.fetchall()
-    print("Fecha y Hora (UTC) - Sistólica (mmHg) - Diastólica (mmHg)")
-    for medicion in mediciones:
-        print(f"{medicion[0]} - {medicion[1]} - {medicion[2]}")
-except Exception as e:
-    print(f"Error al consultar la base de datos: {e}")
-finally:
-    # Cerrar conexión con la base de datos
-    conn.close()
\ No newline at end of file
+from exportar import COLUMNAS, TAMANO_LOTE, consulta_exportacion, iterar_lotes
+from migraciones import aplicar_migraciones
+
+# Imprime las mediciones de la base de datos en la terminal.
+# Las filas se leen del cursor por lotes (fetchmany) y se escriben en una salida con búfer,
+# de modo que la memoria no depende del tamaño de la tabla. Con --follow el programa queda
+# a la espera y muestra las mediciones nuevas a medida que se insertan.
+#
+# Ejemplos:
+#   python imprimir_mediciones.py --paciente "Carlos López" --desde 2024-01-01 --formato csv
+#   python imprimir_mediciones.py --follow --formato jsonl
+
+FORMATOS = ('tabla', 'csv', 'jsonl')
+
+# Escritores de filas para cada formato de salida.
+def _escritor_tabla(salida):
+    salida.write("ID - Paciente - Fecha y Hora - Sistólica (mmHg) - Diastólica (mmHg)\n")
+    def escribir(filas):
+        for id_medicion, paciente, _, fecha, sistolica, diastolica in filas:
+            salida.write(f"{id_medicion} - {paciente} - {fecha} - {sistolica} - {diastolica}\n")
+    return escribir
+
+def _escritor_csv(salida):
+    escritor = csv.writer(salida)
+    escritor.writerow(COLUMNAS)
+    return escritor.writerows
+
+def _escritor_jsonl(salida):
+    def escribir(filas):
+        for fila in filas:
+            salida.write(json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False))
+            salida.write("\n")
+    return escribir
+
+ESCRITORES = {'tabla': _escritor_tabla, 'csv': _escritor_csv, 'jsonl': _escritor_jsonl}
+
+# Convierte --desde/--hasta a date (día completo) o datetime (instante exacto).
+def fecha_argumento(texto):
+    try:
+        return date.fromisoformat(texto) if len(texto) == 10 else datetime.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha inválida: '{texto}'")
+
+# Acepta el id o el nombre del paciente y devuelve su id.
+def resolver_paciente(conn, paciente):
+    if paciente.isdigit():
+        return int(paciente)
+    fila = conn.execute("SELECT id FROM pacientes WHERE nombre = ?", (paciente,)).fetchone()
+    return fila[0] if fila else None
+
+# Escribe las filas de la consulta por lotes y devuelve el mayor id impreso.
+def imprimir_lotes(conn, consulta, params, escribir, tamano_lote, ultimo_id):
+    for filas in iterar_lotes(conn, consulta, params, tamano_lote):
+        escribir(filas)
+        ultimo_id = max(ultimo_id, max(fila[0] for fila in filas))
+    return ultimo_id
+
+def main():
+    parser = argparse.ArgumentParser(description="Imprime las mediciones de presión arterial.")
+    parser.add_argument('--bd', default='presion_arterial.db', help="Base de datos SQLite.")
+    parser.add_argument('--paciente', help="Id o nombre del paciente.")
+    parser.add_argument('--desde', type=fecha_argumento, help="Fecha inicial (AAAA-MM-DD o AAAA-MM-DD HH:MM:SS), inclusiva.")
+    parser.add_argument('--hasta', type=fecha_argumento, help="Fecha final (AAAA-MM-DD incluye el día completo; AAAA-MM-DD HH:MM:SS es exclusiva).")
+    parser.add_argument('--limit', type=int, help="Número máximo de filas a imprimir.")
+    parser.add_argument('--formato', choices=FORMATOS, default='tabla')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Filas leídas del cursor en cada fetchmany.")
+    parser.add_argument('--follow', action='store_true', help="Sigue mostrando las mediciones nuevas (Ctrl+C para salir).")
+    parser.add_argument('--intervalo', type=float, default=1.0, help="Segundos entre consultas en modo --follow.")
+    args = parser.parse_args()
+
+    # Salida con un búfer grande; en modo --follow se vacía después de cada consulta.
+    salida = open(sys.stdout.fileno(), 'w', buffering=1 << 16, encoding='utf-8', newline='', closefd=False)
+    conn = sqlite3.connect(args.bd)
+    try:
+        aplicar_migraciones(conn)
+        id_paciente = None
+        if args.paciente:
+            id_paciente = resolver_paciente(conn, args.paciente)
+            if id_paciente is None:
+                parser.error(f"No existe el paciente '{args.paciente}'.")
+
+        filtros = {'id_paciente': id_paciente, 'desde': args.desde, 'hasta': args.hasta, 'orden': 'id'}
+        escribir = ESCRITORES[args.formato](salida)
+        consulta, params = consulta_exportacion(limite=args.limit, **filtros)
+        ultimo_id = imprimir_lotes(conn, consulta, params, escribir, args.lote, 0)
+        salida.flush()
+
+        if args.follow:
+            # Al seguir desde el final, --limit solo se aplica a la salida inicial.
+            if args.limit is not None:
+                ultimo_id = max(ultimo_id, conn.execute("SELECT COALESCE(MAX(id), 0) FROM mediciones").fetchone()[0])
+            while True:
+                time.sleep(args.intervalo)
+                consulta, params = consulta_exportacion(despues_de_id=ultimo_id, **filtros)
+                ultimo_id = imprimir_lotes(conn, consulta, params, escribir, args.lote, ultimo_id)
+                salida.flush()
+    except KeyboardInterrupt:
+        pass
+    except sqlite3.Error as e:
+        print(f"Error al consultar la base de datos: {e}", file=sys.stderr)
+        sys.exit(1)
+    except BrokenPipeError:
+        # La salida se cerró (por ejemplo, al usar | head); no hay nada más que escribir.
+        sys.stderr.close()
+    finally:
+        # Cerrar conexión con la base de datos
+        conn.close()
+        try:
+            salida.flush()
+        except BrokenPipeError:
+            pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+import contextlib
+import functools
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Instrumentación de rendimiento de la aplicación.
+# Las funciones de acceso a datos y de dibujo se envuelven con Instrumentacion.medir, que
+# guarda por operación el número de llamadas, el tiempo y las filas devueltas. Cada conexión
+# instrumentada cuenta sus sentencias SQL con set_trace_callback (un contador por hilo, sin
+# envolver los cursores). Las operaciones se anidan: el tiempo propio de una vista no incluye
+# el de las consultas y gráficas que llama, así que cada rerun se reparte en consultas,
+# gráficas, vistas y el resto (Streamlit y el código no instrumentado).
+#
+# Las consultas que tardan más de umbral_lenta_ms quedan en un registro con sus sentencias.
+# texto_prometheus() expone los contadores en el formato de texto de Prometheus y
+# servir_metricas() los publica en http://127.0.0.1:<puerto>/metrics. El módulo se carga antes
+# del inicio de sesión, así que http.server se importa al arrancar el endpoint.
+
+# Tipos de operación; el tiempo del rerun que no cae en ninguno se cuenta como 'resto'.
+TIPOS = ('consulta', 'grafica', 'vista')
+
+# Límites (segundos) de los buckets del histograma de duración de los reruns.
+BUCKETS_RERUN = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Sentencias que no cuentan como consulta ni como escritura.
+SENTENCIAS_TRANSACCION = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+# Evento y tabla de una sentencia INSERT, REPLACE, UPDATE o DELETE, y de un CREATE TRIGGER.
+PATRON_ESCRITURA = re.compile(
+    r'\s*(INSERT|REPLACE|UPDATE|DELETE)(?:\s+OR\s+\w+)?(?:\s+INTO|\s+FROM)?\s+["`\[]?(\w+)', re.IGNORECASE)
+PATRON_TRIGGER = re.compile(r'\b(INSERT|UPDATE|DELETE)\b(?:\s+OF\s+[\w\s,]+?)?\s+ON\s+["`\[]?(\w+)', re.IGNORECASE)
+
+# Filas de un resultado: DataFrame, lista o tupla (filas, ...); None cuenta como 0 y otro valor como 1.
+def contar_filas(resultado):
+    if resultado is None:
+        return 0
+    if hasattr(resultado, 'shape'):
+        return int(resultado.shape[0])
+    if isinstance(resultado, tuple) and resultado and isinstance(resultado[0], list):
+        return len(resultado[0])
+    if isinstance(resultado, list):
+        return len(resultado)
+    return 1
+
+class _EstadisticaOperacion:
+    def __init__(self, tipo):
+        self.tipo = tipo
+        self.llamadas = 0
+        self.segundos = 0.0
+        self.segundos_max = 0.0
+        self.filas = 0
+        self.consultas = 0
+
+class Instrumentacion:
+    def __init__(self, umbral_lenta_ms=250, max_reruns=50, max_lentas=100):
+        self.umbral_lenta_ms = umbral_lenta_ms
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._operaciones = {}
+        self._reruns = deque(maxlen=max_reruns)
+        self._lentas = deque(maxlen=max_lentas)
+        self.total_consultas = 0
+        self.total_escrituras = 0
+        self.total_lentas = 0
+        self.total_reruns = 0
+        self._buckets_rerun = [0] * len(BUCKETS_RERUN)
+        self._segundos_reruns = 0.0
+        self._fuentes = {}
+        self.servidor_metricas = None
+
+    # Cuenta las sentencias de la conexión en el hilo que la use (idempotente). También anota
+    # los pares (evento, tabla) con triggers, cuyas escrituras SQLite vuelve a informar (ver
+    # _registrar_sentencia).
+    def instrumentar_conexion(self, conn):
+        self._local.eventos_con_triggers = {
+            (evento.upper(), tabla.lower())
+            for (sql,) in conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger'")
+            for evento, tabla in PATRON_TRIGGER.findall(sql.split(' BEGIN ', 1)[0])
+        }
+        conn.set_trace_callback(self._registrar_sentencia)
+
+    # Deja de contar las sentencias de la conexión dentro del bloque (por ejemplo, en una
+    # importación masiva, donde el callback por fila encarece cada INSERT).
+    @contextlib.contextmanager
+    def sin_conteo(self, conn):
+        conn.set_trace_callback(None)
+        try:
+            yield
+        finally:
+            self.instrumentar_conexion(conn)
+
+    # Callback de set_trace_callback. SQLite vuelve a informar la sentencia que disparó cada
+    # trigger (con el mismo texto y un número de repeticiones que depende de sus WHEN), así que
+    # si la escritura dispara triggers, una idéntica a la anterior no se cuenta otra vez. Es el
+    # único caso en que se cuenta de menos: filas repetidas de un executemany sobre esas tablas
+    # cuentan como una escritura.
+    def _registrar_sentencia(self, sql):
+        palabra = sql.lstrip()[:9].split(None, 1)[0].upper() if sql.strip() else ''
+        if palabra in SENTENCIAS_TRANSACCION:
+            return
+        local = self._local
+        es_consulta = palabra in ('SELECT', 'WITH', 'PRAGMA')
+        if not es_consulta:
+            escritura = PATRON_ESCRITURA.match(sql)
+            evento = escritura and ('INSERT' if escritura.group(1).upper() == 'REPLACE' else escritura.group(1).upper())
+            if escritura and (evento, escritura.group(2).lower()) in getattr(local, 'eventos_con_triggers', ()):
+                if sql == getattr(local, 'ultima_escritura', None):
+                    return
+                local.ultima_escritura = sql
+            else:
+                local.ultima_escritura = None
+        with self._lock:
+            if es_consulta:
+                self.total_consultas += 1
+            else:
+                self.total_escrituras += 1
+        pila = getattr(local, 'pila', None)
+        if pila:
+            for marco in pila:
+                marco['consultas'] += 1
+            if len(pila[-1]['sentencias']) < 5:
+                pila[-1]['sentencias'].append(sql[:500])
+        rerun = getattr(local, 'rerun', None)
+        if rerun is not None:
+            rerun['consultas' if es_consulta else 'escrituras'] += 1
+
+    # Decorador que mide una función como operación del tipo indicado. filas(resultado)
+    # calcula las filas devueltas (por defecto contar_filas).
+    def medir(self, nombre, tipo='consulta', filas=contar_filas):
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.operacion(nombre, tipo) as marco:
+                    resultado = funcion(*args, **kwargs)
+                    marco['filas'] = filas(resultado)
+                return resultado
+            return envoltura
+        return decorador
+
+    # Contexto que mide un bloque como operación; el diccionario devuelto admite 'filas'.
+    def operacion(self, nombre, tipo='consulta'):
+        return _Operacion(self, nombre, tipo)
+
+    def _abrir(self, nombre, tipo):
+        pila = getattr(self._local, 'pila', None)
+        if pila is None:
+            pila = self._local.pila = []
+        marco = {'nombre': nombre, 'tipo': tipo, 'inicio': time.perf_counter(), 'hijos': 0.0,
+                 'consultas': 0, 'filas': 0, 'sentencias': []}
+        pila.append(marco)
+        return marco
+
+    def _cerrar(self, marco):
+        segundos = time.perf_counter() - marco['inicio']
+        pila = self._local.pila
+        pila.pop()
+        if pila:
+            pila[-1]['hijos'] += segundos
+        propios = segundos - marco['hijos']
+        rerun = getattr(self._local, 'rerun', None)
+        if rerun is not None:
+            rerun['segundos'][marco['tipo']] += propios
+            rerun['filas'] += marco['filas'] if marco['tipo'] == 'consulta' else 0
+        lenta = marco['tipo'] == 'consulta' and segundos * 1000 > self.umbral_lenta_ms
+        with self._lock:
+            estadistica = self._operaciones.get(marco['nombre'])
+            if estadistica is None:
+                estadistica = self._operaciones[marco['nombre']] = _EstadisticaOperacion(marco['tipo'])
+            estadistica.llamadas += 1
+            estadistica.segundos += segundos
+            estadistica.segundos_max = max(estadistica.segundos_max, segundos)
+            estadistica.filas += marco['filas']
+            estadistica.consultas += marco['consultas']
+            if lenta:
+                self.total_lentas += 1
+                self._lentas.appendleft({
+                    'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'operacion': marco['nombre'],
+                    'ms': round(segundos * 1000, 1), 'filas': marco['filas'], 'sentencias': marco['sentencias'],
+                })
+
+    # Empieza el registro de un rerun en el hilo actual. Un rerun que no llegó a terminar
+    # (st.stop o st.rerun) se descarta.
+    def iniciar_rerun(self, etiqueta=''):
+        self._local.pila = []
+        self._local.rerun = {
+            'etiqueta': etiqueta, 'inicio': time.perf_counter(), 'fecha': datetime.now().strftime('%H:%M:%S'),
+            'consultas': 0, 'escrituras': 0, 'filas': 0, 'segundos': dict.fromkeys(TIPOS, 0.0),
+        }
+
+    # Cierra el rerun del hilo actual y lo guarda con su reparto de tiempo.
+    def terminar_rerun(self):
+        rerun = getattr(self._local, 'rerun', None)
+        if rerun is None:
+            return None
+        self._local.rerun = None
+        total = time.perf_counter() - rerun['inicio']
+        registro = {
+            'fecha': rerun['fecha'], 'etiqueta': rerun['etiqueta'], 'total_ms': round(total * 1000, 1),
+            **{f"{tipo}_ms": round(segundos * 1000, 1) for tipo, segundos in rerun['segundos'].items()},
+            'resto_ms': round((total - sum(rerun['segundos'].values())) * 1000, 1),
+            'consultas': rerun['consultas'], 'escrituras': rerun['escrituras'], 'filas': rerun['filas'],
+        }
+        with self._lock:
+            self._reruns.appendleft(registro)
+            self.total_reruns += 1
+            self._segundos_reruns += total
+            # Los buckets son acumulados: cada uno cuenta los reruns de hasta su límite.
+            for i, limite in enumerate(BUCKETS_RERUN):
+                if total <= limite:
+                    self._buckets_rerun[i] += 1
+        return registro
+
+    # Métricas adicionales (diccionario de números) que se publican como gauges con el prefijo
+    # dado. Varias fuentes pueden compartir prefijo si se distinguen por sus etiquetas
+    # (por ejemplo, {'clinica': 'Norte'}).
+    def agregar_fuente(self, prefijo, obtener_metricas, etiquetas=None):
+        self._fuentes[(prefijo, tuple(sorted((etiquetas or {}).items())))] = obtener_metricas
+
+    # Estadísticas por operación, de la más costosa en tiempo total a la menos.
+    def operaciones(self):
+        with self._lock:
+            filas = [
+                {'operacion': nombre, 'tipo': e.tipo, 'llamadas': e.llamadas,
+                 'ms_promedio': round(e.segundos * 1000 / e.llamadas, 2), 'ms_max': round(e.segundos_max * 1000, 2),
+                 'ms_total': round(e.segundos * 1000, 1), 'filas': e.filas, 'consultas': e.consultas}
+                for nombre, e in self._operaciones.items()
+            ]
+        return sorted(filas, key=lambda fila: fila['ms_total'], reverse=True)
+
+    def reruns_recientes(self):
+        with self._lock:
+            return list(self._reruns)
+
+    def consultas_lentas(self):
+        with self._lock:
+            return list(self._lentas)
+
+    # Todas las métricas en el formato de texto de Prometheus (versión 0.0.4).
+    def texto_prometheus(self):
+        lineas = []
+        def metrica(nombre, tipo, ayuda, muestras):
+            lineas.append(f"# HELP presion_{nombre} {ayuda}")
+            lineas.append(f"# TYPE presion_{nombre} {tipo}")
+            for etiquetas, valor in muestras:
+                lineas.append(f"presion_{nombre}{etiquetas} {valor}")
+
+        operaciones = self.operaciones()
+        def por_operacion(campo, escala=1):
+            return [(f'{{operacion="{o["operacion"]}",tipo="{o["tipo"]}"}}', round(o[campo] * escala, 6)) for o in operaciones]
+        metrica('operacion_llamadas_total', 'counter', "Llamadas de cada operación instrumentada.", por_operacion('llamadas'))
+        metrica('operacion_segundos_total', 'counter', "Tiempo total de cada operación.", por_operacion('ms_total', 0.001))
+        metrica('operacion_segundos_max', 'gauge', "Tiempo máximo de una llamada de cada operación.", por_operacion('ms_max', 0.001))
+        metrica('operacion_filas_total', 'counter', "Filas devueltas por cada operación.", por_operacion('filas'))
+        metrica('operacion_consultas_total', 'counter', "Sentencias SQL ejecutadas dentro de cada operación.", por_operacion('consultas'))
+        metrica('sql_consultas_total', 'counter', "Consultas SQL (SELECT) de las conexiones instrumentadas.", [('', self.total_consultas)])
+        metrica('sql_escrituras_total', 'counter', "Escrituras SQL de las conexiones instrumentadas.", [('', self.total_escrituras)])
+        metrica('consultas_lentas_total', 'counter', f"Consultas de más de {self.umbral_lenta_ms} ms.", [('', self.total_lentas)])
+        with self._lock:
+            metrica('rerun_segundos', 'histogram', "Duración de los reruns completos.", [])
+            for limite, cantidad in zip(BUCKETS_RERUN, self._buckets_rerun):
+                lineas.append(f'presion_rerun_segundos_bucket{{le="{limite}"}} {cantidad}')
+            lineas.append(f'presion_rerun_segundos_bucket{{le="+Inf"}} {self.total_reruns}')
+            lineas.append(f"presion_rerun_segundos_sum {self._segundos_reruns}")
+            lineas.append(f"presion_rerun_segundos_count {self.total_reruns}")
+        gauges = {}
+        for (prefijo, etiquetas), obtener_metricas in list(self._fuentes.items()):
+            texto_etiquetas = ','.join(f'{clave}="{_escapar_etiqueta(valor)}"' for clave, valor in etiquetas)
+            for nombre, valor in obtener_metricas().items():
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    gauges.setdefault((prefijo, nombre), []).append((f"{{{texto_etiquetas}}}" if etiquetas else '', valor))
+        for (prefijo, nombre), muestras in gauges.items():
+            metrica(f"{prefijo}_{nombre}", 'gauge', f"{prefijo}: {nombre}.", muestras)
+        return "\n".join(lineas) + "\n"
+
+# Valor de etiqueta de Prometheus: barras invertidas, comillas y saltos de línea escapados.
+def _escapar_etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class _Operacion:
+    def __init__(self, instrumentacion, nombre, tipo):
+        self.instrumentacion = instrumentacion
+        self.nombre = nombre
+        self.tipo = tipo
+
+    def __enter__(self):
+        self.marco = self.instrumentacion._abrir(self.nombre, self.tipo)
+        return self.marco
+
+    def __exit__(self, *excepcion):
+        self.instrumentacion._cerrar(self.marco)
+        return False
+
+# Publica texto_prometheus() en http://<host>:<puerto>/metrics desde un hilo en segundo plano.
+# Devuelve el servidor (shutdown para detenerlo), que también queda en servidor_metricas;
+# falla con OSError si el puerto está ocupado.
+def servir_metricas(instrumentacion, puerto, host='127.0.0.1'):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            cuerpo = instrumentacion.texto_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, puerto), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='metricas', daemon=True).start()
+    instrumentacion.servidor_metricas = servidor
+    return servidor
@@ -0,0 +1,378 @@
+import argparse
+import sqlite3
+import sys
+
+import agregados
+import alertas
+import cambios
+import poblacion
+import resumen
+from tiempo import DESFASE_HORAS
+
+# Migraciones versionadas del esquema de presion_arterial.db.
+# La versión aplicada se guarda en PRAGMA user_version: la migración en la posición i
+# de MIGRACIONES lleva la base de datos a la versión i + 1. Nunca se modifica una
+# migración ya publicada; los cambios nuevos se añaden al final de la lista. Por eso cada
+# migración lleva su propio SQL en lugar de llamar a los módulos: solo los objetos
+# derivados (OBJETOS_DERIVADOS) se instalan con la definición actual del código.
+
+# Migración 1: esquema base. Reconcilia app.py (mediciones sin responsable) con
+# app_v4.py (mediciones con id_responsable y tabla de responsables).
+def _migracion_esquema_base(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS responsables (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        rol TEXT
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS pacientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        edad INTEGER,
+        historial TEXT
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS mediciones (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_paciente INTEGER,
+        id_responsable INTEGER,
+        fecha TIMESTAMP,
+        sistolica INTEGER,
+        diastolica INTEGER,
+        FOREIGN KEY(id_paciente) REFERENCES pacientes(id),
+        FOREIGN KEY(id_responsable) REFERENCES responsables(id)
+    )
+    ''')
+    # Las bases de datos creadas por app.py no tienen la columna id_responsable.
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(mediciones)")}
+    if 'id_responsable' not in columnas:
+        conn.execute("ALTER TABLE mediciones ADD COLUMN id_responsable INTEGER REFERENCES responsables(id)")
+
+# Migración 2: índices compuestos para las consultas por paciente y por responsable.
+def _migracion_indices_mediciones(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mediciones_paciente_fecha ON mediciones(id_paciente, fecha)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mediciones_responsable_paciente_fecha ON mediciones(id_responsable, id_paciente, fecha)")
+
+# Migración 3: tablas del resumen precalculado por paciente (ver resumen.py).
+def _migracion_resumen_paciente(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS resumen_paciente (
+        id_paciente INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL,
+        suma_sistolica INTEGER,
+        suma_diastolica INTEGER,
+        min_sistolica INTEGER,
+        max_sistolica INTEGER,
+        min_diastolica INTEGER,
+        max_diastolica INTEGER,
+        primera_fecha TIMESTAMP,
+        ultima_fecha TIMESTAMP,
+        id_ultima INTEGER,
+        ultima_sistolica INTEGER,
+        ultima_diastolica INTEGER,
+        ultima_categoria INTEGER
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS resumen_categoria (
+        id_paciente INTEGER,
+        categoria INTEGER,
+        lecturas INTEGER NOT NULL,
+        segundos REAL NOT NULL,
+        PRIMARY KEY (id_paciente, categoria)
+    ) WITHOUT ROWID
+    ''')
+
+# Migración 4: agregados diarios, semanales y mensuales por paciente (ver agregados.py).
+def _migracion_agregados_mediciones(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS agregados_mediciones (
+        id_paciente INTEGER,
+        resolucion TEXT,
+        periodo TEXT,
+        lecturas INTEGER NOT NULL,
+        suma_sistolica INTEGER,
+        suma_diastolica INTEGER,
+        min_sistolica INTEGER,
+        max_sistolica INTEGER,
+        min_diastolica INTEGER,
+        max_diastolica INTEGER,
+        lecturas_manana INTEGER,
+        suma_sistolica_manana INTEGER,
+        suma_diastolica_manana INTEGER,
+        lecturas_tarde INTEGER,
+        suma_sistolica_tarde INTEGER,
+        suma_diastolica_tarde INTEGER,
+        PRIMARY KEY (id_paciente, resolucion, periodo)
+    ) WITHOUT ROWID
+    ''')
+
+# Migración 5: índice para buscar responsables por nombre al iniciar sesión.
+def _migracion_indice_responsables(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_responsables_nombre ON responsables(nombre)")
+
+# Migración 6: índices para que los triggers incrementales de borrado del resumen busquen el
+# nuevo mínimo o máximo de un paciente sin recorrer su historial. Los triggers se reinstalan
+# con los demás objetos derivados al final de aplicar_migraciones (ver OBJETOS_DERIVADOS).
+def _migracion_indices_extremos(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mediciones_paciente_sistolica ON mediciones(id_paciente, sistolica)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mediciones_paciente_diastolica ON mediciones(id_paciente, diastolica)")
+
+# Migración 7: bandeja de alertas y ventana de la regla de escalada (ver alertas.py). Al
+# reinstalar los objetos derivados también se recalcula el resumen con la clasificación
+# corregida, en la que la crisis hipertensiva se evalúa primero.
+def _migracion_alertas(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS alertas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        id_paciente INTEGER,
+        id_responsable INTEGER,
+        id_medicion INTEGER,
+        fecha TIMESTAMP,
+        sistolica INTEGER,
+        diastolica INTEGER,
+        creada TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+        atendida INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alertas_pendientes ON alertas(id) WHERE atendida = 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alertas_responsable ON alertas(id_responsable, id)")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ventana_alertas (
+        id_paciente INTEGER,
+        segundos INTEGER,
+        id_medicion INTEGER,
+        PRIMARY KEY (id_paciente, segundos, id_medicion)
+    ) WITHOUT ROWID
+    ''')
+
+# Migración 8: fechas en segundos UTC (ver tiempo.py). El texto guardado hasta ahora es hora
+# de Bogotá; los valores que SQLite no reconoce como fecha se dejan como estaban. Los triggers
+# de actualización se quitan antes de convertir y se reinstalan, con las tablas derivadas
+# reconstruidas, al final de aplicar_migraciones. La tabla alertas se reconstruye con fecha y
+# creada INTEGER y creada por defecto en segundos UTC.
+def _migracion_fechas_epoch(conn):
+    for tabla in ('resumen', 'agregados'):
+        for evento in ('insert', 'delete', 'update'):
+            conn.execute(f"DROP TRIGGER IF EXISTS {tabla}_mediciones_{evento}")
+    # El trigger de alertas apuntaría a la tabla renombrada.
+    conn.execute("DROP TRIGGER IF EXISTS alertas_mediciones_insert")
+    a_segundos = lambda columna: (f"CASE WHEN typeof({columna}) = 'text' THEN COALESCE(CAST(strftime('%s', {columna}, "
+                                  f"'{-DESFASE_HORAS:+d} hours') AS INTEGER), {columna}) ELSE {columna} END")
+    conn.execute(f"UPDATE mediciones SET fecha = {a_segundos('fecha')} WHERE typeof(fecha) = 'text'")
+    conn.execute('''
+    CREATE TABLE alertas_epoch (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        id_paciente INTEGER,
+        id_responsable INTEGER,
+        id_medicion INTEGER,
+        fecha INTEGER,
+        sistolica INTEGER,
+        diastolica INTEGER,
+        creada INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+        atendida INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    # creada se guardaba con datetime('now', 'localtime').
+    conn.execute(f"""
+    INSERT INTO alertas_epoch (id, tipo, id_paciente, id_responsable, id_medicion, fecha, sistolica, diastolica, creada, atendida)
+    SELECT id, tipo, id_paciente, id_responsable, id_medicion, {a_segundos('fecha')}, sistolica, diastolica, {a_segundos('creada')}, atendida
+    FROM alertas
+    """)
+    conn.execute("DROP TABLE alertas")
+    conn.execute("ALTER TABLE alertas_epoch RENAME TO alertas")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alertas_pendientes ON alertas(id) WHERE atendida = 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alertas_responsable ON alertas(id_responsable, id)")
+    # La ventana de escalada se calculaba con la hora local como si fuera UTC.
+    conn.execute("DELETE FROM ventana_alertas")
+
+# Migración 9: tablas derivadas de la página de población (ver poblacion.py): sumas de todos
+# los pacientes por periodo y lecturas por responsable y paciente. Se llenan al reinstalar
+# los objetos derivados.
+def _migracion_poblacion(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS agregados_poblacion (
+        resolucion TEXT,
+        periodo TEXT,
+        pacientes INTEGER NOT NULL,
+        lecturas INTEGER NOT NULL,
+        suma_sistolica INTEGER,
+        suma_diastolica INTEGER,
+        PRIMARY KEY (resolucion, periodo)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS resumen_responsable (
+        id_responsable INTEGER,
+        id_paciente INTEGER,
+        lecturas INTEGER NOT NULL,
+        PRIMARY KEY (id_responsable, id_paciente)
+    ) WITHOUT ROWID
+    ''')
+
+# Migración 10: contador de ediciones de los datos para las cachés de las aplicaciones (ver
+# cambios.py); sus triggers se instalan con los objetos derivados.
+def _migracion_version_datos(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS version_datos (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        ediciones INTEGER NOT NULL
+    )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO version_datos (id, ediciones) VALUES (1, 0)")
+
+MIGRACIONES = [
+    _migracion_esquema_base,
+    _migracion_indices_mediciones,
+    _migracion_resumen_paciente,
+    _migracion_agregados_mediciones,
+    _migracion_indice_responsables,
+    _migracion_indices_extremos,
+    _migracion_alertas,
+    _migracion_fechas_epoch,
+    _migracion_poblacion,
+    _migracion_version_datos,
+]
+
+# Objetos derivados (triggers y tablas calculadas) que se reinstalan con la definición
+# actual del código cada vez que se aplica alguna migración.
+OBJETOS_DERIVADOS = [
+    resumen.instalar,
+    agregados.instalar,
+    alertas.instalar,
+    poblacion.instalar,
+    cambios.instalar,
+]
+
+VERSION_ACTUAL = len(MIGRACIONES)
+
+# Consultas frecuentes de las aplicaciones que nunca deben recorrer la tabla de mediciones completa.
+CONSULTAS_CRITICAS = {
+    'mediciones_por_paciente': (
+        """
+        SELECT m.id, p.nombre AS nombre_paciente, r.nombre AS nombre_responsable, m.sistolica, m.diastolica, m.fecha
+        FROM mediciones m
+        JOIN pacientes p ON m.id_paciente = p.id
+        JOIN responsables r ON m.id_responsable = r.id
+        WHERE m.id_paciente = ?
+        ORDER BY m.fecha DESC
+        """,
+        (1,),
+    ),
+    'mediciones_por_paciente_y_responsable': (
+        """
+        SELECT m.id, p.nombre AS nombre_paciente, r.nombre AS nombre_responsable, m.sistolica, m.diastolica, m.fecha
+        FROM mediciones m
+        JOIN pacientes p ON m.id_paciente = p.id
+        JOIN responsables r ON m.id_responsable = r.id
+        WHERE m.id_paciente = ? AND m.id_responsable = ?
+        ORDER BY m.fecha DESC
+        """,
+        (1, 1),
+    ),
+    'historial_paciente': (
+        "SELECT * FROM mediciones WHERE id_paciente = ? ORDER BY fecha",
+        (1,),
+    ),
+    'responsable_por_nombre': (
+        "SELECT id FROM responsables WHERE nombre = ?",
+        ('Ana',),
+    ),
+    'lectura_siguiente_resumen': (
+        """
+        SELECT fecha FROM mediciones
+        WHERE id_paciente = ? AND (fecha, id) > (?, ?)
+        ORDER BY fecha, id LIMIT 1
+        """,
+        (1, 1704085200, 1),
+    ),
+    'lectura_anterior_resumen': (
+        """
+        SELECT fecha FROM mediciones
+        WHERE id_paciente = ? AND (fecha, id) < (?, ?)
+        ORDER BY fecha DESC, id DESC LIMIT 1
+        """,
+        (1, 1704085200, 1),
+    ),
+    'alertas_pendientes': (
+        "SELECT id FROM alertas WHERE atendida = 0 AND id > ? ORDER BY id DESC LIMIT 50",
+        (0,),
+    ),
+    'mediciones_paciente_rango': (
+        "SELECT fecha, sistolica, diastolica FROM mediciones WHERE id_paciente = ? AND fecha >= ? AND fecha < ? ORDER BY fecha",
+        (1, 1704085200, 1706763600),
+    ),
+    'poblacion_por_periodo': (
+        "SELECT periodo, lecturas, pacientes FROM agregados_poblacion WHERE resolucion = ? AND periodo >= ? ORDER BY periodo",
+        ('mes', '2024-01-01'),
+    ),
+    'extremo_sistolica_resumen': (
+        "SELECT MAX(sistolica) FROM mediciones WHERE id_paciente = ? AND id <> ?",
+        (1, 1),
+    ),
+}
+
+# Función para obtener la versión de esquema guardada en la base de datos.
+def obtener_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+# Función para aplicar en orden las migraciones pendientes.
+# Cada migración se ejecuta en su propia transacción junto con el cambio de user_version,
+# de modo que un fallo deja la base de datos en la última versión completa. Los objetos
+# derivados se reinstalan en la transacción de la última migración pendiente.
+def aplicar_migraciones(conn):
+    version = obtener_version(conn)
+    for numero, migracion in enumerate(MIGRACIONES[version:], start=version + 1):
+        try:
+            conn.execute("BEGIN")
+            migracion(conn)
+            if numero == VERSION_ACTUAL:
+                for instalar in OBJETOS_DERIVADOS:
+                    instalar(conn)
+            conn.execute(f"PRAGMA user_version = {numero}")
+            conn.commit()
+        except sqlite3.DatabaseError:
+            conn.rollback()
+            raise
+    return obtener_version(conn)
+
+# Función que revisa el plan de las consultas críticas con EXPLAIN QUERY PLAN.
+# Devuelve una lista de (nombre, detalle) con los pasos que recorren mediciones
+# completa o que necesitan ordenar en un árbol temporal.
+def verificar_planes(conn):
+    problemas = []
+    for nombre, (consulta, parametros) in CONSULTAS_CRITICAS.items():
+        for fila in conn.execute(f"EXPLAIN QUERY PLAN {consulta}", parametros):
+            detalle = fila[-1]
+            if detalle.startswith('SCAN') or 'TEMP B-TREE' in detalle:
+                problemas.append((nombre, detalle))
+    return problemas
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica las migraciones pendientes y verifica los planes de consulta.")
+    parser.add_argument('ruta_bd', nargs='?', default='presion_arterial.db')
+    parser.add_argument('--verificar', action='store_true', help="Falla si alguna consulta crítica recorre la tabla completa.")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.ruta_bd)
+    try:
+        version_inicial = obtener_version(conn)
+        version_final = aplicar_migraciones(conn)
+        print(f"Esquema en la versión {version_final} (antes: {version_inicial}).")
+        if args.verificar:
+            problemas = verificar_planes(conn)
+            for nombre, detalle in problemas:
+                print(f"[ERROR] {nombre}: {detalle}")
+            if problemas:
+                sys.exit(1)
+            print("Todas las consultas críticas usan índices.")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import sqlite3
+import time
+
+from agregados import RESOLUCIONES
+from diagnostico import CATEGORIAS
+
+# Analítica de la población de pacientes.
+# Todas las consultas agrupan en SQLite sobre tablas derivadas que los triggers mantienen al
+# día, de modo que su costo depende del número de pacientes y periodos y no del de
+# mediciones; a pandas solo llegan las filas ya agregadas:
+#
+#   pacientes_por_categoria   categoría de la última lectura de cada paciente (resumen_paciente)
+#   lecturas_por_categoria    lecturas y tiempo en cada categoría (resumen_categoria)
+#   pacientes_por_edad        bandas de pacientes.edad por categoría actual (resumen_paciente)
+#   lecturas_por_responsable  lecturas y pacientes de cada responsable (resumen_responsable)
+#   lecturas_en_el_tiempo     lecturas y promedios por día, semana o mes (agregados_poblacion)
+#
+# resumen_responsable guarda las lecturas de cada par (responsable, paciente); las mediciones
+# sin responsable se cuentan con id_responsable = 0. pandas se importa dentro de cada
+# consulta, por el mismo motivo que en diagnostico.py.
+#
+# Uso: python poblacion.py [ruta_bd]
+
+# Categorías (códigos de diagnostico.DIAGNOSTICOS) que cuentan como hipertensión: alta,
+# alta con factores de riesgo y peligrosamente alta.
+CODIGOS_HIPERTENSION = (1, 2, 3)
+
+# Límite inferior de cada banda de edad; la última no tiene límite superior.
+BANDAS_EDAD = ((0, "Menores de 18"), (18, "18 a 39"), (40, "40 a 59"), (60, "60 a 74"), (75, "75 o más"))
+SIN_EDAD = "Sin dato"
+SIN_MEDICIONES = "Sin mediciones"
+
+# Sentencias de los triggers que mantienen resumen_responsable. Una actualización que cambia
+# el responsable o el paciente resta la fila anterior y suma la nueva.
+def _sentencias_triggers():
+    suma = """
+        INSERT INTO resumen_responsable (id_responsable, id_paciente, lecturas)
+        VALUES (COALESCE(NEW.id_responsable, 0), NEW.id_paciente, 1)
+        ON CONFLICT(id_responsable, id_paciente) DO UPDATE SET lecturas = lecturas + 1
+    """
+    resta = """
+        UPDATE resumen_responsable SET lecturas = lecturas - 1
+        WHERE id_responsable = COALESCE(OLD.id_responsable, 0) AND id_paciente = OLD.id_paciente;
+        DELETE FROM resumen_responsable
+        WHERE id_responsable = COALESCE(OLD.id_responsable, 0) AND id_paciente = OLD.id_paciente AND lecturas <= 0
+    """
+    return [
+        f"CREATE TRIGGER poblacion_mediciones_insert AFTER INSERT ON mediciones BEGIN {suma}; END",
+        f"CREATE TRIGGER poblacion_mediciones_delete AFTER DELETE ON mediciones BEGIN {resta}; END",
+        f"""
+        CREATE TRIGGER poblacion_mediciones_update AFTER UPDATE OF id_responsable, id_paciente ON mediciones
+        WHEN OLD.id_responsable IS NOT NEW.id_responsable OR OLD.id_paciente IS NOT NEW.id_paciente
+        BEGIN {resta}; {suma}; END
+        """,
+    ]
+
+# Quita los triggers; los cambios posteriores en mediciones no se reflejan hasta instalar().
+def eliminar_triggers(conn):
+    for nombre in ('poblacion_mediciones_insert', 'poblacion_mediciones_delete', 'poblacion_mediciones_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+# (Re)crea los triggers con la definición actual y reconstruye resumen_responsable.
+def instalar(conn):
+    eliminar_triggers(conn)
+    for sentencia in _sentencias_triggers():
+        conn.execute(sentencia)
+    reconstruir(conn)
+
+# Recalcula resumen_responsable desde el historial (recorre el índice por responsable).
+def reconstruir(conn):
+    conn.execute("DELETE FROM resumen_responsable")
+    conn.execute("""
+    INSERT INTO resumen_responsable (id_responsable, id_paciente, lecturas)
+    SELECT COALESCE(id_responsable, 0), id_paciente, COUNT(*)
+    FROM mediciones
+    GROUP BY COALESCE(id_responsable, 0), id_paciente
+    """)
+
+# Expresión CASE con la posición de la banda de edad (NULL si no hay edad).
+def _expresion_banda(edad='edad'):
+    ramas = " ".join(f"WHEN {edad} < {BANDAS_EDAD[i + 1][0]} THEN {i}" for i in range(len(BANDAS_EDAD) - 1))
+    return f"(CASE WHEN {edad} IS NULL THEN NULL {ramas} ELSE {len(BANDAS_EDAD) - 1} END)"
+
+def _nombre_categoria(codigos):
+    import pandas as pd
+
+    return codigos.map(lambda codigo: SIN_MEDICIONES if pd.isna(codigo) else CATEGORIAS[int(codigo)])
+
+# Totales de la población: pacientes, pacientes con mediciones, lecturas y pacientes cuya
+# última lectura está en una categoría de hipertensión.
+def totales_poblacion(conn):
+    pacientes = conn.execute("SELECT COUNT(*) FROM pacientes").fetchone()[0]
+    con_mediciones, lecturas, hipertensos = conn.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM(total), 0), COALESCE(SUM(ultima_categoria IN {CODIGOS_HIPERTENSION}), 0)
+        FROM resumen_paciente
+    """).fetchone()
+    return {'pacientes': pacientes, 'con_mediciones': con_mediciones, 'lecturas': lecturas, 'hipertensos': hipertensos}
+
+# Número de pacientes según la categoría de su última lectura.
+def pacientes_por_categoria(conn):
+    import pandas as pd
+
+    filas = pd.read_sql_query("""
+        SELECT ultima_categoria AS codigo, COUNT(*) AS pacientes
+        FROM resumen_paciente GROUP BY ultima_categoria ORDER BY ultima_categoria
+    """, conn)
+    return filas.assign(categoria=_nombre_categoria(filas['codigo']))[['categoria', 'pacientes']]
+
+# Lecturas de cada categoría y fracción del tiempo que los pacientes pasan en ella.
+def lecturas_por_categoria(conn):
+    import pandas as pd
+
+    filas = pd.read_sql_query("""
+        SELECT categoria AS codigo, SUM(lecturas) AS lecturas, SUM(segundos) AS segundos
+        FROM resumen_categoria GROUP BY categoria ORDER BY categoria
+    """, conn)
+    total_segundos = filas['segundos'].sum()
+    return filas.assign(
+        categoria=_nombre_categoria(filas['codigo']),
+        fraccion_tiempo=filas['segundos'] / total_segundos if total_segundos else 0.0,
+    )[['categoria', 'lecturas', 'fraccion_tiempo']]
+
+# Pacientes de cada banda de edad por categoría actual (una columna por categoría, incluida
+# "Sin mediciones"), con el promedio de sus lecturas.
+def pacientes_por_edad(conn):
+    import pandas as pd
+
+    filas = pd.read_sql_query(f"""
+        SELECT {_expresion_banda('p.edad')} AS banda, r.ultima_categoria AS codigo, COUNT(*) AS pacientes,
+               SUM(r.total) AS lecturas, SUM(r.suma_sistolica) AS suma_sistolica, SUM(r.suma_diastolica) AS suma_diastolica
+        FROM pacientes p LEFT JOIN resumen_paciente r ON r.id_paciente = p.id
+        GROUP BY banda, codigo
+    """, conn)
+    nombres_banda = [nombre for _, nombre in BANDAS_EDAD] + [SIN_EDAD]
+    filas['banda'] = pd.Categorical(
+        filas['banda'].map(lambda banda: SIN_EDAD if pd.isna(banda) else BANDAS_EDAD[int(banda)][1]),
+        categories=nombres_banda,
+    )
+    filas['categoria'] = _nombre_categoria(filas['codigo'])
+    por_banda = filas.pivot_table(index='banda', columns='categoria', values='pacientes', aggfunc='sum', fill_value=0, observed=True)
+    por_banda = por_banda.reindex(columns=[categoria for categoria in CATEGORIAS + (SIN_MEDICIONES,) if categoria in por_banda.columns])
+    sumas = filas.groupby('banda', observed=True)[['lecturas', 'suma_sistolica', 'suma_diastolica']].sum()
+    por_banda['promedio_sistolica'] = (sumas['suma_sistolica'] / sumas['lecturas'].where(sumas['lecturas'] > 0)).round(1)
+    por_banda['promedio_diastolica'] = (sumas['suma_diastolica'] / sumas['lecturas'].where(sumas['lecturas'] > 0)).round(1)
+    por_banda.columns.name = None
+    return por_banda
+
+# Lecturas y pacientes distintos de cada responsable.
+def lecturas_por_responsable(conn):
+    import pandas as pd
+
+    return pd.read_sql_query("""
+        SELECT COALESCE(r.nombre, 'Sin responsable') AS responsable, t.lecturas, t.pacientes
+        FROM (
+            SELECT id_responsable, SUM(lecturas) AS lecturas, COUNT(*) AS pacientes
+            FROM resumen_responsable GROUP BY id_responsable
+        ) t
+        LEFT JOIN responsables r ON r.id = t.id_responsable
+        ORDER BY t.lecturas DESC
+    """, conn)
+
+# Lecturas, pacientes con lecturas y promedios de la población por periodo (dia, semana o
+# mes), desde el periodo que contiene a desde hasta los que empiezan en hasta (incluido).
+def lecturas_en_el_tiempo(conn, resolucion='mes', desde=None, hasta=None):
+    import pandas as pd
+
+    consulta = """
+        SELECT periodo, lecturas, pacientes,
+               1.0 * suma_sistolica / lecturas AS promedio_sistolica,
+               1.0 * suma_diastolica / lecturas AS promedio_diastolica
+        FROM agregados_poblacion WHERE resolucion = ?
+    """
+    params = [resolucion]
+    if desde is not None:
+        # El periodo que contiene a desde puede empezar antes (semanas y meses).
+        consulta += f" AND periodo >= {RESOLUCIONES[resolucion][0].format(f='?')}"
+        params.append(str(desde))
+    if hasta is not None:
+        consulta += " AND periodo <= ?"
+        params.append(str(hasta))
+    consulta += " ORDER BY periodo"
+    filas = pd.read_sql_query(consulta, conn, params=params)
+    return filas.assign(periodo=pd.to_datetime(filas['periodo']))
+
+# Todas las tablas de la página de población, con el tiempo de cada consulta en segundos.
+def reporte_poblacion(conn, resolucion='mes', desde=None, hasta=None):
+    consultas = {
+        'totales': lambda: totales_poblacion(conn),
+        'pacientes_por_categoria': lambda: pacientes_por_categoria(conn),
+        'lecturas_por_categoria': lambda: lecturas_por_categoria(conn),
+        'pacientes_por_edad': lambda: pacientes_por_edad(conn),
+        'lecturas_por_responsable': lambda: lecturas_por_responsable(conn),
+        'lecturas_en_el_tiempo': lambda: lecturas_en_el_tiempo(conn, resolucion, desde, hasta),
+    }
+    reporte, tiempos = {}, {}
+    for nombre, consulta in consultas.items():
+        inicio = time.perf_counter()
+        reporte[nombre] = consulta()
+        tiempos[nombre] = time.perf_counter() - inicio
+    return reporte, tiempos
+
+def main():
+    parser = argparse.ArgumentParser(description="Analítica de la población de pacientes.")
+    parser.add_argument('ruta_bd', nargs='?', default='presion_arterial.db')
+    parser.add_argument('--resolucion', choices=('dia', 'semana', 'mes'), default='mes')
+    args = parser.parse_args()
+
+    import pandas as pd
+    from migraciones import aplicar_migraciones
+    conn = sqlite3.connect(args.ruta_bd)
+    try:
+        aplicar_migraciones(conn)
+        reporte, tiempos = reporte_poblacion(conn, args.resolucion)
+        with pd.option_context('display.width', 160, 'display.max_columns', 20):
+            for nombre, resultado in reporte.items():
+                print(f"== {nombre} ({tiempos[nombre] * 1000:.1f} ms)")
+                print(resultado)
+        print(f"Total: {sum(tiempos.values()) * 1000:.1f} ms")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
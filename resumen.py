@@ -0,0 +1,293 @@
+import argparse
+import sqlite3
+import sys
+
+from diagnostico import expresion_sql_codigo
+
+# Resumen precalculado por paciente (tablas resumen_paciente y resumen_categoria).
+# Los triggers sobre mediciones lo mantienen al día en cada inserción con operaciones
+# O(1) por fila: contadores, sumas, mínimos/máximos, la última lectura y el tiempo que el
+# paciente pasa en cada categoría de generar_diagnostico. El tiempo de una lectura es el
+# intervalo hasta la siguiente lectura del mismo paciente (orden por fecha e id); como la
+# fecha se guarda en segundos UTC (ver tiempo.py) es una simple resta.
+# Los borrados y actualizaciones también son incrementales, de modo que un borrado en
+# bloque no recalcula el historial completo del paciente por cada fila.
+#
+# Uso: python resumen.py [ruta_bd] --reconstruir | --verificar
+
+# Lectura anterior y siguiente a una fila (NEW u OLD) dentro del mismo paciente, sin contar
+# la fila con id excluir (en una actualización, la versión nueva de la fila borrada).
+def _vecina(fila, campos, anterior, excluir=None):
+    comparacion, direccion = ('<', 'DESC') if anterior else ('>', 'ASC')
+    exclusion = f" AND id <> {excluir}" if excluir else ""
+    return f"""
+    SELECT {campos} FROM mediciones
+    WHERE id_paciente = {fila}.id_paciente AND (fecha, id) {comparacion} ({fila}.fecha, {fila}.id){exclusion}
+    ORDER BY fecha {direccion}, id {direccion} LIMIT 1
+    """
+
+# Sentencias que recalculan desde el historial el resumen de los pacientes que cumplen filtro.
+def _sentencias_recalculo(filtro):
+    categoria = expresion_sql_codigo()
+    return [
+        f"DELETE FROM resumen_paciente WHERE {filtro}",
+        f"DELETE FROM resumen_categoria WHERE {filtro}",
+        f"""
+        INSERT INTO resumen_paciente (
+            id_paciente, total, suma_sistolica, suma_diastolica, min_sistolica, max_sistolica,
+            min_diastolica, max_diastolica, primera_fecha, ultima_fecha, id_ultima,
+            ultima_sistolica, ultima_diastolica, ultima_categoria)
+        SELECT id_paciente, COUNT(*), SUM(sistolica), SUM(diastolica), MIN(sistolica), MAX(sistolica),
+               MIN(diastolica), MAX(diastolica), MIN(fecha),
+               MAX(CASE WHEN desde_el_final = 1 THEN fecha END),
+               MAX(CASE WHEN desde_el_final = 1 THEN id END),
+               MAX(CASE WHEN desde_el_final = 1 THEN sistolica END),
+               MAX(CASE WHEN desde_el_final = 1 THEN diastolica END),
+               MAX(CASE WHEN desde_el_final = 1 THEN {categoria} END)
+        FROM (
+            SELECT id_paciente, id, fecha, sistolica, diastolica,
+                   ROW_NUMBER() OVER (PARTITION BY id_paciente ORDER BY fecha DESC, id DESC) AS desde_el_final
+            FROM mediciones WHERE {filtro}
+        )
+        GROUP BY id_paciente
+        """,
+        f"""
+        INSERT INTO resumen_categoria (id_paciente, categoria, lecturas, segundos)
+        SELECT id_paciente, categoria, COUNT(*), COALESCE(SUM(segundos), 0)
+        FROM (
+            SELECT id_paciente, {categoria} AS categoria,
+                   LEAD(fecha) OVER (PARTITION BY id_paciente ORDER BY fecha, id) - fecha AS segundos
+            FROM mediciones WHERE {filtro}
+        )
+        GROUP BY id_paciente, categoria
+        """,
+    ]
+
+# Sentencias que suman la fila NEW al resumen.
+def _sentencias_insercion():
+    categoria_nueva = expresion_sql_codigo('NEW.sistolica', 'NEW.diastolica')
+    segundos_siguiente = f"({_vecina('NEW', 'fecha', anterior=False)})"
+    return [
+        f"""
+        INSERT INTO resumen_paciente (
+            id_paciente, total, suma_sistolica, suma_diastolica, min_sistolica, max_sistolica,
+            min_diastolica, max_diastolica, primera_fecha, ultima_fecha, id_ultima,
+            ultima_sistolica, ultima_diastolica, ultima_categoria)
+        VALUES (
+            NEW.id_paciente, 1, NEW.sistolica, NEW.diastolica, NEW.sistolica, NEW.sistolica,
+            NEW.diastolica, NEW.diastolica, NEW.fecha, NEW.fecha, NEW.id,
+            NEW.sistolica, NEW.diastolica, {categoria_nueva})
+        ON CONFLICT(id_paciente) DO UPDATE SET
+            total = total + 1,
+            suma_sistolica = suma_sistolica + excluded.suma_sistolica,
+            suma_diastolica = suma_diastolica + excluded.suma_diastolica,
+            min_sistolica = MIN(min_sistolica, excluded.min_sistolica),
+            max_sistolica = MAX(max_sistolica, excluded.max_sistolica),
+            min_diastolica = MIN(min_diastolica, excluded.min_diastolica),
+            max_diastolica = MAX(max_diastolica, excluded.max_diastolica),
+            primera_fecha = MIN(primera_fecha, excluded.primera_fecha),
+            ultima_fecha = CASE WHEN (excluded.ultima_fecha, excluded.id_ultima) > (ultima_fecha, id_ultima) THEN excluded.ultima_fecha ELSE ultima_fecha END,
+            ultima_sistolica = CASE WHEN (excluded.ultima_fecha, excluded.id_ultima) > (ultima_fecha, id_ultima) THEN excluded.ultima_sistolica ELSE ultima_sistolica END,
+            ultima_diastolica = CASE WHEN (excluded.ultima_fecha, excluded.id_ultima) > (ultima_fecha, id_ultima) THEN excluded.ultima_diastolica ELSE ultima_diastolica END,
+            ultima_categoria = CASE WHEN (excluded.ultima_fecha, excluded.id_ultima) > (ultima_fecha, id_ultima) THEN excluded.ultima_categoria ELSE ultima_categoria END,
+            id_ultima = CASE WHEN (excluded.ultima_fecha, excluded.id_ultima) > (ultima_fecha, id_ultima) THEN excluded.id_ultima ELSE id_ultima END
+        """,
+        # La lectura nueva cuenta el tiempo hasta la siguiente (si se insertó en medio del historial).
+        f"""
+        INSERT INTO resumen_categoria (id_paciente, categoria, lecturas, segundos)
+        VALUES (NEW.id_paciente, {categoria_nueva}, 1, COALESCE({segundos_siguiente} - NEW.fecha, 0))
+        ON CONFLICT(id_paciente, categoria) DO UPDATE SET
+            lecturas = lecturas + 1,
+            segundos = segundos + excluded.segundos
+        """,
+        # La lectura anterior pasa a terminar en la nueva en lugar de en la siguiente.
+        f"""
+        INSERT INTO resumen_categoria (id_paciente, categoria, lecturas, segundos)
+        SELECT NEW.id_paciente, {expresion_sql_codigo('anterior.sistolica', 'anterior.diastolica')}, 0,
+               NEW.fecha - COALESCE({segundos_siguiente}, anterior.fecha)
+        FROM ({_vecina('NEW', 'fecha, sistolica, diastolica', anterior=True)}) AS anterior
+        WHERE true
+        ON CONFLICT(id_paciente, categoria) DO UPDATE SET
+            segundos = segundos + excluded.segundos
+        """,
+    ]
+
+# Sentencias que restan la fila OLD del resumen. Los mínimos, máximos y la primera fecha solo
+# se vuelven a buscar (con el índice por paciente) si la fila borrada era el extremo.
+# excluir es el id de una fila que no debe contarse como vecina (ver _vecina).
+def _sentencias_eliminacion(excluir):
+    categoria_borrada = expresion_sql_codigo('OLD.sistolica', 'OLD.diastolica')
+    segundos_siguiente = f"({_vecina('OLD', 'fecha', anterior=False, excluir=excluir)})"
+    restantes = f"FROM mediciones WHERE id_paciente = OLD.id_paciente AND id <> {excluir}"
+
+    def extremo(columna_resumen, columna, funcion, comparacion):
+        return (f"{columna_resumen} = CASE WHEN OLD.{columna} {comparacion} {columna_resumen} "
+                f"THEN (SELECT {funcion}({columna}) {restantes}) ELSE {columna_resumen} END")
+
+    anterior = _vecina('OLD', '{}', anterior=True, excluir=excluir)
+    return [
+        f"""
+        UPDATE resumen_paciente SET
+            total = total - 1,
+            suma_sistolica = suma_sistolica - OLD.sistolica,
+            suma_diastolica = suma_diastolica - OLD.diastolica,
+            {extremo('min_sistolica', 'sistolica', 'MIN', '<=')},
+            {extremo('max_sistolica', 'sistolica', 'MAX', '>=')},
+            {extremo('min_diastolica', 'diastolica', 'MIN', '<=')},
+            {extremo('max_diastolica', 'diastolica', 'MAX', '>=')},
+            {extremo('primera_fecha', 'fecha', 'MIN', '<=')},
+            ultima_fecha = CASE WHEN id_ultima = OLD.id THEN ({anterior.format('fecha')}) ELSE ultima_fecha END,
+            ultima_sistolica = CASE WHEN id_ultima = OLD.id THEN ({anterior.format('sistolica')}) ELSE ultima_sistolica END,
+            ultima_diastolica = CASE WHEN id_ultima = OLD.id THEN ({anterior.format('diastolica')}) ELSE ultima_diastolica END,
+            ultima_categoria = CASE WHEN id_ultima = OLD.id THEN ({anterior.format(expresion_sql_codigo())}) ELSE ultima_categoria END,
+            id_ultima = CASE WHEN id_ultima = OLD.id THEN ({anterior.format('id')}) ELSE id_ultima END
+        WHERE id_paciente = OLD.id_paciente
+        """,
+        "DELETE FROM resumen_paciente WHERE id_paciente = OLD.id_paciente AND total <= 0",
+        # La lectura borrada deja de contar su tiempo hasta la siguiente.
+        f"""
+        UPDATE resumen_categoria SET
+            lecturas = lecturas - 1,
+            segundos = segundos - COALESCE({segundos_siguiente} - OLD.fecha, 0)
+        WHERE id_paciente = OLD.id_paciente AND categoria = {categoria_borrada}
+        """,
+        # La lectura anterior pasa a terminar en la siguiente (o en ninguna, si era la última).
+        f"""
+        UPDATE resumen_categoria SET
+            segundos = segundos + COALESCE({segundos_siguiente}, ({anterior.format('fecha')})) - OLD.fecha
+        WHERE id_paciente = OLD.id_paciente AND categoria = ({anterior.format(expresion_sql_codigo())})
+        """,
+        "DELETE FROM resumen_categoria WHERE id_paciente = OLD.id_paciente AND lecturas <= 0",
+    ]
+
+# Triggers que mantienen el resumen: una actualización se trata como el borrado de la fila
+# anterior seguido de la inserción de la nueva.
+def _sentencias_triggers():
+    insercion = ';\n'.join(_sentencias_insercion())
+    return [
+        f"""
+        CREATE TRIGGER resumen_mediciones_insert AFTER INSERT ON mediciones
+        BEGIN
+            {insercion};
+        END
+        """,
+        f"""
+        CREATE TRIGGER resumen_mediciones_delete AFTER DELETE ON mediciones
+        BEGIN
+            {';'.join(_sentencias_eliminacion('OLD.id'))};
+        END
+        """,
+        f"""
+        CREATE TRIGGER resumen_mediciones_update AFTER UPDATE OF id_paciente, fecha, sistolica, diastolica ON mediciones
+        BEGIN
+            {';'.join(_sentencias_eliminacion('NEW.id'))};
+            {insercion};
+        END
+        """,
+    ]
+
+# Quita los triggers; los cambios posteriores en mediciones no se reflejan hasta instalar().
+def eliminar_triggers(conn):
+    for nombre in ('resumen_mediciones_insert', 'resumen_mediciones_delete', 'resumen_mediciones_update'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+# (Re)crea los triggers con la definición actual y reconstruye el resumen completo.
+# Se ejecuta dentro de la transacción de aplicar_migraciones cada vez que cambia el esquema.
+def instalar(conn):
+    eliminar_triggers(conn)
+    for sentencia in _sentencias_triggers():
+        conn.execute(sentencia)
+    reconstruir(conn)
+
+# Recalcula el resumen de todos los pacientes desde el historial.
+def reconstruir(conn):
+    for sentencia in _sentencias_recalculo('1 = 1'):
+        conn.execute(sentencia)
+
+# Compara el resumen guardado con uno calculado desde cero con pandas y el clasificador
+# vectorizado (una implementación independiente de los triggers). Devuelve las diferencias.
+def verificar(conn, tolerancia_segundos=1.0):
+    import pandas as pd
+    from diagnostico import codigos_diagnostico
+
+    mediciones = pd.read_sql_query("SELECT id, id_paciente, fecha, sistolica, diastolica FROM mediciones", conn)
+    mediciones = mediciones.sort_values(['id_paciente', 'fecha', 'id'])
+    mediciones['categoria'] = codigos_diagnostico(mediciones['sistolica'], mediciones['diastolica'])
+    mediciones['segundos'] = (mediciones.groupby('id_paciente')['fecha'].shift(-1) - mediciones['fecha']).fillna(0)
+
+    por_paciente = mediciones.groupby('id_paciente')
+    esperado = pd.DataFrame({
+        'total': por_paciente.size(),
+        'suma_sistolica': por_paciente['sistolica'].sum(),
+        'suma_diastolica': por_paciente['diastolica'].sum(),
+        'min_sistolica': por_paciente['sistolica'].min(),
+        'max_sistolica': por_paciente['sistolica'].max(),
+        'min_diastolica': por_paciente['diastolica'].min(),
+        'max_diastolica': por_paciente['diastolica'].max(),
+        'id_ultima': por_paciente['id'].last(),
+        'ultima_categoria': por_paciente['categoria'].last(),
+    })
+    guardado = pd.read_sql_query(f"SELECT id_paciente, {', '.join(esperado.columns)} FROM resumen_paciente", conn).set_index('id_paciente')
+
+    diferencias = []
+    for id_paciente in esperado.index.union(guardado.index):
+        if id_paciente not in guardado.index or id_paciente not in esperado.index:
+            diferencias.append((id_paciente, 'resumen_paciente', 'fila faltante o sobrante'))
+            continue
+        for columna in esperado.columns:
+            if esperado.at[id_paciente, columna] != guardado.at[id_paciente, columna]:
+                diferencias.append((id_paciente, columna, f"esperado {esperado.at[id_paciente, columna]}, guardado {guardado.at[id_paciente, columna]}"))
+
+    categorias_esperadas = mediciones.groupby(['id_paciente', 'categoria']).agg(lecturas=('id', 'size'), segundos=('segundos', 'sum'))
+    categorias_guardadas = pd.read_sql_query("SELECT * FROM resumen_categoria", conn).set_index(['id_paciente', 'categoria'])
+    comparacion = categorias_esperadas.join(categorias_guardadas, how='outer', lsuffix='_esperado', rsuffix='_guardado').fillna(0)
+    for (id_paciente, categoria), fila in comparacion.iterrows():
+        if fila['lecturas_esperado'] != fila['lecturas_guardado'] or abs(fila['segundos_esperado'] - fila['segundos_guardado']) > tolerancia_segundos:
+            diferencias.append((id_paciente, f'categoria {categoria}', f"esperado {fila['lecturas_esperado']:.0f} lecturas/{fila['segundos_esperado']:.0f} s, "
+                                                                     f"guardado {fila['lecturas_guardado']:.0f} lecturas/{fila['segundos_guardado']:.0f} s"))
+    return diferencias
+
+# Devuelve el resumen de un paciente como diccionario (o None si no tiene mediciones).
+def obtener_resumen(conn, id_paciente):
+    cursor = conn.execute("SELECT * FROM resumen_paciente WHERE id_paciente = ?", (id_paciente,))
+    fila = cursor.fetchone()
+    if fila is None:
+        return None
+    resumen = dict(zip([columna[0] for columna in cursor.description], fila))
+    resumen['promedio_sistolica'] = resumen['suma_sistolica'] / resumen['total']
+    resumen['promedio_diastolica'] = resumen['suma_diastolica'] / resumen['total']
+    resumen['segundos_por_categoria'] = dict(conn.execute(
+        "SELECT categoria, segundos FROM resumen_categoria WHERE id_paciente = ?", (id_paciente,)
+    ).fetchall())
+    return resumen
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye o verifica el resumen precalculado por paciente.")
+    parser.add_argument('ruta_bd', nargs='?', default='presion_arterial.db')
+    accion = parser.add_mutually_exclusive_group(required=True)
+    accion.add_argument('--reconstruir', action='store_true', help="Recalcula el resumen desde el historial completo.")
+    accion.add_argument('--verificar', action='store_true', help="Compara el resumen con el historial; falla si hay diferencias.")
+    args = parser.parse_args()
+
+    from migraciones import aplicar_migraciones
+    conn = sqlite3.connect(args.ruta_bd)
+    try:
+        aplicar_migraciones(conn)
+        if args.reconstruir:
+            with conn:
+                reconstruir(conn)
+            total = conn.execute("SELECT COUNT(*) FROM resumen_paciente").fetchone()[0]
+            print(f"Resumen reconstruido para {total} pacientes.")
+        else:
+            diferencias = verificar(conn)
+            for id_paciente, campo, detalle in diferencias[:50]:
+                print(f"[ERROR] paciente {id_paciente}, {campo}: {detalle}")
+            if diferencias:
+                print(f"{len(diferencias)} diferencias encontradas.")
+                sys.exit(1)
+            print("El resumen coincide con el historial de mediciones.")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import hmac
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from alertas import TOLERANCIA_FUTURO_MINUTOS
+from importar_mediciones import RANGO_DIASTOLICA, RANGO_SISTOLICA
+from migraciones import aplicar_migraciones
+from tiempo import a_epoch, ahora
+
+# Servicio HTTP local para que los tensiómetros automáticos envíen sus lecturas.
+# Solo usa la biblioteca estándar: un servidor asyncio con HTTP/1.1 y conexiones keep-alive.
+#
+#   POST /mediciones   una lectura (objeto JSON) o un lote (lista de objetos)
+#   GET  /salud        estado del servicio y contadores de escritura
+#
+# Cada lectura lleva id_paciente (o paciente, por nombre), id_responsable (o responsable),
+# sistolica, diastolica y, opcionalmente, fecha (si falta, la hora de llegada). Se validan con
+# los mismos rangos que el formulario de mediciones. La fecha es texto ISO 8601 (con zona, p. ej.
+# 'Z' o '-05:00', o sin zona en hora de Bogotá) o segundos UTC; no puede ser anterior a 1970
+# ni estar más de TOLERANCIA_FUTURO segundos en el futuro (un reloj adelantado o una fecha en
+# milisegundos). Si ninguna lectura de la petición es válida se responde 422.
+#
+# Las escrituras se agrupan (group commit): un único escritor junta las lecturas que llegan
+# durante VENTANA_MS milisegundos, o hasta MAX_LOTE lecturas, y las inserta en una sola
+# transacción. La respuesta se envía después del COMMIT, así que una lectura confirmada ya
+# está en disco.
+#
+# Uso: python servicio_ingesta.py [--bd presion_arterial.db] [--puerto 8765] [--token SECRETO]
+
+VENTANA_MS = 10
+MAX_LOTE = 5000
+# Peticiones que pueden esperar al escritor; con la cola llena los clientes esperan.
+MAX_PENDIENTES = 1000
+MAX_CUERPO = 5 * 1024 * 1024
+# Margen para relojes de tensiómetros adelantados, el mismo que usan las alertas.
+TOLERANCIA_FUTURO = TOLERANCIA_FUTURO_MINUTOS * 60
+
+ESTADOS_HTTP = {
+    200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 422: 'Unprocessable Entity',
+    500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+# Convierte la fecha de una lectura a segundos UTC, como se guarda en la tabla de mediciones.
+# Devuelve None si no es una fecha o está fuera de rango.
+def _normalizar_fecha(valor):
+    if valor is None:
+        return ahora()
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        fecha = valor
+    elif isinstance(valor, str):
+        try:
+            fecha = a_epoch(valor)
+        except (ValueError, OverflowError):
+            return None
+    else:
+        return None
+    if not 0 <= fecha <= ahora() + TOLERANCIA_FUTURO:
+        return None
+    return fecha
+
+# Valida una lectura. Devuelve ((paciente, responsable, fecha, sistolica, diastolica), None)
+# o (None, motivo). Paciente y responsable quedan como id (int) o nombre (str) hasta el escritor.
+def validar_lectura(lectura):
+    if not isinstance(lectura, dict):
+        return None, 'La lectura debe ser un objeto JSON'
+    paciente = lectura.get('id_paciente', lectura.get('paciente'))
+    responsable = lectura.get('id_responsable', lectura.get('responsable'))
+    if not isinstance(paciente, (int, str)) or isinstance(paciente, bool):
+        return None, 'Falta el paciente'
+    if not isinstance(responsable, (int, str)) or isinstance(responsable, bool):
+        return None, 'Falta el responsable'
+    fecha = _normalizar_fecha(lectura.get('fecha'))
+    if fecha is None:
+        return None, 'Fecha inválida'
+    sistolica, diastolica = lectura.get('sistolica'), lectura.get('diastolica')
+    if not isinstance(sistolica, int) or isinstance(sistolica, bool) or not RANGO_SISTOLICA[0] <= sistolica <= RANGO_SISTOLICA[1]:
+        return None, f'Sistólica fuera de rango {RANGO_SISTOLICA}'
+    if not isinstance(diastolica, int) or isinstance(diastolica, bool) or not RANGO_DIASTOLICA[0] <= diastolica <= RANGO_DIASTOLICA[1]:
+        return None, f'Diastólica fuera de rango {RANGO_DIASTOLICA}'
+    return (paciente, responsable, fecha, sistolica, diastolica), None
+
+# Ids y nombres de una tabla (pacientes o responsables), usados solo desde el hilo escritor.
+# Se recargan cuando llega un id o un nombre desconocido, por si se registró después.
+class _Directorio:
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.ids = set()
+        self.por_nombre = {}
+        # Se recarga como mucho una vez por lote aunque lleguen muchos valores desconocidos.
+        self.recargado = False
+
+    def recargar(self, conn):
+        filas = conn.execute(f"SELECT id, nombre FROM {self.tabla}").fetchall()
+        self.ids = {id for id, _ in filas}
+        self.por_nombre = {nombre: id for id, nombre in filas}
+        self.recargado = True
+
+    def _buscar(self, valor):
+        if isinstance(valor, int):
+            return valor if valor in self.ids else None
+        return self.por_nombre.get(valor.strip())
+
+    def resolver(self, conn, valor):
+        id = self._buscar(valor)
+        if id is None and not self.recargado:
+            self.recargar(conn)
+            id = self._buscar(valor)
+        return id
+
+# Escritor único con group commit. Las peticiones se encolan con sus lecturas ya validadas
+# y un futuro; el escritor junta varias peticiones en un lote, lo inserta en un hilo propio
+# (las llamadas a SQLite bloquean) y resuelve los futuros tras el COMMIT.
+class EscritorAgrupado:
+    def __init__(self, ruta_bd, ventana_ms=VENTANA_MS, max_lote=MAX_LOTE):
+        self.ruta_bd = ruta_bd
+        self.ventana = ventana_ms / 1000
+        self.max_lote = max_lote
+        self.cola = asyncio.Queue(maxsize=MAX_PENDIENTES)
+        # Un solo hilo: la conexión y los directorios se usan siempre desde el mismo.
+        self._hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix='escritor_ingesta')
+        self._conn = None
+        self._pacientes = _Directorio('pacientes')
+        self._responsables = _Directorio('responsables')
+        self.lotes = 0
+        self.insertadas = 0
+        self.rechazadas = 0
+        self.segundos_commit = 0.0
+
+    def _abrir(self):
+        conn = sqlite3.connect(self.ruta_bd, timeout=30)
+        aplicar_migraciones(conn)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # FULL: cada COMMIT llega a disco antes de confirmar la lectura al tensiómetro. El
+        # coste del fsync se reparte entre todas las lecturas del lote.
+        conn.execute("PRAGMA synchronous = FULL")
+        self._pacientes.recargar(conn)
+        self._responsables.recargar(conn)
+        self._conn = conn
+
+    async def iniciar(self):
+        await asyncio.get_running_loop().run_in_executor(self._hilo, self._abrir)
+
+    # Encola las lecturas válidas de una petición y espera a que estén confirmadas.
+    # Devuelve la lista de (posición en la petición, motivo) de las que rechaza el escritor.
+    async def escribir(self, lecturas):
+        futuro = asyncio.get_running_loop().create_future()
+        await self.cola.put((lecturas, futuro))
+        return await futuro
+
+    # Inserta un lote en una transacción (en el hilo escritor). pendientes es una lista de
+    # listas de (posición, lectura); devuelve los rechazos de cada petición.
+    def _insertar(self, pendientes):
+        filas, rechazos = [], []
+        self._pacientes.recargado = self._responsables.recargado = False
+        for lecturas in pendientes:
+            rechazos_peticion = []
+            for posicion, (paciente, responsable, fecha, sistolica, diastolica) in lecturas:
+                id_paciente = self._pacientes.resolver(self._conn, paciente)
+                id_responsable = self._responsables.resolver(self._conn, responsable)
+                if id_paciente is None:
+                    rechazos_peticion.append((posicion, 'Paciente desconocido'))
+                elif id_responsable is None:
+                    rechazos_peticion.append((posicion, 'Responsable desconocido'))
+                else:
+                    filas.append((id_paciente, id_responsable, fecha, sistolica, diastolica))
+            rechazos.append(rechazos_peticion)
+        inicio = time.perf_counter()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO mediciones (id_paciente, id_responsable, fecha, sistolica, diastolica) VALUES (?, ?, ?, ?, ?)",
+                filas,
+            )
+        self.segundos_commit += time.perf_counter() - inicio
+        self.lotes += 1
+        self.insertadas += len(filas)
+        return rechazos
+
+    # Bucle del escritor: espera la primera petición, junta las que lleguen durante la ventana
+    # (o hasta max_lote lecturas) y escribe el lote.
+    async def ejecutar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self.cola.get()]
+            lecturas = len(lote[0][0])
+            limite = loop.time() + self.ventana
+            while lecturas < self.max_lote:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    peticion = await asyncio.wait_for(self.cola.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                lote.append(peticion)
+                lecturas += len(peticion[0])
+            # Cualquier error falla solo las peticiones de este lote; el escritor sigue atendiendo.
+            try:
+                rechazos = await loop.run_in_executor(self._hilo, self._insertar, [peticion for peticion, _ in lote])
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            for (_, futuro), rechazos_peticion in zip(lote, rechazos):
+                self.rechazadas += len(rechazos_peticion)
+                if not futuro.done():
+                    futuro.set_result(rechazos_peticion)
+
+    def metricas(self):
+        return {
+            'lotes': self.lotes,
+            'insertadas': self.insertadas,
+            'rechazadas_en_escritor': self.rechazadas,
+            'lecturas_por_lote': round(self.insertadas / self.lotes, 1) if self.lotes else 0,
+            'ms_commit_promedio': round(self.segundos_commit * 1000 / self.lotes, 3) if self.lotes else 0,
+            'peticiones_en_cola': self.cola.qsize(),
+        }
+
+    def cerrar(self):
+        if self._conn is not None:
+            self._hilo.submit(self._conn.close).result()
+        self._hilo.shutdown()
+
+class ServicioIngesta:
+    def __init__(self, escritor, token=None):
+        self.escritor = escritor
+        self.token = token
+        self.inicio = time.time()
+
+    # Procesa POST /mediciones: valida todas las lecturas, escribe las válidas y responde con
+    # cuántas se insertaron y los rechazos con su posición en la petición.
+    async def _recibir_mediciones(self, cuerpo):
+        try:
+            datos = json.loads(cuerpo)
+        except (ValueError, UnicodeDecodeError):
+            return 400, {'error': 'El cuerpo no es JSON válido'}
+        lecturas = datos if isinstance(datos, list) else [datos]
+        validas, rechazadas = [], []
+        for posicion, lectura in enumerate(lecturas):
+            fila, motivo = validar_lectura(lectura)
+            if motivo:
+                rechazadas.append((posicion, motivo))
+            else:
+                validas.append((posicion, fila))
+        if validas:
+            try:
+                rechazadas += await self.escritor.escribir(validas)
+            except sqlite3.DatabaseError as e:
+                return 503, {'error': f'No se pudo guardar el lote: {e}'}
+            except Exception as e:
+                return 500, {'error': f'No se pudo guardar el lote: {e}'}
+        rechazadas.sort()
+        return 200 if validas or not lecturas else 422, {
+            'insertadas': len(lecturas) - len(rechazadas),
+            'rechazadas': [{'posicion': posicion, 'motivo': motivo} for posicion, motivo in rechazadas],
+        }
+
+    async def despachar(self, metodo, ruta, encabezados, cuerpo):
+        if self.token and not hmac.compare_digest(encabezados.get('authorization', ''), f'Bearer {self.token}'):
+            return 401, {'error': 'Token inválido'}
+        ruta = ruta.split('?', 1)[0]
+        if ruta == '/mediciones':
+            if metodo != 'POST':
+                return 405, {'error': 'Use POST'}
+            return await self._recibir_mediciones(cuerpo)
+        if ruta == '/salud':
+            return 200, {'estado': 'ok', 'segundos_activo': round(time.time() - self.inicio), **self.escritor.metricas()}
+        return 404, {'error': f'Ruta desconocida: {ruta}'}
+
+    # Atiende una conexión HTTP/1.1; varias peticiones pueden llegar por la misma conexión.
+    async def atender(self, lector, escritor_red):
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                metodo, ruta, version = linea.decode('latin-1').split()
+                encabezados = {}
+                while (linea := await lector.readline()) not in (b'\r\n', b'\n', b''):
+                    nombre, _, valor = linea.decode('latin-1').partition(':')
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                longitud = int(encabezados.get('content-length', 0))
+                if longitud > MAX_CUERPO:
+                    estado, respuesta, mantener = 413, {'error': 'Petición demasiado grande'}, False
+                else:
+                    cuerpo = await lector.readexactly(longitud) if longitud else b''
+                    estado, respuesta = await self.despachar(metodo, ruta, encabezados, cuerpo)
+                    mantener = version == 'HTTP/1.1' and encabezados.get('connection', '').lower() != 'close'
+                contenido = json.dumps(respuesta, ensure_ascii=False).encode()
+                escritor_red.write(
+                    f"HTTP/1.1 {estado} {ESTADOS_HTTP[estado]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(contenido)}\r\n"
+                    f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode('latin-1') + contenido
+                )
+                await escritor_red.drain()
+                if not mantener:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            escritor_red.close()
+
+# Arranca el escritor y el servidor; listo se resuelve con el puerto cuando acepta conexiones.
+async def servir(ruta_bd, host='127.0.0.1', puerto=8765, token=None, ventana_ms=VENTANA_MS, max_lote=MAX_LOTE, listo=None):
+    escritor = EscritorAgrupado(ruta_bd, ventana_ms, max_lote)
+    await escritor.iniciar()
+    tarea_escritor = asyncio.create_task(escritor.ejecutar())
+    servicio = ServicioIngesta(escritor, token)
+    servidor = await asyncio.start_server(servicio.atender, host, puerto)
+    if listo is not None:
+        listo.set_result(servidor.sockets[0].getsockname()[1])
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        tarea_escritor.cancel()
+        escritor.cerrar()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP de ingesta de mediciones para tensiómetros.")
+    parser.add_argument('--bd', default='presion_arterial.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--token', help="Si se indica, las peticiones deben enviar 'Authorization: Bearer TOKEN'.")
+    parser.add_argument('--ventana-ms', type=float, default=VENTANA_MS, help="Tiempo máximo que una lectura espera a su lote.")
+    parser.add_argument('--max-lote', type=int, default=MAX_LOTE, help="Lecturas máximas por transacción.")
+    args = parser.parse_args()
+
+    async def iniciar():
+        listo = asyncio.get_running_loop().create_future()
+        listo.add_done_callback(lambda futuro: print(f"Escuchando en http://{args.host}:{futuro.result()} (base de datos {args.bd})", flush=True))
+        await servir(args.bd, args.host, args.puerto, args.token, args.ventana_ms, args.max_lote, listo)
+
+    try:
+        asyncio.run(iniciar())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from escritor_diferido import EscritorDiferido, EscrituraNoConfirmada
+
+# Base de datos en modo WAL con una tabla, y el escritor ya con su conexión abierta.
+@pytest.fixture
+def bd(tmp_path):
+    ruta = str(tmp_path / 'escritor.db')
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    escritor = EscritorDiferido(ruta, busy_timeout_ms=100, espera_confirmacion=5)
+    escritor.ejecutar("INSERT INTO t VALUES (0)")
+    yield conn, escritor
+    escritor.cerrar()
+    conn.close()
+
+def test_base_de_datos_bloqueada(bd):
+    conn, escritor = bd
+    conn.execute("BEGIN IMMEDIATE")
+    with pytest.raises(EscrituraNoConfirmada) as error:
+        escritor.ejecutar("INSERT INTO t VALUES (1)")
+    assert isinstance(error.value.__cause__, sqlite3.OperationalError)
+    conn.execute("COMMIT")
+    assert escritor.ejecutar("INSERT INTO t VALUES (2)") == 2
+
+def test_sentencia_rechazada(bd):
+    _, escritor = bd
+    with pytest.raises(EscrituraNoConfirmada):
+        escritor.ejecutar("INSERT INTO tabla_inexistente VALUES (1)")
+
+def test_base_de_datos_inaccesible(tmp_path):
+    escritor = EscritorDiferido(str(tmp_path / 'no_existe' / 'escritor.db'), espera_confirmacion=5)
+    try:
+        with pytest.raises(EscrituraNoConfirmada):
+            escritor.ejecutar("INSERT INTO t VALUES (1)")
+    finally:
+        escritor.cerrar()
+
+def test_ejecutar_varias(bd):
+    conn, escritor = bd
+    assert escritor.ejecutar_varias("INSERT INTO t VALUES (?)", [(i,) for i in range(100)]) == 100
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 101
+
+def test_lotes_que_no_pudieron_abrir_la_base_de_datos_se_cuentan(tmp_path):
+    escritor = EscritorDiferido(str(tmp_path / 'no_existe' / 'escritor.db'), espera_confirmacion=5)
+    try:
+        for _ in range(2):
+            with pytest.raises(EscrituraNoConfirmada):
+                escritor.ejecutar("INSERT INTO t VALUES (1)")
+        metricas = escritor.metricas()
+        assert (metricas['lotes'], metricas['fallidas']) == (2, 2)
+    finally:
+        escritor.cerrar()
@@ -0,0 +1,47 @@
+import io
+import sqlite3
+
+import pytest
+
+from importar_mediciones import importar_mediciones
+from migraciones import aplicar_migraciones
+from tiempo import a_epoch
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    aplicar_migraciones(conn)
+    conn.execute("INSERT INTO pacientes (nombre, edad, historial) VALUES ('Ana', 60, '')")
+    conn.executemany("INSERT INTO responsables (nombre, rol) VALUES (?, 'Responsable')", [('Dra. Ruiz',), ('Dr. Paz',)])
+    conn.commit()
+    yield conn
+    conn.close()
+
+def importar(conn, contenido, id_responsable_defecto=None):
+    return importar_mediciones(conn, io.StringIO(contenido), 'mediciones.csv', id_responsable_defecto)
+
+def test_responsable_desconocido_no_usa_el_de_defecto(conn):
+    resultado = importar(conn, (
+        "paciente,responsable,fecha,sistolica,diastolica\n"
+        "Ana,Dra. Ruiz,2025-01-02 08:00,120,80\n"
+        "Ana,,2025-01-02 09:00,121,81\n"
+        "Ana,Dra. Ruis,2025-01-02 10:00,122,82\n"
+    ), id_responsable_defecto=2)
+    assert resultado.insertadas == 2
+    assert resultado.rechazadas == [(4, 'Responsable desconocido')]
+    assert conn.execute("SELECT sistolica, id_responsable FROM mediciones ORDER BY sistolica").fetchall() == [(120, 1), (121, 2)]
+
+def test_fechas_iso_8601_con_y_sin_zona(conn):
+    resultado = importar(conn, (
+        "paciente,responsable,fecha,sistolica,diastolica\n"
+        "Ana,Dra. Ruiz,2025-01-02 08:00,120,80\n"
+        "Ana,Dra. Ruiz,2025-01-02T08:00:00,121,81\n"
+        "Ana,Dra. Ruiz,2025-01-02T13:00:00Z,122,82\n"
+        "Ana,Dra. Ruiz,2025-01-02T08:00:00-05:00,123,83\n"
+        "Ana,Dra. Ruiz,2025-01-02 14:00:00+01:00,124,84\n"
+        "Ana,Dra. Ruiz,no es fecha,125,85\n"
+    ))
+    assert resultado.insertadas == 5
+    assert resultado.rechazadas == [(7, 'Fecha inválida')]
+    fechas = {fecha for (fecha,) in conn.execute("SELECT fecha FROM mediciones")}
+    assert fechas == {a_epoch('2025-01-02 08:00')}
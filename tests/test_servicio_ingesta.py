@@ -0,0 +1,61 @@
+import asyncio
+
+from benchmarks.carga_ingesta import ClienteHttp
+from benchmarks.sintetico import crear_bd_sintetica
+from servicio_ingesta import EscritorAgrupado, servir
+from tiempo import ahora
+
+LECTURA = {'id_paciente': 1, 'id_responsable': 1, 'sistolica': 120, 'diastolica': 80}
+
+# Arranca el servicio sobre una base de datos sintética y envía las peticiones en orden.
+def enviar(tmp_path, peticiones):
+    ruta = str(tmp_path / 'ingesta.db')
+    crear_bd_sintetica(ruta, pacientes=2, mediciones_por_paciente=1, responsables=1).close()
+
+    async def ejecutar():
+        listo = asyncio.get_running_loop().create_future()
+        servidor = asyncio.create_task(servir(ruta, puerto=0, listo=listo))
+        cliente = ClienteHttp('127.0.0.1', await listo)
+        await cliente.conectar()
+        try:
+            return [await asyncio.wait_for(cliente.peticion('POST', '/mediciones', datos), 5) for datos in peticiones]
+        finally:
+            cliente.cerrar()
+            servidor.cancel()
+
+    return asyncio.run(ejecutar())
+
+def test_fechas_fuera_de_rango_se_rechazan(tmp_path):
+    respuestas = enviar(tmp_path, [
+        {**LECTURA, 'fecha': 10**30},
+        {**LECTURA, 'fecha': -1},
+        {**LECTURA, 'fecha': ahora() * 1000},
+        {**LECTURA, 'fecha': '9999-12-31T23:59:59'},
+    ])
+    for estado, respuesta in respuestas:
+        assert estado == 422
+        assert respuesta['rechazadas'] == [{'posicion': 0, 'motivo': 'Fecha inválida'}]
+
+def test_el_escritor_sigue_tras_una_peticion_invalida(tmp_path):
+    (estado_invalida, _), (estado, respuesta) = enviar(tmp_path, [
+        [{**LECTURA, 'fecha': 10**30}],
+        {**LECTURA, 'fecha': ahora()},
+    ])
+    assert estado_invalida == 422
+    assert estado == 200
+    assert respuesta == {'insertadas': 1, 'rechazadas': []}
+
+def test_un_error_en_el_lote_no_detiene_al_escritor(tmp_path, monkeypatch):
+    insertar = EscritorAgrupado._insertar
+    fallos = [OverflowError('Python int too large to convert to SQLite INTEGER')]
+
+    def insertar_con_fallo(self, pendientes):
+        if fallos:
+            raise fallos.pop()
+        return insertar(self, pendientes)
+
+    monkeypatch.setattr(EscritorAgrupado, '_insertar', insertar_con_fallo)
+    (estado_fallido, _), (estado, respuesta) = enviar(tmp_path, [LECTURA, LECTURA])
+    assert estado_fallido == 500
+    assert estado == 200
+    assert respuesta['insertadas'] == 1
@@ -0,0 +1,66 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+# Fechas de las mediciones.
+# La columna fecha guarda segundos UTC desde la época Unix (enteros): ocupan menos que el
+# texto, se comparan y ordenan como números y los rangos desde/hasta usan el índice por
+# paciente y fecha sin convertir nada. La hora local de America/Bogota solo se calcula al
+# mostrar los datos, o en SQL para agrupar por día, semana o mes local.
+#
+# Colombia no tiene horario de verano (UTC-5 todo el año), así que las expresiones SQL usan un
+# desplazamiento fijo; en Python se usa zoneinfo si la base de datos de zonas está disponible.
+
+DESFASE_HORAS = -5
+try:
+    from zoneinfo import ZoneInfo
+    ZONA = ZoneInfo('America/Bogota')
+except Exception:
+    ZONA = timezone(timedelta(hours=DESFASE_HORAS), 'America/Bogota')
+
+# Convierte una fecha a segundos UTC. Las fechas sin zona (las de los formularios, los
+# archivos importados o el texto antiguo de la base de datos) se interpretan en hora de
+# Bogotá; un date es el inicio de ese día.
+def a_epoch(valor):
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor.strip())
+    elif not isinstance(valor, datetime) and isinstance(valor, date):
+        valor = datetime.combine(valor, time.min)
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=ZONA)
+    return int(valor.timestamp())
+
+# Segundos UTC a datetime en hora de Bogotá (sin zona, para mostrar y graficar).
+def a_local(segundos):
+    return datetime.fromtimestamp(segundos, ZONA).replace(tzinfo=None)
+
+# Segundos UTC actuales.
+def ahora():
+    return int(datetime.now(timezone.utc).timestamp())
+
+# Límites [desde, hasta) en segundos para un rango de días locales: hasta incluye su día completo.
+def rango_dias(desde, hasta):
+    inicio = a_epoch(desde) if desde is not None else None
+    fin = a_epoch(hasta + timedelta(days=1)) if hasta is not None else None
+    return inicio, fin
+
+# Serie de pandas con segundos UTC a datetime64 en hora de Bogotá (sin zona).
+def serie_local(segundos):
+    import pandas as pd
+
+    return pd.to_datetime(segundos, unit='s', utc=True).dt.tz_convert(ZONA).dt.tz_localize(None)
+
+# Serie datetime64 de pandas a segundos UTC (enteros); sin zona se interpreta en hora de Bogotá.
+def serie_epoch(fechas):
+    import pandas as pd
+
+    if fechas.dt.tz is None:
+        fechas = fechas.dt.tz_localize(ZONA)
+    return (fechas - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+# Modificadores de las funciones de fecha de SQLite que convierten una expresión en segundos
+# UTC a la hora local, p. ej. date({sql_local('fecha')}) es el día local de la medición.
+def sql_local(expresion):
+    return f"{expresion}, 'unixepoch', '{DESFASE_HORAS:+d} hours'"
+
+# Expresión SQL con los segundos UTC del inicio de un día local dado como texto 'AAAA-MM-DD'.
+def sql_epoch_dia(expresion):
+    return f"CAST(strftime('%s', {expresion}, '{-DESFASE_HORAS:+d} hours') AS INTEGER)"